@@ -0,0 +1,368 @@
+"""
+Banco de carga del checkout: siembra una base con catálogo, clientes,
+proveedores e historial sintéticos y reproduce una mezcla de operaciones
+(ventas, devoluciones, compras y movimientos de caja) desde varios procesos
+(uno por terminal, con su propia caja) y varios hilos por proceso.
+
+Por operación reporta rendimiento y latencias p50/p95/p99; en total, la espera
+por el bloqueo de escritura (data.conexion.transaccion) y el crecimiento de la
+base. El resultado se guarda en JSON para comparar versiones:
+
+    python benchmarks/bench_checkout.py --salida base.json
+    python benchmarks/bench_checkout.py --salida nuevo.json --comparar base.json
+
+Uso: python benchmarks/bench_checkout.py --procesos 4 --hilos 2 --operaciones 250
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+# Agregamos la carpeta raíz al path para que Python encuentre 'data' y 'controllers'
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(RAIZ)
+
+from data import conexion
+
+OPERACIONES = ('venta', 'devolucion', 'compra', 'movimiento')
+
+
+def leer_mezcla(texto):
+    """'venta=80,devolucion=5,...' -> {operacion: peso}"""
+    mezcla = {}
+    for parte in texto.split(','):
+        nombre, _, peso = parte.partition('=')
+        nombre = nombre.strip()
+        if nombre not in OPERACIONES:
+            raise argparse.ArgumentTypeError(f"Operación desconocida: {nombre}")
+        mezcla[nombre] = float(peso or 1)
+    return mezcla
+
+
+def tamano_base(ruta):
+    """Bytes de la base tras volcar el WAL al archivo principal."""
+    conn = sqlite3.connect(ruta)
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+    return sum(os.path.getsize(ruta + sufijo) for sufijo in ('', '-wal') if os.path.exists(ruta + sufijo))
+
+
+# ==========================================
+# SIEMBRA
+# ==========================================
+def sembrar(ruta, args):
+    conexion.DB_PATH = ruta
+    conexion.inicializar_base_de_datos()
+    from controllers.cost_controller import CostController
+    from controllers.stats_controller import StatsController
+
+    azar = random.Random(args.semilla)
+    ahora = datetime.now()
+    with conexion.transaccion() as cursor:
+        cursor.executemany("INSERT INTO categorias (nombre) VALUES (?)", [(f"Categoría {i}",) for i in range(20)])
+        cursor.executemany("INSERT INTO proveedores (rif, razon_social) VALUES (?, ?)",
+                           [(f"J-{i:08d}", f"Proveedor {i}") for i in range(args.proveedores)])
+        cursor.executemany("INSERT INTO clientes (cedula_rif, nombre) VALUES (?, ?)",
+                           [(f"V-{i:08d}", f"Cliente {i}") for i in range(args.clientes)])
+
+        productos = [(f"P{i:06d}", f"Producto {i}", round(azar.uniform(0.5, 50), 2), azar.random() < 0.1,
+                      azar.randint(1, 20), azar.randint(1, args.proveedores)) for i in range(args.productos)]
+        cursor.executemany("""
+            INSERT INTO productos (codigo_interno, descripcion, precio_usd, es_exento, categoria_id, proveedor_id)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, productos)
+        cursor.execute("SELECT id, precio_usd FROM productos")
+        precios = {row[0]: row[1] for row in cursor.fetchall()}
+
+        # Inventario inicial con su capa de costo (como lo dejaría una compra)
+        fecha = ahora.strftime("%Y-%m-%d %H:%M:%S")
+        CostController.registrar_entrada(cursor, [(pid, 1000000, precio * 0.7) for pid, precio in precios.items()],
+                                         'INICIAL', 'SIEMBRA', fecha)
+        cursor.execute("UPDATE productos SET stock_actual = 1000000")
+
+        # Historial de ventas (directo a las tablas: solo da volumen a índices y resúmenes)
+        ids = list(precios)
+        for n in range(args.historia):
+            fecha = (ahora - timedelta(days=azar.uniform(1, args.dias))).strftime("%Y-%m-%d %H:%M:%S")
+            lineas = [(pid, azar.randint(1, 3)) for pid in azar.sample(ids, azar.randint(1, 6))]
+            subtotal = sum(cant * precios[pid] for pid, cant in lineas)
+            cursor.execute("""
+                INSERT INTO documentos (tipo_doc, nro_documento, nro_control, cliente_id, fecha, tasa_cambio_momento,
+                                        subtotal_usd, impuesto_iva_usd, impuesto_igtf_usd, total_usd, metodo_pago)
+                VALUES ('FACTURA', ?, ?, ?, ?, 36.5, ?, ?, 0, ?, ?)
+            """, (f"HIS-{n:08d}", f"HC-{n:08d}", azar.randint(1, args.clientes), fecha,
+                  subtotal, subtotal * 0.16, subtotal * 1.16, azar.choice(('EFECTIVO USD', 'PUNTO', 'PAGO MOVIL'))))
+            doc_id = cursor.lastrowid
+            cursor.executemany("""
+                INSERT INTO documento_detalles (documento_id, producto_id, cantidad, precio_unitario_usd, costo_usd, margen_usd)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(doc_id, pid, cant, precios[pid], cant * precios[pid] * 0.7, cant * precios[pid] * 0.3)
+                  for pid, cant in lineas])
+
+    StatsController.reconstruir_resumenes()
+    conexion.cerrar_conexiones_libres()
+    return ids
+
+
+# ==========================================
+# CARGA
+# ==========================================
+class Operador:
+    """Un hilo de una terminal: ejecuta operaciones al azar según la mezcla."""
+
+    def __init__(self, numero, hilo, productos, args, sesion_id):
+        self.numero, self.hilo = numero, hilo
+        self.productos = productos
+        self.args = args
+        self.sesion_id = sesion_id
+        self.azar = random.Random(args.semilla * 1000 + numero * 100 + hilo)
+        self.facturas = []  # facturas propias, candidatas a devolución
+        self.compras = 0
+        self.resultados = {op: {'latencias': [], 'fallos': 0, 'bloqueos': 0} for op in OPERACIONES}
+
+    def venta(self):
+        from controllers.sales_controller import SalesController
+        carrito = [{'id': pid, 'cantidad': self.azar.randint(1, 3), 'precio_usd': 1.0}
+                   for pid in self.azar.sample(self.productos, self.azar.randint(1, self.args.lineas))]
+        subtotal = sum(item['cantidad'] * item['precio_usd'] for item in carrito)
+        totales = {'subtotal': subtotal, 'iva': subtotal * 0.16, 'igtf': 0, 'total': subtotal * 1.16}
+        pago = {'metodo_pago': 'EFECTIVO USD', 'cliente_id': self.azar.randint(1, self.args.clientes),
+                'recibido_usd': totales['total'], 'pago_usd_efectivo': totales['total']}
+        inicio = time.perf_counter()
+        exito, resultado = SalesController.registrar_venta(carrito, pago, totales, 36.5)
+        if exito: self.facturas.append(resultado)
+        return inicio, exito, resultado
+
+    def devolucion(self):
+        from controllers.returns_controller import ReturnsController
+        nro = self.facturas.pop(self.azar.randrange(len(self.facturas)))
+        datos, msg = ReturnsController.buscar_factura(nro)
+        if not datos:
+            return time.perf_counter(), False, msg
+        linea = datos['detalles'][0]
+        item = {'producto_id': linea['producto_id'], 'cantidad': 1, 'precio_usd': linea['precio_unitario_usd'],
+                'es_exento': linea['es_exento'], 'detalle_id': linea['detalle_id']}
+        inicio = time.perf_counter()
+        exito, resultado = ReturnsController.procesar_devolucion(nro, [item], 'Efectivo USD', item['precio_usd'] * 1.16)
+        return inicio, exito, resultado
+
+    def compra(self):
+        from controllers.purchases_controller import PurchasesController
+        self.compras += 1
+        carrito = [{'id': pid, 'cantidad': self.azar.randint(10, 100), 'costo_bs': self.azar.uniform(10, 1000)}
+                   for pid in self.azar.sample(self.productos, self.azar.randint(3, 10))]
+        total = sum(item['cantidad'] * item['costo_bs'] for item in carrito)
+        datos = {'proveedor_id': self.azar.randint(1, self.args.proveedores),
+                 'nro_factura': f"B{self.numero:02d}{self.hilo:02d}-{self.compras:06d}",
+                 'nro_control': f"C{self.numero:02d}{self.hilo:02d}-{self.compras:06d}",
+                 'fecha_emision': datetime.now().strftime("%Y-%m-%d"), 'tasa_cambio': 36.5,
+                 'total_compra_bs': total * 1.16, 'base_imponible_bs': total, 'monto_exento_bs': 0,
+                 'impuesto_iva_bs': total * 0.16}
+        inicio = time.perf_counter()
+        exito, resultado = PurchasesController.registrar_compra(datos, carrito)
+        return inicio, exito, resultado
+
+    def movimiento(self):
+        from controllers.cash_controller import CashController
+        tipo = self.azar.choice(('INGRESO', 'EGRESO'))
+        inicio = time.perf_counter()
+        exito, resultado = CashController.registrar_movimiento(self.sesion_id, tipo, 1.0, 0, 0, "Carga sintética")
+        return inicio, exito, resultado
+
+    def ejecutar(self, mezcla, barrera):
+        nombres, pesos = list(mezcla), list(mezcla.values())
+        barrera.wait()
+        for _ in range(self.args.operaciones):
+            operacion = self.azar.choices(nombres, pesos)[0]
+            # Sin facturas propias todavía no hay nada que devolver
+            if operacion == 'devolucion' and not self.facturas:
+                operacion = 'venta'
+            inicio, exito, resultado = getattr(self, operacion)()
+            datos = self.resultados[operacion]
+            datos['latencias'].append((time.perf_counter() - inicio) * 1000)
+            if not exito:
+                datos['fallos'] += 1
+                datos['bloqueos'] += 'locked' in str(resultado)
+
+
+def terminal(numero, ruta, productos, args, mezcla, barrera, cola):
+    """Proceso de una caja: abre su sesión y lanza `hilos` operadores."""
+    conexion.DB_PATH = ruta
+    from controllers.terminal_controller import TerminalController
+    from controllers.cash_controller import CashController
+
+    TerminalController.configurar(f"CARGA-{numero:02d}")
+    # Fondo amplio: las devoluciones en efectivo no deben fallar por saldo
+    exito, msg = CashController.abrir_caja(1, 1000000.0, 0.0, 0.0)
+    sesion = CashController.obtener_sesion_activa()
+    if not exito or not sesion:
+        barrera.abort()
+        cola.put({'terminal': numero, 'error': msg})
+        return
+
+    operadores = [Operador(numero, h, productos, args, sesion['id']) for h in range(args.hilos)]
+    hilos = [threading.Thread(target=op.ejecutar, args=(mezcla, barrera)) for op in operadores]
+    for h in hilos: h.start()
+    for h in hilos: h.join()
+
+    resultados = {op: {'latencias': [], 'fallos': 0, 'bloqueos': 0} for op in OPERACIONES}
+    for operador in operadores:
+        for op, datos in operador.resultados.items():
+            resultados[op]['latencias'] += datos['latencias']
+            resultados[op]['fallos'] += datos['fallos']
+            resultados[op]['bloqueos'] += datos['bloqueos']
+    cola.put({'terminal': numero, 'resultados': resultados, 'pool': conexion.obtener_estadisticas_pool()})
+
+
+# ==========================================
+# REPORTE
+# ==========================================
+def percentil(valores, p):
+    return valores[min(len(valores) - 1, int(len(valores) * p))] if valores else 0.0
+
+
+def version_codigo():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=RAIZ,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def resumir(informes, duracion, tamano_inicial, tamano_final, args):
+    por_operacion = {}
+    for op in OPERACIONES:
+        latencias = sorted(l for i in informes for l in i['resultados'][op]['latencias'])
+        if not latencias: continue
+        fallos = sum(i['resultados'][op]['fallos'] for i in informes)
+        por_operacion[op] = {
+            'cantidad': len(latencias),
+            'fallos': fallos,
+            'database_is_locked': sum(i['resultados'][op]['bloqueos'] for i in informes),
+            'por_seg': round((len(latencias) - fallos) / duracion, 1),
+            'media_ms': round(sum(latencias) / len(latencias), 3),
+            'p50_ms': round(percentil(latencias, 0.50), 3),
+            'p95_ms': round(percentil(latencias, 0.95), 3),
+            'p99_ms': round(percentil(latencias, 0.99), 3),
+            'max_ms': round(latencias[-1], 3),
+        }
+    total = sum(d['cantidad'] for d in por_operacion.values())
+    transacciones = sum(i['pool']['transacciones'] for i in informes)
+    espera = sum(i['pool']['espera_escritura_ms'] for i in informes)
+    return {
+        'version': version_codigo(),
+        'fecha': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'entorno': {'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version, 'sistema': platform.platform()},
+        'parametros': {k: v for k, v in vars(args).items() if k not in ('salida', 'comparar')},
+        'duracion_s': round(duracion, 3),
+        'operaciones_por_seg': round(total / duracion, 1),
+        'operaciones': por_operacion,
+        'espera_escritura': {
+            'transacciones': transacciones,
+            'total_ms': round(espera, 3),
+            'media_ms': round(espera / transacciones, 3) if transacciones else 0.0,
+        },
+        'base_de_datos': {
+            'bytes_inicial': tamano_inicial,
+            'bytes_final': tamano_final,
+            'bytes_por_operacion': round((tamano_final - tamano_inicial) / total, 1) if total else 0.0,
+        },
+    }
+
+
+def imprimir(resumen, base=None):
+    print(f"{resumen['parametros']['procesos']} terminales x {resumen['parametros']['hilos']} hilos x "
+          f"{resumen['parametros']['operaciones']} operaciones  ({resumen['duracion_s']} s, "
+          f"{resumen['operaciones_por_seg']} op/s)")
+    print(f"{'Operación':<12}{'cant':>8}{'fallos':>8}{'locked':>8}{'op/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for op, d in resumen['operaciones'].items():
+        print(f"{op:<12}{d['cantidad']:>8}{d['fallos']:>8}{d['database_is_locked']:>8}{d['por_seg']:>10}"
+              f"{d['p50_ms']:>10}{d['p95_ms']:>10}{d['p99_ms']:>10}")
+    espera, base_datos = resumen['espera_escritura'], resumen['base_de_datos']
+    print(f"Espera de escritura: {espera['total_ms']} ms en {espera['transacciones']} transacciones "
+          f"(media {espera['media_ms']} ms)")
+    print(f"Base de datos: {base_datos['bytes_inicial']:,} -> {base_datos['bytes_final']:,} bytes "
+          f"({base_datos['bytes_por_operacion']} bytes/op)")
+
+    if base:
+        print(f"\nComparación con {base.get('version') or 'la base'} ({base.get('fecha')}):")
+        for op, d in resumen['operaciones'].items():
+            anterior = base.get('operaciones', {}).get(op)
+            if not anterior: continue
+            cambio_p95 = (d['p95_ms'] / anterior['p95_ms'] - 1) * 100 if anterior['p95_ms'] else 0
+            cambio_ops = (d['por_seg'] / anterior['por_seg'] - 1) * 100 if anterior['por_seg'] else 0
+            print(f"  {op:<12} p95 {anterior['p95_ms']} -> {d['p95_ms']} ms ({cambio_p95:+.1f}%)   "
+                  f"op/s {anterior['por_seg']} -> {d['por_seg']} ({cambio_ops:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--procesos', type=int, default=4, help="terminales (procesos) simultáneas")
+    parser.add_argument('--hilos', type=int, default=1, help="hilos por terminal")
+    parser.add_argument('--operaciones', type=int, default=250, help="operaciones por hilo")
+    parser.add_argument('--mezcla', type=leer_mezcla, default='venta=80,devolucion=5,compra=5,movimiento=10')
+    parser.add_argument('--lineas', type=int, default=8, help="máximo de líneas por venta")
+    parser.add_argument('--productos', type=int, default=5000)
+    parser.add_argument('--clientes', type=int, default=2000)
+    parser.add_argument('--proveedores', type=int, default=50)
+    parser.add_argument('--historia', type=int, default=20000, help="documentos históricos sembrados")
+    parser.add_argument('--dias', type=int, default=365, help="días de historial")
+    parser.add_argument('--semilla', type=int, default=7)
+    parser.add_argument('--salida', help="archivo JSON donde guardar el resultado")
+    parser.add_argument('--comparar', help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix="pegasus_bench_")
+    ruta = os.path.join(carpeta, "bench.db")
+    try:
+        print(f"Sembrando {args.productos:,} productos, {args.clientes:,} clientes y {args.historia:,} documentos...")
+        productos = sembrar(ruta, args)
+        tamano_inicial = tamano_base(ruta)
+
+        barrera = multiprocessing.Barrier(args.procesos * args.hilos + 1)
+        cola = multiprocessing.Queue()
+        procesos = [multiprocessing.Process(target=terminal, args=(n, ruta, productos, args, args.mezcla, barrera, cola))
+                    for n in range(1, args.procesos + 1)]
+        for p in procesos: p.start()
+        try:
+            barrera.wait()
+        except threading.BrokenBarrierError:
+            pass
+        inicio = time.perf_counter()
+        informes = [cola.get() for _ in procesos]
+        duracion = time.perf_counter() - inicio
+        for p in procesos: p.join()
+
+        errores = [i for i in informes if 'error' in i]
+        if errores:
+            for i in errores: print(f"❌ Terminal {i['terminal']}: {i['error']}")
+            sys.exit(1)
+
+        resumen = resumir(informes, duracion, tamano_inicial, tamano_base(ruta), args)
+
+        base = None
+        if args.comparar:
+            with open(args.comparar, encoding='utf-8') as f:
+                base = json.load(f)
+        imprimir(resumen, base)
+        if args.salida:
+            with open(args.salida, 'w', encoding='utf-8') as f:
+                json.dump(resumen, f, ensure_ascii=False, indent=2)
+            print(f"Resultado guardado en {args.salida}")
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark: filtros por fecha con funciones (date()/strftime()) vs rangos semiabiertos.
+
+Crea una base temporal con documentos sintéticos, aplica los índices de
+data.conexion y compara las consultas de StatsController/FiscalBooksController
+antes y después del cambio.
+
+Uso: python benchmarks/bench_date_range.py --docs 2000000
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Agregamos la carpeta raíz al path para que Python encuentre 'data' y 'controllers'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data.conexion import MIGRACIONES_INDICES
+from controllers.date_utils import rango_dia, rango_ultimos_dias, rango_mes, filtro_rango
+
+
+def poblar(conn, total_docs, dias_historia):
+    conn.execute("""CREATE TABLE documentos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, tipo_doc TEXT, nro_documento TEXT, fecha DATETIME,
+        total_usd REAL, metodo_pago TEXT, estado TEXT DEFAULT 'PROCESADO'
+    )""")
+    # Tablas mínimas para que las migraciones de índices apliquen completas
+    conn.execute("CREATE TABLE documento_detalles (id INTEGER PRIMARY KEY, documento_id INTEGER, producto_id INTEGER, cantidad REAL, precio_unitario_usd REAL)")
+    conn.execute("CREATE TABLE inventario_kardex (id INTEGER PRIMARY KEY, producto_id INTEGER, fecha DATETIME)")
+    conn.execute("CREATE TABLE caja_kardex (id INTEGER PRIMARY KEY, sesion_id INTEGER, operacion TEXT)")
+    conn.execute("CREATE TABLE caja_movimientos (id INTEGER PRIMARY KEY, sesion_id INTEGER)")
+    conn.execute("CREATE TABLE caja_sesiones (id INTEGER PRIMARY KEY, usuario_id INTEGER, estado TEXT)")
+    conn.execute("CREATE TABLE productos (id INTEGER PRIMARY KEY, descripcion TEXT, estado INTEGER)")
+    conn.execute("CREATE TABLE clientes (id INTEGER PRIMARY KEY, nombre TEXT)")
+
+    inicio = datetime.now() - timedelta(days=dias_historia)
+    paso = dias_historia * 86400 / total_docs
+    tipos = ['FACTURA'] * 8 + ['NOTA_ENTREGA', 'NOTA_CREDITO']
+    metodos = ['EFECTIVO', 'PUNTO', 'ZELLE', 'MIXTO']
+
+    def filas():
+        for i in range(total_docs):
+            fecha = inicio + timedelta(seconds=i * paso)
+            yield (random.choice(tipos), f"DOC-{i:09d}", fecha.strftime("%Y-%m-%d %H:%M:%S"),
+                   round(random.uniform(1, 200), 2), random.choice(metodos))
+
+    conn.executemany("INSERT INTO documentos (tipo_doc, nro_documento, fecha, total_usd, metodo_pago) VALUES (?, ?, ?, ?, ?)", filas())
+    for _, sentencias in MIGRACIONES_INDICES:
+        for sql in sentencias:
+            conn.execute(sql)
+    conn.execute("ANALYZE")
+    conn.commit()
+
+
+def medir(conn, sql, params, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        conn.execute(sql, params).fetchall()
+    return (time.perf_counter() - inicio) / repeticiones * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=1_000_000, help="Cantidad de documentos sintéticos")
+    parser.add_argument('--dias', type=int, default=730, help="Días de historia a repartir")
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    ruta = os.path.join(tempfile.mkdtemp(prefix="pegasus_bench_"), "bench.db")
+    conn = sqlite3.connect(ruta)
+    print(f"Poblando {args.docs:,} documentos en {ruta}...")
+    t0 = time.perf_counter()
+    poblar(conn, args.docs, args.dias)
+    print(f"  listo en {time.perf_counter() - t0:.1f}s\n")
+
+    hoy = datetime.now().strftime("%Y-%m-%d")
+    ahora = datetime.now()
+    dias_semana = [(ahora - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(6, -1, -1)]
+
+    casos = [
+        ("KPI ventas de hoy",
+         lambda r: medir(conn, "SELECT SUM(total_usd), COUNT(*) FROM documentos WHERE date(fecha) = ? AND tipo_doc = 'FACTURA'", (hoy,), r),
+         lambda r: medir(conn, f"SELECT SUM(total_usd), COUNT(*) FROM documentos WHERE tipo_doc = 'FACTURA' AND {filtro_rango()}", rango_dia(), r)),
+        ("Ventas de la semana (7 días)",
+         lambda r: sum(medir(conn, "SELECT SUM(total_usd) FROM documentos WHERE date(fecha) = ? AND tipo_doc = 'FACTURA'", (d,), r) for d in dias_semana),
+         lambda r: medir(conn, f"SELECT substr(fecha, 1, 10) as dia, SUM(total_usd) FROM documentos WHERE tipo_doc = 'FACTURA' AND {filtro_rango()} GROUP BY dia", rango_ultimos_dias(7), r)),
+        ("Libro de ventas del mes",
+         lambda r: medir(conn, "SELECT id, fecha, total_usd FROM documentos d WHERE d.tipo_doc = 'FACTURA' AND strftime('%m', d.fecha) = ? AND strftime('%Y', d.fecha) = ? ORDER BY d.fecha, d.id",
+                         (str(ahora.month).zfill(2), str(ahora.year)), r),
+         lambda r: medir(conn, f"SELECT id, fecha, total_usd FROM documentos d WHERE d.tipo_doc = 'FACTURA' AND {filtro_rango('d.fecha')} ORDER BY d.fecha, d.id",
+                         rango_mes(ahora.month, ahora.year), r)),
+    ]
+
+    print(f"{'Consulta':<32}{'Antes (ms)':>12}{'Después (ms)':>14}{'Mejora':>10}")
+    for nombre, antes, despues in casos:
+        t_antes = antes(args.repeticiones)
+        t_despues = despues(args.repeticiones)
+        mejora = t_antes / t_despues if t_despues else float('inf')
+        print(f"{nombre:<32}{t_antes:>12.2f}{t_despues:>14.2f}{mejora:>9.1f}x")
+
+    conn.close()
+    shutil.rmtree(os.path.dirname(ruta), ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
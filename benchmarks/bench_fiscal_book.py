@@ -0,0 +1,145 @@
+"""
+Benchmark: exportación del libro de ventas a Excel para un mes grande.
+Compara la ruta anterior (subconsulta correlacionada por factura + fetchall +
+Workbook en memoria con estilos celda por celda) con la exportación en
+streaming de FiscalBooksController (GROUP BY + fetchmany + write_only).
+Mide tiempo y pico de memoria de Python (tracemalloc).
+
+Uso: python benchmarks/bench_fiscal_book.py --facturas 100000
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+# Agregamos la carpeta raíz al path para que Python encuentre 'data' y 'controllers'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import openpyxl
+from openpyxl.styles import Border, Side
+from data import conexion
+from controllers.date_utils import rango_mes, filtro_rango
+from controllers.fiscal_books_controller import FiscalBooksController
+
+MES, ANIO = 3, 2025
+
+
+def poblar(total_facturas, lineas_por_factura):
+    with conexion.transaccion() as cursor:
+        cursor.execute("UPDATE configuracion SET rif = 'J-12345678-9', razon_social = 'EMPRESA BENCH'")
+        cursor.execute("INSERT INTO clientes (cedula_rif, nombre) VALUES ('V-1', 'CLIENTE BENCH')")
+        cliente_id = cursor.lastrowid
+        cursor.executemany("INSERT INTO productos (codigo_interno, descripcion, precio_usd, es_exento) VALUES (?, ?, 1.0, ?)",
+                           ((f"P{i:05d}", f"Producto {i}", 1 if i % 3 == 0 else 0) for i in range(3000)))
+
+        inicio = datetime(ANIO, MES, 1)
+        paso = 30 * 86400 / total_facturas
+        cursor.executemany("""
+            INSERT INTO documentos (tipo_doc, nro_documento, nro_control, cliente_id, fecha, tasa_cambio_momento,
+                                    total_usd, impuesto_iva_usd, estado)
+            VALUES ('FACTURA', ?, ?, ?, ?, 36.5, ?, ?, ?)
+        """, ((f"FAC-{i:08d}", f"00-{i:08d}", cliente_id,
+               (inicio + timedelta(seconds=i * paso)).strftime("%Y-%m-%d %H:%M:%S"),
+               round(random.uniform(5, 300), 2), round(random.uniform(0, 40), 2),
+               'ANULADO' if i % 97 == 0 else 'PROCESADO') for i in range(total_facturas)))
+
+        cursor.execute("SELECT id FROM documentos")
+        ids = [row[0] for row in cursor.fetchall()]
+        cursor.executemany("INSERT INTO documento_detalles (documento_id, producto_id, cantidad, precio_unitario_usd) VALUES (?, ?, ?, 1.0)",
+                           ((doc_id, random.randint(1, 3000), random.randint(1, 5))
+                            for doc_id in ids for _ in range(lineas_por_factura)))
+    with conexion.transaccion() as cursor:
+        cursor.execute("ANALYZE")
+
+
+def excel_anterior(ruta):
+    """Ruta anterior de generar_excel_libro_ventas (referencia)."""
+    conn = conexion.crear_conexion()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT d.fecha, c.cedula_rif, c.nombre, d.nro_documento, d.nro_control, d.estado, d.total_usd,
+                   d.impuesto_iva_usd, d.tasa_cambio_momento, d.iva_retenido_bs, d.documento_referencia,
+                   COALESCE((SELECT SUM(dd.cantidad * dd.precio_unitario_usd) FROM documento_detalles dd
+                             JOIN productos p ON dd.producto_id = p.id
+                             WHERE dd.documento_id = d.id AND p.es_exento = 1), 0) as exento_usd
+            FROM documentos d JOIN clientes c ON d.cliente_id = c.id
+            WHERE d.tipo_doc = 'FACTURA' AND {filtro_rango('d.fecha')}
+            ORDER BY d.fecha ASC, d.id ASC
+        """, rango_mes(MES, ANIO))
+        facturas = cursor.fetchall()
+
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+        ws.append(["Encabezado"]); ws.append([])
+        fila_actual = 3
+        for i, fac in enumerate(facturas, start=1):
+            tasa = fac['tasa_cambio_momento']
+            es_anulada = fac['estado'] == 'ANULADO'
+            total_bs = 0 if es_anulada else fac['total_usd'] * tasa
+            exento_bs = 0 if es_anulada else fac['exento_usd'] * tasa
+            iva_bs = 0 if es_anulada else fac['impuesto_iva_usd'] * tasa
+            fila = [i, fac['fecha'], fac['cedula_rif'], fac['nombre'], fac['nro_documento'], fac['nro_control'],
+                    "02-ANU" if es_anulada else "01-REG", "", round(total_bs, 2), round(exento_bs, 2),
+                    round(total_bs - exento_bs - iva_bs, 2), round(iva_bs, 2), 0, ""]
+            ws.append(fila)
+            for col_num in range(1, len(fila) + 1): ws.cell(row=fila_actual, column=col_num).border = border
+            for col_num in range(9, 14): ws.cell(row=fila_actual, column=col_num).number_format = '#,##0.00'
+            fila_actual += 1
+        wb.save(ruta)
+        return True, ""
+    finally:
+        conn.close()
+
+
+def medir(funcion, con_memoria):
+    """Tiempo en una corrida limpia; el pico de memoria en otra, porque tracemalloc la hace mucho más lenta."""
+    inicio = time.perf_counter()
+    exito, msg = funcion()
+    segundos = time.perf_counter() - inicio
+    if not exito: raise RuntimeError(msg)
+    if not con_memoria: return segundos, None
+
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return segundos, pico / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--facturas', type=int, default=100000)
+    parser.add_argument('--lineas', type=int, default=3, help="líneas de detalle por factura")
+    parser.add_argument('--semilla', type=int, default=7)
+    parser.add_argument('--sin-memoria', action='store_true', help="no medir el pico de memoria (segunda corrida)")
+    args = parser.parse_args()
+
+    random.seed(args.semilla)
+    carpeta = tempfile.mkdtemp(prefix="pegasus_bench_")
+    try:
+        conexion.DB_PATH = os.path.join(carpeta, "bench.db")
+        conexion.inicializar_base_de_datos()
+        poblar(args.facturas, args.lineas)
+
+        print(f"Libro de ventas de {args.facturas:,} facturas ({args.lineas} líneas c/u)")
+        print(f"{'Ruta':<22}{'tiempo (s)':>12}{'pico mem (MB)':>16}")
+        for etiqueta, funcion in (
+            ("anterior", lambda: excel_anterior(os.path.join(carpeta, "anterior.xlsx"))),
+            ("streaming", lambda: FiscalBooksController.generar_excel_libro_ventas(MES, ANIO, os.path.join(carpeta, "streaming.xlsx"))),
+        ):
+            segundos, pico = medir(funcion, not args.sin_memoria)
+            texto_pico = f"{pico:.1f}" if pico is not None else "-"
+            print(f"{etiqueta:<22}{segundos:>12.2f}{texto_pico:>16}")
+    finally:
+        conexion.cerrar_conexiones_libres()
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark: tiempo con el bloqueo de escritura tomado al registrar las líneas de
+una venta, por línea (4 sentencias por ítem) vs en bloque
+(InventoryController.aplicar_movimientos_lote).
+
+Uso: python benchmarks/bench_sale_lines.py --lineas 200 --ventas 50
+"""
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Agregamos la carpeta raíz al path para que Python encuentre 'data' y 'controllers'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data import conexion
+from controllers.inventory_controller import InventoryController
+
+
+def venta_por_linea(cursor, doc_id, carrito, referencia, fecha):
+    """Ruta anterior de SalesController.registrar_venta (referencia)."""
+    for item in carrito:
+        cursor.execute("INSERT INTO documento_detalles (documento_id, producto_id, cantidad, precio_unitario_usd) VALUES (?, ?, ?, ?)",
+                       (doc_id, item['id'], item['cantidad'], item['precio_usd']))
+        cursor.execute("UPDATE productos SET stock_actual = stock_actual - ? WHERE id = ?", (item['cantidad'], item['id']))
+        cursor.execute("SELECT stock_actual FROM productos WHERE id=?", (item['id'],))
+        stock_resultante = cursor.fetchone()[0]
+        cursor.execute("""
+            INSERT INTO inventario_kardex (producto_id, tipo_movimiento, cantidad, stock_resultante, motivo, referencia, fecha, usuario_id)
+            VALUES (?, 'SALIDA', ?, ?, 'VENTA', ?, ?, 1)
+        """, (item['id'], item['cantidad'], stock_resultante, referencia, fecha))
+
+
+def venta_en_bloque(cursor, doc_id, carrito, referencia, fecha):
+    cursor.executemany("INSERT INTO documento_detalles (documento_id, producto_id, cantidad, precio_unitario_usd) VALUES (?, ?, ?, ?)",
+                       [(doc_id, item['id'], item['cantidad'], item['precio_usd']) for item in carrito])
+    InventoryController.aplicar_movimientos_lote(
+        cursor, [(item['id'], item['cantidad']) for item in carrito], 'SALIDA', 'VENTA', referencia, fecha
+    )
+
+
+def medir(estrategia, productos, args, etiqueta):
+    tiempos = []
+    for n in range(args.ventas):
+        carrito = [{'id': pid, 'cantidad': 1, 'precio_usd': 1.0} for pid in random.sample(productos, args.lineas)]
+        fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        inicio = time.perf_counter()
+        with conexion.transaccion() as cursor:
+            cursor.execute("INSERT INTO documentos (tipo_doc, nro_documento, fecha, total_usd) VALUES ('FACTURA', ?, ?, 0)",
+                           (f"{etiqueta}-{n:08d}", fecha))
+            estrategia(cursor, cursor.lastrowid, carrito, f"{etiqueta}-{n:08d}", fecha)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return tiempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--productos', type=int, default=30000)
+    parser.add_argument('--lineas', type=int, default=200)
+    parser.add_argument('--ventas', type=int, default=50)
+    parser.add_argument('--semilla', type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{args.ventas} ventas de {args.lineas} líneas sobre {args.productos:,} productos")
+    print(f"{'Estrategia':<14}{'media (ms)':>12}{'p95 (ms)':>12}{'máx (ms)':>12}")
+    for etiqueta, estrategia in (("por línea", venta_por_linea), ("en bloque", venta_en_bloque)):
+        # Base nueva por estrategia para que ambas partan del mismo tamaño
+        carpeta = tempfile.mkdtemp(prefix="pegasus_bench_")
+        conexion.DB_PATH = os.path.join(carpeta, "bench.db")
+        conexion.inicializar_base_de_datos()
+        with conexion.transaccion() as cursor:
+            cursor.executemany("INSERT INTO productos (codigo_interno, descripcion, precio_usd, stock_actual) VALUES (?, ?, 1.0, 1000000)",
+                               ((f"P{i:06d}", f"Producto {i}") for i in range(args.productos)))
+            cursor.execute("SELECT id FROM productos")
+            productos = [row[0] for row in cursor.fetchall()]
+
+        random.seed(args.semilla)
+        tiempos = sorted(medir(estrategia, productos, args, etiqueta.replace(" ", "")))
+        p95 = tiempos[int(len(tiempos) * 0.95) - 1]
+        print(f"{etiqueta:<14}{statistics.mean(tiempos):>12.2f}{p95:>12.2f}{tiempos[-1]:>12.2f}")
+
+        conexion.cerrar_conexiones_libres()
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Prueba de estrés de la numeración fiscal: N terminales (procesos) emiten
+facturas, notas de entrega y notas de crédito a la vez; una parte de las
+ventas falla a propósito (producto inexistente) para comprobar que el
+rollback devuelve el número. La mitad de las terminales usa un rango propio
+de números de control.
+
+Al final SequenceController.verificar() debe reportar cero duplicados y cero
+saltos en cada serie; el proceso termina con código 1 si no es así.
+
+Uso: python benchmarks/bench_sequences.py --terminales 6 --documentos 300
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# Agregamos la carpeta raíz al path para que Python encuentre 'data' y 'controllers'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data import conexion
+
+TAMANO_RANGO = 100000
+
+
+def preparar_base(ruta, productos):
+    conexion.DB_PATH = ruta
+    conexion.inicializar_base_de_datos()
+    with conexion.transaccion() as cursor:
+        cursor.executemany("INSERT INTO productos (codigo_interno, descripcion, precio_usd, stock_actual) VALUES (?, ?, 1.0, 1000000)",
+                           ((f"P{i:06d}", f"Producto {i}") for i in range(productos)))
+        cursor.execute("SELECT id FROM productos")
+        ids = [row[0] for row in cursor.fetchall()]
+    conexion.cerrar_conexiones_libres()
+    return ids
+
+
+def terminal(numero, ruta, productos, args, barrera, resultados):
+    conexion.DB_PATH = ruta
+    from controllers.terminal_controller import TerminalController
+    from controllers.cash_controller import CashController
+    from controllers.sales_controller import SalesController
+    from controllers.returns_controller import ReturnsController
+    from controllers.sequence_controller import SequenceController
+
+    TerminalController.configurar(f"CAJA-{numero:02d}")
+    terminal_id = TerminalController.actual()['id']
+    # Terminales pares: rango propio de números de control
+    if numero % 2 == 0:
+        exito, msg = SequenceController.asignar_rango_control(terminal_id, numero * TAMANO_RANGO, (numero + 1) * TAMANO_RANGO - 1)
+        if not exito:
+            resultados.put({'terminal': numero, 'error': msg})
+            return
+    CashController.abrir_caja(1, 1000000.0, 0.0, 0.0)
+
+    azar = random.Random(args.semilla + numero)
+    facturas, conteo = [], {'ventas': 0, 'notas_entrega': 0, 'devoluciones': 0, 'fallidas_a_proposito': 0, 'errores': []}
+    barrera.wait()
+    for _ in range(args.documentos):
+        dado = azar.random()
+        if dado < 0.1 and facturas:
+            nro = facturas.pop()
+            datos, msg = ReturnsController.buscar_factura(nro)
+            linea = datos['detalles'][0]
+            item = {'producto_id': linea['producto_id'], 'cantidad': 1, 'precio_usd': linea['precio_unitario_usd'],
+                    'es_exento': linea['es_exento'], 'detalle_id': linea['detalle_id']}
+            exito, resultado = ReturnsController.procesar_devolucion(nro, [item], 'Saldo a Favor', 1.16)
+            clave = 'devoluciones'
+        else:
+            tipo_doc = 'NOTA_ENTREGA' if dado > 0.85 else 'FACTURA'
+            carrito = [{'id': pid, 'cantidad': 1, 'precio_usd': 1.0} for pid in azar.sample(productos, 3)]
+            # Venta que falla dentro de la transacción, después de tomar el número
+            falla = azar.random() < args.fallas
+            if falla:
+                carrito.append({'id': -1, 'cantidad': 1, 'precio_usd': 1.0})
+            totales = {'subtotal': len(carrito), 'iva': 0, 'igtf': 0, 'total': len(carrito)}
+            exito, resultado = SalesController.registrar_venta(carrito, {'metodo_pago': 'EFECTIVO USD', 'cliente_id': 1},
+                                                               totales, 36.5, tipo_doc)
+            if falla:
+                if exito: conteo['errores'].append(f"La venta con producto inexistente no falló: {resultado}")
+                conteo['fallidas_a_proposito'] += 1
+                continue
+            clave = 'ventas' if tipo_doc == 'FACTURA' else 'notas_entrega'
+            if exito and tipo_doc == 'FACTURA': facturas.append(resultado)
+        if exito:
+            conteo[clave] += 1
+        else:
+            conteo['errores'].append(str(resultado))
+    resultados.put({'terminal': numero, **conteo})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--terminales', type=int, default=6)
+    parser.add_argument('--documentos', type=int, default=300, help="operaciones por terminal")
+    parser.add_argument('--fallas', type=float, default=0.05, help="fracción de ventas que fallan a propósito")
+    parser.add_argument('--productos', type=int, default=500)
+    parser.add_argument('--semilla', type=int, default=7)
+    parser.add_argument('--json', action='store_true', help="imprime el resultado en JSON")
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix="pegasus_bench_")
+    ruta = os.path.join(carpeta, "bench.db")
+    try:
+        productos = preparar_base(ruta, args.productos)
+        barrera = multiprocessing.Barrier(args.terminales + 1)
+        resultados = multiprocessing.Queue()
+        procesos = [multiprocessing.Process(target=terminal, args=(n, ruta, productos, args, barrera, resultados))
+                    for n in range(1, args.terminales + 1)]
+        for p in procesos: p.start()
+        barrera.wait()
+        inicio = time.perf_counter()
+        informes = [resultados.get() for _ in procesos]
+        duracion = time.perf_counter() - inicio
+        for p in procesos: p.join()
+
+        errores = [i for i in informes if 'error' in i]
+        if errores:
+            for i in errores: print(f"❌ Terminal {i['terminal']}: {i['error']}")
+            sys.exit(1)
+
+        conexion.DB_PATH = ruta
+        from controllers.sequence_controller import SequenceController
+        verificacion = SequenceController.verificar()
+        fallos_operacion = [e for i in informes for e in i['errores']]
+        resumen = {
+            'terminales': args.terminales,
+            'duracion_s': round(duracion, 3),
+            'documentos': sum(i['ventas'] + i['notas_entrega'] + i['devoluciones'] for i in informes),
+            'fallidas_a_proposito': sum(i['fallidas_a_proposito'] for i in informes),
+            'errores_inesperados': len(fallos_operacion),
+            'series': {serie: {'emitidos': d['emitidos'], 'duplicados': len(d['duplicados']), 'faltantes': len(d['faltantes'])}
+                       for serie, d in sorted(verificacion.items())},
+        }
+        ok = not fallos_operacion and all(not d['duplicados'] and not d['faltantes'] for d in verificacion.values())
+        resumen['ok'] = ok
+
+        if args.json:
+            print(json.dumps(resumen, ensure_ascii=False))
+        else:
+            print(f"{args.terminales} terminales x {args.documentos} operaciones en {resumen['duracion_s']} s "
+                  f"({resumen['documentos']} documentos, {resumen['fallidas_a_proposito']} ventas revertidas)")
+            print(f"{'Serie':<16}{'emitidos':>10}{'duplicados':>12}{'faltantes':>11}")
+            for serie, d in resumen['series'].items():
+                print(f"{serie:<16}{d['emitidos']:>10}{d['duplicados']:>12}{d['faltantes']:>11}")
+            for error in fallos_operacion[:10]:
+                print(f"❌ {error}")
+            print("✅ Numeración sin duplicados ni saltos." if ok else "❌ La numeración tiene duplicados o saltos.")
+        conexion.cerrar_conexiones_libres()
+        sys.exit(0 if ok else 1)
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Prueba de carga: N terminales (procesos) registran ventas a la vez con
+SalesController.registrar_venta sobre la misma base WAL. Cada terminal abre
+su propia caja, así que los asientos de caja_kardex mueven filas distintas.
+
+Reporta ventas/seg, latencia p50/p95 por venta, fallos y cuántos fueron
+'database is locked'. Al final verifica que los números de documento no se
+repitan y que los saldos de caja cuadren con el kardex (verificar_saldos).
+
+Uso: python benchmarks/bench_terminals.py --terminales 4 --ventas 200
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# Agregamos la carpeta raíz al path para que Python encuentre 'data' y 'controllers'
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data import conexion
+
+
+def preparar_base(ruta, productos):
+    conexion.DB_PATH = ruta
+    conexion.inicializar_base_de_datos()
+    with conexion.transaccion() as cursor:
+        cursor.executemany("INSERT INTO productos (codigo_interno, descripcion, precio_usd, stock_actual) VALUES (?, ?, 1.0, 1000000)",
+                           ((f"P{i:06d}", f"Producto {i}") for i in range(productos)))
+        cursor.execute("SELECT id FROM productos")
+        ids = [row[0] for row in cursor.fetchall()]
+    conexion.cerrar_conexiones_libres()
+    return ids
+
+
+def terminal(numero, ruta, productos, args, barrera, resultados):
+    """Proceso de una caja: abre su sesión y registra `ventas` facturas seguidas."""
+    conexion.DB_PATH = ruta
+    from controllers.terminal_controller import TerminalController
+    from controllers.cash_controller import CashController
+    from controllers.sales_controller import SalesController
+
+    TerminalController.configurar(f"CAJA-{numero:02d}")
+    exito, msg = CashController.abrir_caja(1, 100.0, 0.0, 0.0)
+    if not exito:
+        resultados.put({'terminal': numero, 'error': msg})
+        return
+
+    random.seed(args.semilla + numero)
+    latencias, fallos, bloqueos, documentos = [], 0, 0, []
+    barrera.wait()
+    for _ in range(args.ventas):
+        carrito = [{'id': pid, 'cantidad': 1, 'precio_usd': 1.0} for pid in random.sample(productos, args.lineas)]
+        subtotal = float(args.lineas)
+        totales = {'subtotal': subtotal, 'iva': subtotal * 0.16, 'igtf': 0, 'total': subtotal * 1.16}
+        pago = {'metodo_pago': 'EFECTIVO USD', 'cliente_id': None,
+                'recibido_usd': totales['total'], 'pago_usd_efectivo': totales['total']}
+
+        inicio = time.perf_counter()
+        exito, resultado = SalesController.registrar_venta(carrito, pago, totales, 36.5)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        if exito:
+            documentos.append(resultado)
+        else:
+            fallos += 1
+            bloqueos += 'locked' in str(resultado)
+    resultados.put({'terminal': numero, 'latencias': latencias, 'fallos': fallos,
+                    'bloqueos': bloqueos, 'documentos': documentos})
+
+
+def percentil(valores, p):
+    return valores[min(len(valores) - 1, int(len(valores) * p))] if valores else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--terminales', type=int, default=4)
+    parser.add_argument('--ventas', type=int, default=200, help="ventas por terminal")
+    parser.add_argument('--lineas', type=int, default=5)
+    parser.add_argument('--productos', type=int, default=2000)
+    parser.add_argument('--semilla', type=int, default=7)
+    parser.add_argument('--json', action='store_true', help="imprime el resultado en JSON")
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix="pegasus_bench_")
+    ruta = os.path.join(carpeta, "bench.db")
+    try:
+        productos = preparar_base(ruta, args.productos)
+
+        barrera = multiprocessing.Barrier(args.terminales + 1)
+        resultados = multiprocessing.Queue()
+        procesos = [multiprocessing.Process(target=terminal, args=(n, ruta, productos, args, barrera, resultados))
+                    for n in range(1, args.terminales + 1)]
+        for p in procesos: p.start()
+        barrera.wait()
+        inicio = time.perf_counter()
+        informes = [resultados.get() for _ in procesos]
+        duracion = time.perf_counter() - inicio
+        for p in procesos: p.join()
+
+        errores = [i for i in informes if 'error' in i]
+        if errores:
+            for i in errores: print(f"❌ Terminal {i['terminal']}: {i['error']}")
+            sys.exit(1)
+
+        latencias = sorted(l for i in informes for l in i['latencias'])
+        documentos = [d for i in informes for d in i['documentos']]
+        conexion.DB_PATH = ruta
+        from controllers.cash_controller import CashController
+        descuadres = CashController.verificar_saldos()
+
+        resumen = {
+            'terminales': args.terminales,
+            'ventas': len(latencias),
+            'exitosas': len(documentos),
+            'fallos': sum(i['fallos'] for i in informes),
+            'database_is_locked': sum(i['bloqueos'] for i in informes),
+            'ventas_por_seg': round(len(documentos) / duracion, 1) if duracion else 0,
+            'p50_ms': round(percentil(latencias, 0.50), 2),
+            'p95_ms': round(percentil(latencias, 0.95), 2),
+            'documentos_duplicados': len(documentos) - len(set(documentos)),
+            'sesiones_descuadradas': len(descuadres),
+        }
+        if args.json:
+            print(json.dumps(resumen, ensure_ascii=False))
+        else:
+            print(f"{args.terminales} terminales x {args.ventas} ventas de {args.lineas} líneas")
+            for clave, valor in resumen.items():
+                print(f"  {clave:<24}{valor:>12}")
+        conexion.cerrar_conexiones_libres()
+        ok = not resumen['fallos'] and not resumen['documentos_duplicados'] and not resumen['sesiones_descuadradas']
+        sys.exit(0 if ok else 1)
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,402 @@
 import sqlite3
 import hashlib
 import os
+import re
+import sys
+import atexit
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
 
 # --- CONFIGURACIÓN CENTRAL ---
 DB_NAME = "pegasus_fisco.db"
 DB_PATH = os.path.join("data", DB_NAME)
 
+# --- POOL DE CONEXIONES POR HILO ---
+# Cada hilo guarda sus conexiones libres y las reutiliza en lugar de abrir una
+# nueva en cada llamada. Las PRAGMAs se aplican una sola vez, al abrir.
+MAX_CONEXIONES_LIBRES = 4
+
+_pool_local = threading.local()
+_lock_estadisticas = threading.Lock()
+_estadisticas = {'abiertas': 0, 'reutilizadas': 0, 'devueltas': 0, 'cerradas': 0,
+                 'transacciones': 0, 'espera_escritura_ms': 0.0}
+
+
+def _sumar_estadistica(clave, valor=1):
+    with _lock_estadisticas:
+        _estadisticas[clave] += valor
+
+
+def _conexiones_libres():
+    libres = getattr(_pool_local, 'libres', None)
+    if libres is None:
+        libres = _pool_local.libres = []
+    return libres
+
+
+def _abrir_conexion_fisica():
+    """Abre una conexión real y le aplica las PRAGMAs de trabajo (una sola vez)."""
+    carpeta = os.path.dirname(DB_PATH)
+    if carpeta and not os.path.exists(carpeta):
+        os.makedirs(carpeta)
+
+    # 1. timeout=10 (espera hasta 10 seg en lugar de fallar de inmediato)
+    conn = sqlite3.connect(DB_PATH, timeout=10.0)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+
+    # 2. Modo WAL (Write-Ahead Logging) permite lecturas y escrituras simultáneas
+    conn.execute("PRAGMA journal_mode = WAL")
+
+    _sumar_estadistica('abiertas')
+    return conn
+
+
+class ConexionAgrupada:
+    """
+    Envoltorio de sqlite3.Connection entregado por crear_conexion().
+    Se usa igual que una conexión normal, pero close() la devuelve al pool
+    del hilo (descartando lo no confirmado) en vez de cerrarla.
+    """
+
+    def __init__(self, conn, ruta):
+        object.__setattr__(self, '_conn', conn)
+        object.__setattr__(self, '_ruta', ruta)
+
+    def __getattr__(self, nombre):
+        conn = object.__getattribute__(self, '_conn')
+        if conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return getattr(conn, nombre)
+
+    def __setattr__(self, nombre, valor):
+        setattr(self._conn, nombre, valor)
+
+    def _activa(self):
+        conn = object.__getattribute__(self, '_conn')
+        if conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return conn
+
+    # Con el perfil de consultas activo los cursores se entregan instrumentados
+    def cursor(self, *args):
+        conn = self._activa()
+        cursor = conn.cursor(*args)
+        return CursorPerfilado(cursor, conn) if _perfil['activo'] else cursor
+
+    def execute(self, sql, parametros=()):
+        if not _perfil['activo']:
+            return self._activa().execute(sql, parametros)
+        return self.cursor().execute(sql, parametros)
+
+    def executemany(self, sql, parametros):
+        if not _perfil['activo']:
+            return self._activa().executemany(sql, parametros)
+        return self.cursor().executemany(sql, parametros)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def close(self):
+        conn = object.__getattribute__(self, '_conn')
+        if conn is None:
+            return
+        object.__setattr__(self, '_conn', None)
+        _devolver_conexion(conn, self._ruta)
+
+
+def _devolver_conexion(conn, ruta):
+    try:
+        # Igual que un close() real: lo no confirmado se descarta
+        if conn.in_transaction:
+            conn.rollback()
+        conn.row_factory = sqlite3.Row
+    except sqlite3.Error:
+        conn.close()
+        _sumar_estadistica('cerradas')
+        return
+
+    libres = _conexiones_libres()
+    if ruta == DB_PATH and len(libres) < MAX_CONEXIONES_LIBRES:
+        libres.append((conn, ruta))
+        _sumar_estadistica('devueltas')
+    else:
+        conn.close()
+        _sumar_estadistica('cerradas')
+
+
 def crear_conexion():
-    """Crea y retorna una conexión a la base de datos."""
+    """Retorna una conexión del pool del hilo actual (o abre una nueva)."""
     try:
-        if not os.path.exists('data'):
-            os.makedirs('data')
-            
-        # 1. Agregamos timeout=10 (espera hasta 10 seg en lugar de fallar de inmediato)
-        conn = sqlite3.connect(DB_PATH, timeout=10.0)
-        conn.row_factory = sqlite3.Row 
-        conn.execute("PRAGMA foreign_keys = ON") 
-        
-        # 2. Habilitamos modo WAL (Write-Ahead Logging) permite lecturas y escrituras simultáneas
-        conn.execute("PRAGMA journal_mode = WAL") 
-        
-        return conn
+        libres = _conexiones_libres()
+        while libres:
+            conn, ruta = libres.pop()
+            if ruta == DB_PATH:
+                _sumar_estadistica('reutilizadas')
+                return ConexionAgrupada(conn, ruta)
+            # DB_PATH cambió (restauración, pruebas): se descarta la vieja
+            conn.close()
+            _sumar_estadistica('cerradas')
+
+        return ConexionAgrupada(_abrir_conexion_fisica(), DB_PATH)
     except sqlite3.Error as e:
         print(f"❌ Error de conexión: {e}")
         return None
 
+
+@contextmanager
+def transaccion(inmediata=True):
+    """
+    Context manager de escritura: entrega un cursor dentro de una transacción,
+    confirma al salir y revierte si ocurre una excepción.
+    Con inmediata=True se toma el bloqueo de escritura al inicio (BEGIN IMMEDIATE)
+    para no fallar a mitad de la operación por un lector que sube a escritor.
+    """
+    conn = crear_conexion()
+    if not conn:
+        raise sqlite3.OperationalError("No se pudo abrir la base de datos.")
+    try:
+        # Tiempo esperando el bloqueo de escritura (otra terminal escribiendo)
+        inicio = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE" if inmediata else "BEGIN")
+        _sumar_estadistica('espera_escritura_ms', (time.perf_counter() - inicio) * 1000)
+        _sumar_estadistica('transacciones')
+        yield conn.cursor()
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def cerrar_conexiones_libres():
+    """Cierra las conexiones libres del hilo actual (antes de respaldar/restaurar)."""
+    libres = _conexiones_libres()
+    while libres:
+        conn, _ = libres.pop()
+        conn.close()
+        _sumar_estadistica('cerradas')
+
+
+def obtener_estadisticas_pool():
+    """Contadores del pool (conexiones abiertas, reutilizadas, devueltas y cerradas) y espera de escritura."""
+    with _lock_estadisticas:
+        return dict(_estadisticas)
+
+
+# --- PERFIL DE CONSULTAS (OPCIONAL) ---
+# Desactivado por defecto (sin costo). Se activa con activar_perfil_sql() o con la
+# variable de entorno PEGASUS_PERFIL_SQL=<umbral en ms>; en ese caso el reporte se
+# imprime al cerrar la aplicación. Cada sentencia se agrupa por su huella (SQL sin
+# literales) y por el método del controlador/vista que la ejecutó. Las que superan
+# el umbral se guardan con su EXPLAIN QUERY PLAN.
+_perfil = {'activo': False, 'umbral_ms': 100.0, 'plan': True}
+_lock_perfil = threading.Lock()
+_perfil_consultas = {}  # (origen, huella) -> [llamadas, total_ms, max_ms, filas]
+_consultas_lentas = deque(maxlen=200)
+
+_RE_CADENAS = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMEROS = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_RE_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_RE_ESPACIOS = re.compile(r"\s+")
+_PREFIJOS_ORIGEN = ('controllers.', 'views.', 'benchmarks.', 'bench_')
+_SENTENCIAS_CON_PLAN = ('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT', 'REPLACE')
+
+
+def huella_sql(sql):
+    """Normaliza una sentencia para agrupar: literales -> ?, listas IN (?, ?, ...) -> (...), espacios simples."""
+    huella = _RE_CADENAS.sub("?", sql)
+    huella = _RE_NUMEROS.sub("?", huella)
+    huella = _RE_LISTAS.sub("(...)", huella)
+    return _RE_ESPACIOS.sub(" ", huella).strip()
+
+
+def _origen_consulta():
+    """
+    Primer método de un controlador o vista en la pila (Clase.metodo); si no
+    hay ninguno, la primera función fuera de los envoltorios (p. ej. una migración).
+    """
+    marco = sys._getframe(2)
+    respaldo = None
+    while marco is not None:
+        modulo = marco.f_globals.get('__name__', '')
+        nombre = getattr(marco.f_code, 'co_qualname', marco.f_code.co_name)
+        if modulo.startswith(_PREFIJOS_ORIGEN):
+            return nombre
+        if respaldo is None and modulo != 'contextlib' and not nombre.startswith(('CursorPerfilado.', 'ConexionAgrupada.')):
+            respaldo = nombre
+        marco = marco.f_back
+    return respaldo or '(otro)'
+
+
+class CursorPerfilado:
+    """
+    Envoltorio de sqlite3.Cursor que mide cada sentencia (ejecución + lectura de
+    filas) y la acumula en el perfil. Se comporta como el cursor original.
+    """
+
+    def __init__(self, cursor, conn):
+        object.__setattr__(self, '_cursor', cursor)
+        object.__setattr__(self, '_conn', conn)
+        object.__setattr__(self, '_actual', None)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+    def __setattr__(self, nombre, valor):
+        setattr(self._cursor, nombre, valor)
+
+    def _medir(self, sql, parametros, metodo):
+        origen = _origen_consulta()
+        inicio = time.perf_counter()
+        try:
+            getattr(self._cursor, metodo)(sql, parametros)
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+            filas = max(self._cursor.rowcount, 0)
+            # [clave, sql, parametros, ms acumulados, ya registrada como lenta]
+            actual = [(origen, huella_sql(sql)), sql, parametros if metodo == 'execute' else None, ms, False]
+            object.__setattr__(self, '_actual', actual)
+            _acumular_perfil(actual[0], 1, ms, filas)
+            self._revisar_lenta()
+        return self
+
+    def execute(self, sql, parametros=()):
+        return self._medir(sql, parametros, 'execute')
+
+    def executemany(self, sql, parametros):
+        return self._medir(sql, parametros, 'executemany')
+
+    def _leer(self, metodo, *args):
+        inicio = time.perf_counter()
+        resultado = getattr(self._cursor, metodo)(*args)
+        actual = self._actual
+        if actual:
+            ms = (time.perf_counter() - inicio) * 1000
+            filas = len(resultado) if isinstance(resultado, list) else int(resultado is not None)
+            actual[3] += ms
+            _acumular_perfil(actual[0], 0, ms, filas)
+            self._revisar_lenta()
+        return resultado
+
+    def fetchone(self):
+        return self._leer('fetchone')
+
+    def fetchall(self):
+        return self._leer('fetchall')
+
+    def fetchmany(self, *args):
+        return self._leer('fetchmany', *args)
+
+    def __iter__(self):
+        while True:
+            fila = self._leer('fetchone')
+            if fila is None:
+                return
+            yield fila
+
+    def _revisar_lenta(self):
+        actual = self._actual
+        if actual[4] or actual[3] < _perfil['umbral_ms']:
+            return
+        actual[4] = True
+        (origen, huella), sql, parametros, ms, _ = actual
+        plan = []
+        if _perfil['plan'] and parametros is not None and sql.lstrip().upper().startswith(_SENTENCIAS_CON_PLAN):
+            try:
+                plan = [fila[-1] for fila in self._conn.execute(f"EXPLAIN QUERY PLAN {sql}", parametros).fetchall()]
+            except sqlite3.Error as e:
+                plan = [f"(sin plan: {e})"]
+        with _lock_perfil:
+            _consultas_lentas.append({'origen': origen, 'huella': huella, 'ms': round(ms, 3), 'plan': plan})
+        print(f"🐢 Consulta lenta ({ms:.1f} ms) en {origen}: {huella[:200]}")
+        for paso in plan:
+            print(f"   └ {paso}")
+
+
+def _acumular_perfil(clave, llamadas, ms, filas):
+    with _lock_perfil:
+        datos = _perfil_consultas.get(clave)
+        if datos is None:
+            datos = _perfil_consultas[clave] = [0, 0.0, 0.0, 0]
+        datos[0] += llamadas
+        datos[1] += ms
+        datos[2] = max(datos[2], ms)
+        datos[3] += filas
+
+
+def activar_perfil_sql(umbral_ms=100.0, plan=True):
+    """Empieza a medir las sentencias de las conexiones (y cursores) creados desde ahora."""
+    _perfil.update(activo=True, umbral_ms=float(umbral_ms), plan=plan)
+
+
+def desactivar_perfil_sql():
+    _perfil['activo'] = False
+
+
+def reiniciar_perfil_sql():
+    with _lock_perfil:
+        _perfil_consultas.clear()
+        _consultas_lentas.clear()
+
+
+def obtener_perfil_sql(por='origen'):
+    """
+    Contadores acumulados ordenados por tiempo total.
+    por='origen': uno por método (con sus sentencias); por='sentencia': uno por (método, huella).
+    """
+    with _lock_perfil:
+        filas = [(origen, huella, *datos) for (origen, huella), datos in _perfil_consultas.items()]
+
+    sentencias = [{'origen': origen, 'huella': huella, 'llamadas': llamadas, 'total_ms': round(total, 3),
+                   'media_ms': round(total / llamadas, 3) if llamadas else 0.0, 'max_ms': round(maximo, 3), 'filas': n}
+                  for origen, huella, llamadas, total, maximo, n in filas]
+    sentencias.sort(key=lambda d: -d['total_ms'])
+    if por == 'sentencia':
+        return sentencias
+
+    origenes = {}
+    for d in sentencias:
+        o = origenes.setdefault(d['origen'], {'origen': d['origen'], 'llamadas': 0, 'total_ms': 0.0, 'filas': 0, 'sentencias': []})
+        o['llamadas'] += d['llamadas']
+        o['total_ms'] = round(o['total_ms'] + d['total_ms'], 3)
+        o['filas'] += d['filas']
+        o['sentencias'].append(d)
+    return sorted(origenes.values(), key=lambda o: -o['total_ms'])
+
+
+def obtener_consultas_lentas():
+    with _lock_perfil:
+        return list(_consultas_lentas)
+
+
+def reporte_perfil_sql(limite=15):
+    lineas = [f"📊 Perfil SQL (umbral de consulta lenta: {_perfil['umbral_ms']:g} ms)",
+              f"  {'Origen':<50}{'llamadas':>10}{'total ms':>12}{'filas':>10}"]
+    for o in obtener_perfil_sql()[:limite]:
+        lineas.append(f"  {o['origen'][:50]:<50}{o['llamadas']:>10}{o['total_ms']:>12.1f}{o['filas']:>10}")
+        for d in o['sentencias'][:3]:
+            lineas.append(f"      {d['total_ms']:>10.1f} ms  x{d['llamadas']:<6} {d['huella'][:90]}")
+    lentas = obtener_consultas_lentas()
+    if lentas:
+        lineas.append(f"  Consultas lentas registradas: {len(lentas)}")
+    return "\n".join(lineas)
+
+
+if os.environ.get("PEGASUS_PERFIL_SQL"):
+    try:
+        activar_perfil_sql(float(os.environ["PEGASUS_PERFIL_SQL"]))
+    except ValueError:
+        activar_perfil_sql()
+    atexit.register(lambda: print(reporte_perfil_sql()))
+
 def sistema_esta_configurado():
     """Verifica si el sistema tiene usuarios y empresa configurada."""
     conn = crear_conexion()
@@ -45,6 +417,7 @@ def sistema_esta_configurado():
 def verificar_columna(cursor, tabla, columna, definicion_sql):
     """
     Intenta seleccionar una columna. Si falla, la crea automáticamente.
+    Retorna True si la columna fue creada en esta llamada.
     """
     try:
         cursor.execute(f"SELECT {columna} FROM {tabla} LIMIT 1")
@@ -52,8 +425,407 @@ def verificar_columna(cursor, tabla, columna, definicion_sql):
         try:
             print(f"🛠️ Migración: Agregando columna '{columna}' a tabla '{tabla}'...")
             cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna} {definicion_sql}")
+            return True
         except Exception as e:
             print(f"⚠️ Error agregando {columna}: {e}")
+    return False
+
+# --- MIGRACIONES VERSIONADAS DE ÍNDICES ---
+# Cada entrada (versión, sentencias) se aplica una sola vez; la versión aplicada
+# se guarda en PRAGMA user_version. Para agregar índices se añade una versión nueva.
+MIGRACIONES_INDICES = [
+    (1, [
+        # Reportes Z, libro de ventas y dashboard: filtran por tipo y rango de fecha
+        # y suman total_usd (índice cubriente, no toca la tabla)
+        "CREATE INDEX IF NOT EXISTS idx_documentos_tipo_fecha ON documentos (tipo_doc, fecha, total_usd)",
+        "CREATE INDEX IF NOT EXISTS idx_documentos_fecha ON documentos (fecha)",
+        "CREATE INDEX IF NOT EXISTS idx_documentos_tipo_metodo ON documentos (tipo_doc, metodo_pago)",
+        # Detalle de factura / nota de crédito y top de productos
+        "CREATE INDEX IF NOT EXISTS idx_detalles_documento ON documento_detalles (documento_id, producto_id, cantidad, precio_unitario_usd)",
+        "CREATE INDEX IF NOT EXISTS idx_detalles_producto ON documento_detalles (producto_id, cantidad)",
+        # Kardex de inventario por producto y fecha
+        "CREATE INDEX IF NOT EXISTS idx_inv_kardex_producto_fecha ON inventario_kardex (producto_id, fecha)",
+        # Kardex y movimientos de caja por sesión (el rowid va implícito: sirve para ORDER BY id DESC)
+        "CREATE INDEX IF NOT EXISTS idx_caja_kardex_sesion ON caja_kardex (sesion_id)",
+        "CREATE INDEX IF NOT EXISTS idx_caja_movimientos_sesion ON caja_movimientos (sesion_id)",
+        "CREATE INDEX IF NOT EXISTS idx_caja_sesiones_usuario_estado ON caja_sesiones (usuario_id, estado)",
+    ]),
+    (2, [
+        # Grillas paginadas (ORDER BY ... LIMIT/OFFSET sin ordenar toda la tabla)
+        "CREATE INDEX IF NOT EXISTS idx_productos_estado_descripcion ON productos (estado, descripcion)",
+        "CREATE INDEX IF NOT EXISTS idx_clientes_nombre ON clientes (nombre)",
+    ]),
+    (3, [
+        # Capas de costo FIFO abiertas de un producto, en orden de entrada
+        "CREATE INDEX IF NOT EXISTS idx_costo_capas_abiertas ON costo_capas (producto_id, id) WHERE cantidad_restante > 0",
+    ]),
+    (4, [
+        # Una sola caja abierta por terminal (varias terminales trabajan a la vez)
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_caja_sesiones_terminal_abierta ON caja_sesiones (terminal_id) WHERE estado = 'ABIERTA'",
+    ]),
+    (5, [
+        # Movimientos de inventario de un rango de fechas (cortes del kardex)
+        "CREATE INDEX IF NOT EXISTS idx_inv_kardex_fecha ON inventario_kardex (fecha)",
+    ]),
+]
+
+# Consultas representativas de cada ruta de acceso, para verificar_indices()
+CONSULTAS_VERIFICACION = {
+    'ventas_por_fecha': ("SELECT SUM(total_usd) FROM documentos WHERE tipo_doc = 'FACTURA' AND fecha >= ? AND fecha < ?",
+                         ('2000-01-01', '2000-01-02')),
+    'metodos_pago': ("SELECT metodo_pago, COUNT(*) FROM documentos WHERE tipo_doc = 'FACTURA' GROUP BY metodo_pago", ()),
+    'detalles_documento': ("SELECT producto_id, cantidad FROM documento_detalles WHERE documento_id = ?", (0,)),
+    'top_productos': ("SELECT producto_id, SUM(cantidad) FROM documento_detalles GROUP BY producto_id", ()),
+    'kardex_producto': ("SELECT * FROM inventario_kardex WHERE producto_id = ? ORDER BY fecha", (0,)),
+    'ultimo_saldo_caja': ("SELECT saldo_usd FROM caja_kardex WHERE sesion_id = ? ORDER BY id DESC LIMIT 1", (0,)),
+    'sesion_activa': ("SELECT * FROM caja_sesiones WHERE usuario_id = ? AND estado = 'ABIERTA'", (0,)),
+    'sesion_terminal': ("SELECT * FROM caja_sesiones WHERE terminal_id = ? AND estado = 'ABIERTA'", (0,)),
+    'pagina_productos': ("SELECT * FROM productos WHERE estado = 1 ORDER BY descripcion LIMIT 200 OFFSET ?", (0,)),
+    'pagina_clientes': ("SELECT * FROM clientes ORDER BY nombre LIMIT 200 OFFSET ?", (0,)),
+    'kardex_desde_corte': ("SELECT SUM(cantidad) FROM inventario_kardex WHERE producto_id = ? AND fecha >= ? AND fecha < ?",
+                           (0, '2000-01-01', '2000-01-02')),
+    'kardex_por_fecha': ("SELECT producto_id, SUM(cantidad) FROM inventario_kardex WHERE fecha >= ? AND fecha < ? GROUP BY producto_id",
+                         ('2000-01-01', '2000-01-02')),
+    'capas_abiertas': ("SELECT id, cantidad_restante, costo_unitario_usd FROM costo_capas WHERE producto_id = ? AND cantidad_restante > 0 ORDER BY id", (0,)),
+}
+
+
+def aplicar_migraciones_indices(cursor):
+    """Aplica las migraciones de índices pendientes según PRAGMA user_version."""
+    cursor.execute("PRAGMA user_version")
+    version_actual = cursor.fetchone()[0]
+
+    for version, sentencias in MIGRACIONES_INDICES:
+        if version <= version_actual:
+            continue
+        print(f"🛠️ Migración de índices v{version}...")
+        for sql in sentencias:
+            cursor.execute(sql)
+        cursor.execute(f"PRAGMA user_version = {int(version)}")
+        version_actual = version
+
+    # Estadísticas para el planificador (barato si no hay cambios relevantes)
+    cursor.execute("PRAGMA optimize")
+    return version_actual
+
+
+def verificar_indices():
+    """
+    Reporta la versión de índices aplicada, qué índices esperados existen y
+    qué plan de consulta usa SQLite para cada ruta de acceso representativa.
+    """
+    conn = crear_conexion()
+    if not conn: return None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA user_version")
+        version = cursor.fetchone()[0]
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+        existentes = {row[0] for row in cursor.fetchall()}
+
+        esperados = {}
+        for _, sentencias in MIGRACIONES_INDICES:
+            for sql in sentencias:
+                nombre = sql.split(" ON ")[0].split()[-1]
+                esperados[nombre] = nombre in existentes
+
+        planes = {}
+        for clave, (sql, params) in CONSULTAS_VERIFICACION.items():
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            detalle = [row[-1] for row in cursor.fetchall()]
+            planes[clave] = {
+                'plan': detalle,
+                'usa_indice': any("USING" in d and "INDEX" in d for d in detalle),
+            }
+
+        return {'version': version, 'indices': esperados, 'planes': planes}
+    finally:
+        conn.close()
+
+# --- BÚSQUEDA DE TEXTO COMPLETO (FTS5) ---
+# Índice de productos por código, descripción, categoría y proveedor, sin
+# acentos y con índices de prefijo. Los triggers lo mantienen sincronizado;
+# solo reaccionan a columnas indexadas (no a stock_actual).
+_SELECT_FTS_PRODUCTO = """
+    SELECT new.id, new.codigo_interno, new.descripcion,
+           (SELECT nombre FROM categorias WHERE id = new.categoria_id),
+           (SELECT razon_social FROM proveedores WHERE id = new.proveedor_id)
+    WHERE new.estado = 1;
+"""
+
+SENTENCIAS_FTS_PRODUCTOS = [
+    f"""CREATE TRIGGER IF NOT EXISTS trg_productos_fts_ai AFTER INSERT ON productos BEGIN
+        INSERT INTO productos_fts (rowid, codigo_interno, descripcion, categoria, proveedor) {_SELECT_FTS_PRODUCTO}
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS trg_productos_fts_au
+        AFTER UPDATE OF codigo_interno, descripcion, categoria_id, proveedor_id, estado ON productos BEGIN
+        DELETE FROM productos_fts WHERE rowid = old.id;
+        INSERT INTO productos_fts (rowid, codigo_interno, descripcion, categoria, proveedor) {_SELECT_FTS_PRODUCTO}
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_productos_fts_ad AFTER DELETE ON productos BEGIN
+        DELETE FROM productos_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_categorias_fts_au AFTER UPDATE OF nombre ON categorias BEGIN
+        UPDATE productos_fts SET categoria = new.nombre
+        WHERE rowid IN (SELECT id FROM productos WHERE categoria_id = new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_proveedores_fts_au AFTER UPDATE OF razon_social ON proveedores BEGIN
+        UPDATE productos_fts SET proveedor = new.razon_social
+        WHERE rowid IN (SELECT id FROM productos WHERE proveedor_id = new.id);
+    END""",
+]
+
+
+def inicializar_busqueda_productos(cursor):
+    """
+    Crea el índice FTS5 de productos y sus triggers; si la tabla es nueva la llena
+    desde productos. Retorna False si este SQLite no trae FTS5 (se usa LIKE).
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'productos_fts'")
+    existia = cursor.fetchone() is not None
+    try:
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5(
+                codigo_interno, descripcion, categoria, proveedor,
+                tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+            )
+        """)
+    except sqlite3.OperationalError as e:
+        print(f"⚠️ Búsqueda de texto completo no disponible ({e}). Se usará LIKE.")
+        return False
+
+    for sql in SENTENCIAS_FTS_PRODUCTOS:
+        cursor.execute(sql)
+
+    if not existia:
+        print("🛠️ Migración: Indexando productos para búsqueda de texto completo...")
+        cursor.execute("""
+            INSERT INTO productos_fts (rowid, codigo_interno, descripcion, categoria, proveedor)
+            SELECT p.id, p.codigo_interno, p.descripcion, c.nombre, pr.razon_social
+            FROM productos p
+            LEFT JOIN categorias c ON p.categoria_id = c.id
+            LEFT JOIN proveedores pr ON p.proveedor_id = pr.id
+            WHERE p.estado = 1
+        """)
+    return True
+
+
+def busqueda_fts_disponible(cursor):
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'productos_fts'")
+    return cursor.fetchone() is not None
+
+
+def expresion_fts(texto):
+    """
+    Convierte lo que escribe el usuario en una consulta FTS5 segura: cada palabra
+    se busca como prefijo y todas deben aparecer ("arroz 1k" -> "arroz"* "1k"*).
+    Los signos se tratan como separadores, igual que el tokenizador unicode61 al
+    indexar: "HAR-001" -> "HAR"* "001"*.
+    """
+    palabras = [f'"{pieza}"*' for pieza in re.findall(r'\w+', str(texto))]
+    return " ".join(palabras)
+
+# --- RESÚMENES DIARIOS (DASHBOARD) ---
+# Totales por día × tipo de documento × método de pago y cantidades por día ×
+# producto. Se acumulan dentro de la misma transacción de la venta o devolución
+# (StatsController.acumular_documento); aquí solo se crean y se reconstruyen.
+SENTENCIAS_RESUMENES = [
+    """CREATE TABLE IF NOT EXISTS resumen_ventas_diario (
+        fecha TEXT NOT NULL, tipo_doc TEXT NOT NULL, metodo_pago TEXT NOT NULL DEFAULT '',
+        documentos INTEGER NOT NULL DEFAULT 0, total_usd REAL NOT NULL DEFAULT 0,
+        margen_usd REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (fecha, tipo_doc, metodo_pago)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE IF NOT EXISTS resumen_productos_diario (
+        fecha TEXT NOT NULL, tipo_doc TEXT NOT NULL, producto_id INTEGER NOT NULL,
+        cantidad REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (fecha, tipo_doc, producto_id)
+    ) WITHOUT ROWID""",
+]
+
+
+def reconstruir_resumenes_diarios(cursor, desde=None):
+    """
+    Recalcula los resúmenes desde documentos/documento_detalles. Con `desde`
+    ('YYYY-MM-DD') solo se rehacen los días a partir de esa fecha.
+    """
+    filtro = "WHERE fecha >= ?" if desde else ""
+    params = (desde,) if desde else ()
+
+    cursor.execute(f"DELETE FROM resumen_ventas_diario {filtro}", params)
+    cursor.execute(f"DELETE FROM resumen_productos_diario {filtro}", params)
+    cursor.execute(f"""
+        INSERT INTO resumen_ventas_diario (fecha, tipo_doc, metodo_pago, documentos, total_usd, margen_usd)
+        SELECT substr(d.fecha, 1, 10), d.tipo_doc, COALESCE(d.metodo_pago, ''), COUNT(*),
+               COALESCE(SUM(d.total_usd), 0), COALESCE(SUM(m.margen_usd), 0)
+        FROM documentos d
+        LEFT JOIN (SELECT documento_id, SUM(margen_usd) as margen_usd FROM documento_detalles GROUP BY documento_id) m
+               ON m.documento_id = d.id
+        {'WHERE d.fecha >= ?' if desde else ''}
+        GROUP BY 1, 2, 3
+    """, params)
+    cursor.execute(f"""
+        INSERT INTO resumen_productos_diario (fecha, tipo_doc, producto_id, cantidad)
+        SELECT substr(d.fecha, 1, 10), d.tipo_doc, dd.producto_id, SUM(dd.cantidad)
+        FROM documento_detalles dd JOIN documentos d ON dd.documento_id = d.id
+        {'WHERE d.fecha >= ?' if desde else ''}
+        GROUP BY 1, 2, 3
+    """, params)
+
+
+def inicializar_resumenes_diarios(cursor):
+    """Crea las tablas de resumen; si son nuevas las llena con el historial."""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'resumen_ventas_diario'")
+    existia = cursor.fetchone() is not None
+    for sql in SENTENCIAS_RESUMENES:
+        cursor.execute(sql)
+    if verificar_columna(cursor, 'resumen_ventas_diario', 'margen_usd', 'REAL NOT NULL DEFAULT 0'):
+        existia = False
+    if not existia:
+        print("🛠️ Migración: Calculando resúmenes diarios de ventas...")
+        reconstruir_resumenes_diarios(cursor)
+
+# --- CORTES DEL KARDEX DE INVENTARIO ---
+# Existencia de cada producto al inicio de un día (dia = 'YYYY-MM-DD'): suma de
+# los movimientos con fecha < dia. Los genera KardexController; solo se guarda
+# una fila cuando el producto tuvo movimientos desde su corte anterior.
+def inicializar_cortes_kardex(cursor):
+    cursor.execute("""CREATE TABLE IF NOT EXISTS kardex_cortes (
+        producto_id INTEGER NOT NULL, dia TEXT NOT NULL, stock REAL NOT NULL,
+        PRIMARY KEY (producto_id, dia)
+    ) WITHOUT ROWID""")
+
+# --- REGISTRO DE CAMBIOS DE PRODUCTOS ---
+# Cada INSERT, UPDATE o DELETE en productos (stock, precio, descripción, estado...)
+# deja el id en productos_cambios. CatalogController lo lee desde su última
+# marca para enterarse de lo que escribieron otras terminales. Al iniciar se
+# descartan los registros viejos; un catálogo que quede por detrás se recarga entero.
+CAMBIOS_PRODUCTOS_CONSERVADOS = 100000
+
+SENTENCIAS_CAMBIOS_PRODUCTOS = [
+    """CREATE TABLE IF NOT EXISTS productos_cambios (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, producto_id INTEGER NOT NULL
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS trg_productos_cambios_ai AFTER INSERT ON productos BEGIN
+        INSERT INTO productos_cambios (producto_id) VALUES (new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_productos_cambios_au AFTER UPDATE ON productos BEGIN
+        INSERT INTO productos_cambios (producto_id) VALUES (new.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_productos_cambios_ad AFTER DELETE ON productos BEGIN
+        INSERT INTO productos_cambios (producto_id) VALUES (old.id);
+    END""",
+]
+
+
+def inicializar_cambios_productos(cursor):
+    for sql in SENTENCIAS_CAMBIOS_PRODUCTOS:
+        cursor.execute(sql)
+    cursor.execute("DELETE FROM productos_cambios WHERE id <= (SELECT MAX(id) FROM productos_cambios) - ?",
+                   (CAMBIOS_PRODUCTOS_CONSERVADOS,))
+
+# --- TOMAS DE INVENTARIO (CONTEO FÍSICO) ---
+# Las cantidades contadas se acumulan en conteo_lineas mientras la toma está
+# ABIERTA; StockCountController las aplica todas juntas en una transacción.
+def inicializar_tomas_inventario(cursor):
+    cursor.execute("""CREATE TABLE IF NOT EXISTS conteos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, fecha_inicio DATETIME, fecha_cierre DATETIME,
+        estado TEXT NOT NULL DEFAULT 'ABIERTO', usuario_id INTEGER, observaciones TEXT
+    )""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS conteo_lineas (
+        conteo_id INTEGER NOT NULL, producto_id INTEGER NOT NULL, cantidad REAL NOT NULL DEFAULT 0,
+        stock_sistema REAL, fecha DATETIME,
+        PRIMARY KEY (conteo_id, producto_id)
+    ) WITHOUT ROWID""")
+
+# --- COSTOS DE INVENTARIO (CAPAS FIFO + PROMEDIO PONDERADO) ---
+# Las mantiene CostController dentro de las transacciones de compra, venta,
+# devolución y ajuste. documento_detalles guarda el costo y el margen de cada
+# línea (negativos en las notas de crédito, que revierten la venta).
+def inicializar_costos(cursor):
+    """
+    Crea costo_capas y las columnas de costo. En una base existente toma como
+    costo el de la última compra de cada producto, abre una capa inicial con el
+    stock actual y estima el margen de las líneas ya vendidas con ese costo.
+    Retorna True si hizo la migración (hay que reconstruir los resúmenes).
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'costo_capas'")
+    existia = cursor.fetchone() is not None
+    cursor.execute("""CREATE TABLE IF NOT EXISTS costo_capas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, producto_id INTEGER NOT NULL, fecha DATETIME,
+        origen TEXT, referencia TEXT, cantidad_inicial REAL NOT NULL, cantidad_restante REAL NOT NULL,
+        costo_unitario_usd REAL NOT NULL DEFAULT 0, FOREIGN KEY(producto_id) REFERENCES productos(id)
+    )""")
+    verificar_columna(cursor, 'productos', 'costo_promedio_usd', 'REAL DEFAULT 0')
+    verificar_columna(cursor, 'documento_detalles', 'costo_usd', 'REAL DEFAULT 0')
+    verificar_columna(cursor, 'documento_detalles', 'margen_usd', 'REAL DEFAULT 0')
+    if existia:
+        return False
+
+    print("🛠️ Migración: Calculando costos de inventario...")
+    cursor.execute("""
+        UPDATE productos SET costo_promedio_usd = COALESCE((
+            SELECT cd.costo_unitario_bs / c.tasa_cambio
+            FROM compra_detalles cd JOIN compras c ON cd.compra_id = c.id
+            WHERE cd.producto_id = productos.id AND c.tasa_cambio > 0
+            ORDER BY cd.id DESC LIMIT 1), 0)
+    """)
+    cursor.execute("""
+        INSERT INTO costo_capas (producto_id, fecha, origen, referencia, cantidad_inicial, cantidad_restante, costo_unitario_usd)
+        SELECT id, datetime('now', 'localtime'), 'INICIAL', 'MIGRACION', stock_actual, stock_actual, costo_promedio_usd
+        FROM productos WHERE stock_actual > 0
+    """)
+    cursor.execute("""
+        UPDATE documento_detalles SET costo_usd = cantidad * COALESCE(
+            (SELECT costo_promedio_usd FROM productos WHERE id = documento_detalles.producto_id), 0)
+    """)
+    cursor.execute("""
+        UPDATE documento_detalles SET margen_usd = (
+            SELECT CASE WHEN d.tipo_doc = 'NOTA_CREDITO' THEN -1 ELSE 1 END
+                   * (documento_detalles.cantidad * documento_detalles.precio_unitario_usd
+                      * (1 - COALESCE(d.descuento_porcentaje, 0) / 100.0) - documento_detalles.costo_usd)
+            FROM documentos d WHERE d.id = documento_detalles.documento_id)
+    """)
+    return True
+
+# --- NUMERACIÓN DE DOCUMENTOS ---
+# Un contador por serie (tabla secuencias). El número se toma con un UPDATE ...
+# RETURNING dentro de la misma transacción que inserta el documento: si esta se
+# revierte, el número vuelve a quedar libre (numeración sin saltos).
+# Series: FACTURA, NOTA_ENTREGA, NOTA_CREDITO, CONTROL (global) y CONTROL:<terminal_id>
+# para las terminales con un rango propio de números de control [desde, hasta].
+SERIES_DOCUMENTO = {'FACTURA': 'FAC', 'NOTA_ENTREGA': 'NE', 'NOTA_CREDITO': 'NC'}
+
+
+def inicializar_secuencias(cursor):
+    """Crea la tabla de secuencias y la siembra desde los contadores de configuracion (que dejan de usarse)."""
+    cursor.execute("""CREATE TABLE IF NOT EXISTS secuencias (
+        serie TEXT PRIMARY KEY, siguiente INTEGER NOT NULL,
+        desde INTEGER NOT NULL DEFAULT 1, hasta INTEGER, terminal_id INTEGER
+    ) WITHOUT ROWID""")
+    cursor.execute("SELECT COUNT(*) FROM secuencias")
+    if cursor.fetchone()[0]:
+        return
+
+    print("🛠️ Migración: Creando secuencias de numeración...")
+    cursor.execute("SELECT proximo_nro_factura, proximo_nro_ne, proximo_nro_nc, proximo_nro_control FROM configuracion LIMIT 1")
+    conf = cursor.fetchone()
+    contadores = dict(zip(('FACTURA', 'NOTA_ENTREGA', 'NOTA_CREDITO', 'CONTROL'), conf if conf else (1, 1, 1, 1)))
+
+    # Nunca por debajo del mayor número ya emitido (evita duplicados si el contador quedó atrasado)
+    for serie in SERIES_DOCUMENTO:
+        cursor.execute("""
+            SELECT MAX(CAST(substr(nro_documento, instr(nro_documento, '-') + 1) AS INTEGER))
+            FROM documentos WHERE tipo_doc = ?
+        """, (serie,))
+        usado = cursor.fetchone()[0] or 0
+        contadores[serie] = max(contadores[serie] or 1, usado + 1)
+    cursor.execute("SELECT MAX(CAST(substr(nro_control, instr(nro_control, '-') + 1) AS INTEGER)) FROM documentos")
+    contadores['CONTROL'] = max(contadores['CONTROL'] or 1, (cursor.fetchone()[0] or 0) + 1)
+
+    cursor.executemany("INSERT INTO secuencias (serie, siguiente) VALUES (?, ?)", contadores.items())
+
 
 def inicializar_base_de_datos():
     conn = crear_conexion()
@@ -114,6 +886,10 @@ def inicializar_base_de_datos():
         observaciones TEXT,
         FOREIGN KEY(proveedor_id) REFERENCES proveedores(id)
     )''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS compra_detalles (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, compra_id INTEGER, producto_id INTEGER,
+        cantidad REAL, costo_unitario_bs REAL, FOREIGN KEY(compra_id) REFERENCES compras(id)
+    )''')
 
     # Inventario
     cursor.execute('''CREATE TABLE IF NOT EXISTS productos (
@@ -150,6 +926,7 @@ def inicializar_base_de_datos():
 
         estado TEXT DEFAULT 'PROCESADO',
         documento_referencia TEXT, motivo_anulacion TEXT, iva_retenido_bs REAL DEFAULT 0,
+        terminal_id INTEGER,
         FOREIGN KEY(cliente_id) REFERENCES clientes(id)
     )''')
 
@@ -161,6 +938,12 @@ def inicializar_base_de_datos():
         FOREIGN KEY(documento_id) REFERENCES documentos(id)
     )''')
 
+    # Terminales (cajas físicas que comparten la base de datos)
+    cursor.execute('''CREATE TABLE IF NOT EXISTS terminales (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, codigo TEXT UNIQUE NOT NULL, nombre TEXT,
+        fecha_registro DATETIME DEFAULT CURRENT_TIMESTAMP
+    )''')
+
     # Caja
     cursor.execute('''CREATE TABLE IF NOT EXISTS caja_sesiones (
         id INTEGER PRIMARY KEY AUTOINCREMENT, usuario_id INTEGER, 
@@ -169,8 +952,10 @@ def inicializar_base_de_datos():
         monto_final_usd REAL DEFAULT 0, monto_final_bs REAL DEFAULT 0, monto_final_cop REAL DEFAULT 0,
         monto_sistema_usd REAL DEFAULT 0, monto_sistema_bs REAL DEFAULT 0, monto_sistema_cop REAL DEFAULT 0,
         diferencia_usd REAL DEFAULT 0, diferencia_bs REAL DEFAULT 0, diferencia_cop REAL DEFAULT 0,
-        estado TEXT DEFAULT 'ABIERTA', observaciones TEXT,
-        FOREIGN KEY(usuario_id) REFERENCES usuarios(id)
+        saldo_actual_usd REAL DEFAULT 0, saldo_actual_bs REAL DEFAULT 0, saldo_actual_cop REAL DEFAULT 0,
+        estado TEXT DEFAULT 'ABIERTA', observaciones TEXT, terminal_id INTEGER,
+        FOREIGN KEY(usuario_id) REFERENCES usuarios(id),
+        FOREIGN KEY(terminal_id) REFERENCES terminales(id)
     )''')
 
     cursor.execute('''CREATE TABLE IF NOT EXISTS caja_movimientos (
@@ -214,6 +999,7 @@ def inicializar_base_de_datos():
     verificar_columna(cursor, 'documentos', 'iva_retenido_bs', 'REAL DEFAULT 0')
     verificar_columna(cursor, 'documentos', 'monto_vuelto_cop', 'REAL DEFAULT 0')
     verificar_columna(cursor, 'documentos', 'estado', "TEXT DEFAULT 'PROCESADO'")
+    verificar_columna(cursor, 'documentos', 'terminal_id', 'INTEGER')
 
     # Documento Detalles (NUEVA MIGRACIÓN AQUÍ)
     verificar_columna(cursor, 'documento_detalles', 'subtotal_usd', 'REAL DEFAULT 0')
@@ -232,6 +1018,21 @@ def inicializar_base_de_datos():
     cols_caja = ['monto_inicial_cop', 'monto_final_cop', 'monto_sistema_cop', 'diferencia_cop']
     for col in cols_caja:
         verificar_columna(cursor, 'caja_sesiones', col, 'REAL DEFAULT 0')
+    # Sesiones previas a las terminales quedan en NULL: la primera terminal que abra la app las adopta
+    verificar_columna(cursor, 'caja_sesiones', 'terminal_id', 'INTEGER')
+
+    # Saldo corriente de la sesión (se mantiene junto con cada asiento de caja_kardex)
+    saldos_nuevos = False
+    for col in ['saldo_actual_usd', 'saldo_actual_bs', 'saldo_actual_cop']:
+        saldos_nuevos |= verificar_columna(cursor, 'caja_sesiones', col, 'REAL DEFAULT 0')
+    if saldos_nuevos:
+        # Base existente: se toma el último saldo del kardex de cada sesión
+        for moneda in ['usd', 'bs', 'cop']:
+            cursor.execute(f"""
+                UPDATE caja_sesiones SET saldo_actual_{moneda} = COALESCE(
+                    (SELECT k.saldo_{moneda} FROM caja_kardex k WHERE k.sesion_id = caja_sesiones.id ORDER BY k.id DESC LIMIT 1),
+                    monto_inicial_{moneda})
+            """)
     
     verificar_columna(cursor, 'caja_movimientos', 'monto_cop', 'REAL DEFAULT 0')
 
@@ -239,6 +1040,29 @@ def inicializar_base_de_datos():
     for col in cols_kardex_caja:
         verificar_columna(cursor, 'caja_kardex', col, 'REAL DEFAULT 0')
 
+    # Costos de inventario (antes de los índices: la migración v3 indexa costo_capas)
+    costos_migrados = inicializar_costos(cursor)
+
+    # Índices secundarios (migración versionada)
+    aplicar_migraciones_indices(cursor)
+
+    # Búsqueda de texto completo de productos
+    inicializar_busqueda_productos(cursor)
+
+    # Resúmenes diarios del dashboard
+    inicializar_resumenes_diarios(cursor)
+    if costos_migrados:
+        reconstruir_resumenes_diarios(cursor)
+
+    # Cortes periódicos del kardex de inventario
+    inicializar_cortes_kardex(cursor)
+
+    # Tomas de inventario (conteo físico)
+    inicializar_tomas_inventario(cursor)
+
+    # Registro de cambios de productos (sincroniza el catálogo entre terminales)
+    inicializar_cambios_productos(cursor)
+
     # ==========================================
     # 3. DATOS INICIALES
     # ==========================================
@@ -247,6 +1071,7 @@ def inicializar_base_de_datos():
     cursor.execute("INSERT OR IGNORE INTO usuarios (username, password_hash, rol_id) VALUES (?, ?, ?)", 
                    ('admin', hash_clave, 1))
     cursor.execute("INSERT OR IGNORE INTO configuracion (id, tasa_bcv, tasa_cop) VALUES (1, 36.50, 3900.0)")
+    inicializar_secuencias(cursor)
     cursor.execute("INSERT OR IGNORE INTO clientes (id, cedula_rif, nombre) VALUES (1, '00000000', 'CONSUMIDOR FINAL')")
 
     conn.commit()
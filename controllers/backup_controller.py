@@ -1,4 +1,4 @@
-import shutil
+import sqlite3
 import os
 from datetime import datetime
 
@@ -28,7 +28,19 @@ class BackupController:
             ruta_final = os.path.join("backups", nombre_backup)
 
         try:
-            shutil.copy2(origen, ruta_final)
+            # API de respaldo en línea de SQLite: copia una instantánea consistente
+            # (incluido lo que aún está en el WAL) aunque otras conexiones o
+            # terminales estén leyendo o escribiendo.
+            fuente = sqlite3.connect(origen)
+            destino = sqlite3.connect(ruta_final)
+            try:
+                fuente.backup(destino)
+                # La copia queda en un solo archivo, sin -wal aparte
+                destino.execute("PRAGMA journal_mode=DELETE")
+            finally:
+                destino.close()
+                fuente.close()
+
             return True, f"Respaldo creado en: {ruta_final}"
         except Exception as e:
             return False, f"Error al respaldar: {str(e)}"
\ No newline at end of file
@@ -1,36 +1,40 @@
 import sqlite3
-from data.conexion import crear_conexion
+from data.conexion import crear_conexion, transaccion
 from datetime import datetime
+from controllers.terminal_controller import TerminalController
+from controllers.kardex_controller import KardexController
 
 class CashController:
 
     @staticmethod
     def _obtener_ultimo_saldo(cursor, sesion_id):
-        """Función interna para saber cuánto dinero había antes de la operación actual"""
+        """Función interna para saber cuánto dinero hay en la sesión (saldo corriente, O(1))"""
         cursor.execute("""
-            SELECT saldo_usd, saldo_bs, saldo_cop 
-            FROM caja_kardex 
-            WHERE sesion_id = ? 
-            ORDER BY id DESC LIMIT 1
+            SELECT saldo_actual_usd, saldo_actual_bs, saldo_actual_cop 
+            FROM caja_sesiones WHERE id = ?
         """, (sesion_id,))
-        last = cursor.fetchone()
-        
-        # 1. Si hay Kardex, retornamos su saldo exacto
-        if last:
-            return last['saldo_usd'], last['saldo_bs'], last['saldo_cop']
-            
-        # CORRECCIÓN: Se eliminó la consulta a caja_sesiones. 
-        # Si no hay Kardex aún (es la apertura), el saldo previo es CERO.
+        row = cursor.fetchone()
+        if row:
+            return row[0], row[1], row[2]
         return 0.0, 0.0, 0.0
 
     @staticmethod
     def _registrar_kardex(cursor, sesion_id, operacion, in_usd, out_usd, in_bs, out_bs, in_cop, out_cop, desc, ref):
-        """Registra una línea en el libro mayor de caja"""
-        prev_usd, prev_bs, prev_cop = CashController._obtener_ultimo_saldo(cursor, sesion_id)
-        
-        nuevo_usd = prev_usd + in_usd - out_usd
-        nuevo_bs = prev_bs + in_bs - out_bs
-        nuevo_cop = prev_cop + in_cop - out_cop
+        """Registra una línea en el libro mayor de caja y mueve el saldo corriente de la sesión"""
+        # El UPDATE toma el bloqueo de escritura: saldo y asiento quedan en la misma transacción.
+        # Cada terminal mueve solo la fila de su propia sesión: dos cajas nunca compiten por el mismo saldo.
+        cursor.execute("""
+            UPDATE caja_sesiones SET 
+                saldo_actual_usd = saldo_actual_usd + ?,
+                saldo_actual_bs = saldo_actual_bs + ?,
+                saldo_actual_cop = saldo_actual_cop + ?
+            WHERE id = ?
+            RETURNING saldo_actual_usd, saldo_actual_bs, saldo_actual_cop, usuario_id
+        """, (in_usd - out_usd, in_bs - out_bs, in_cop - out_cop, sesion_id))
+        row = cursor.fetchone()
+        if not row:
+            raise ValueError(f"Sesión de caja {sesion_id} no encontrada")
+        nuevo_usd, nuevo_bs, nuevo_cop, usuario_id = row[0], row[1], row[2], row[3]
         
         cursor.execute("""
             INSERT INTO caja_kardex (
@@ -39,69 +43,85 @@ class CashController:
                 entrada_bs, salida_bs, saldo_bs,
                 entrada_cop, salida_cop, saldo_cop,
                 descripcion, referencia_doc, fecha, usuario_id
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             sesion_id, operacion,
             in_usd, out_usd, nuevo_usd,
             in_bs, out_bs, nuevo_bs,
             in_cop, out_cop, nuevo_cop,
-            desc, ref, datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            desc, ref, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), usuario_id
         ))
 
     @staticmethod
-    def obtener_sesion_activa(usuario_id=1):
+    def obtener_sesion_activa(usuario_id=None, terminal_id=None, cursor=None):
+        """
+        Sesión ABIERTA de una terminal (por defecto, la de este equipo).
+        Con usuario_id solo la retorna si pertenece a ese cajero.
+        Con cursor se consulta dentro de la transacción del llamador.
+        """
+        if terminal_id is None:
+            terminal_id = TerminalController.actual()['id']
+        conn = None
         try:
-            conn = crear_conexion()
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM caja_sesiones WHERE usuario_id = ? AND estado = 'ABIERTA'", (usuario_id,))
+            if cursor is None:
+                conn = crear_conexion()
+                cursor = conn.cursor()
+            cursor.execute("SELECT * FROM caja_sesiones WHERE terminal_id = ? AND estado = 'ABIERTA'", (terminal_id,))
             sesion = cursor.fetchone()
-            conn.close()
+            if sesion and usuario_id is not None and sesion['usuario_id'] != usuario_id:
+                return None
             return sesion
         except Exception as e:
             print(f"Error buscando sesión: {e}")
             return None
+        finally:
+            if conn: conn.close()
 
     @staticmethod
     def abrir_caja(usuario_id, inicial_usd, inicial_bs, inicial_cop):
-        if CashController.obtener_sesion_activa(usuario_id):
-            return False, "Ya tienes una caja abierta."
+        terminal = TerminalController.actual()
+        if CashController.obtener_sesion_activa(terminal_id=terminal['id']):
+            return False, "Esta terminal ya tiene una caja abierta."
 
         try:
-            conn = crear_conexion()
-            cursor = conn.cursor()
-            
-            # 1. Crear Sesión
-            cursor.execute("""
-                INSERT INTO caja_sesiones (
-                    usuario_id, fecha_apertura, 
-                    monto_inicial_usd, monto_inicial_bs, monto_inicial_cop,
-                    estado
-                ) VALUES (?, ?, ?, ?, ?, 'ABIERTA')
-            """, (
-                usuario_id, datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                inicial_usd, inicial_bs, inicial_cop
-            ))
-            sesion_id = cursor.lastrowid
-            
-            # 2. Kardex: Asiento de Apertura
-            CashController._registrar_kardex(
-                cursor, sesion_id, "APERTURA",
-                inicial_usd, 0, inicial_bs, 0, inicial_cop, 0,
-                "Fondo Inicial de Caja", f"SES-{sesion_id}"
-            )
-            
-            conn.commit()
-            conn.close()
+            with transaccion() as cursor:
+                # 1. Crear Sesión (el índice único por terminal impide dos aperturas simultáneas)
+                cursor.execute("""
+                    INSERT INTO caja_sesiones (
+                        usuario_id, terminal_id, fecha_apertura, 
+                        monto_inicial_usd, monto_inicial_bs, monto_inicial_cop,
+                        estado
+                    ) VALUES (?, ?, ?, ?, ?, ?, 'ABIERTA')
+                """, (
+                    usuario_id, terminal['id'], datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    inicial_usd, inicial_bs, inicial_cop
+                ))
+                sesion_id = cursor.lastrowid
+                
+                # 2. Kardex: Asiento de Apertura
+                CashController._registrar_kardex(
+                    cursor, sesion_id, "APERTURA",
+                    inicial_usd, 0, inicial_bs, 0, inicial_cop, 0,
+                    "Fondo Inicial de Caja", f"SES-{sesion_id}"
+                )
             return True, "Caja abierta correctamente."
+        except sqlite3.IntegrityError:
+            return False, "Esta terminal ya tiene una caja abierta."
         except Exception as e:
             return False, f"Error al abrir: {e}"
 
     @staticmethod
-    def registrar_movimiento(sesion_id, tipo, monto_usd, monto_bs, monto_cop, motivo, usuario_id=1):
+    def registrar_movimiento(sesion_id, tipo, monto_usd, monto_bs, monto_cop, motivo, usuario_id=None):
         try:
             conn = crear_conexion()
             cursor = conn.cursor()
             
+            # El movimiento queda a nombre del cajero de la sesión si no se indica otro
+            if usuario_id is None:
+                cursor.execute("SELECT usuario_id FROM caja_sesiones WHERE id = ?", (sesion_id,))
+                row = cursor.fetchone()
+                usuario_id = row[0] if row else None
+
             # 1. Guardar Movimiento
             cursor.execute("""
                 INSERT INTO caja_movimientos (
@@ -197,12 +217,10 @@ class CashController:
             v_bs = v['neto_bs'] if v and v['neto_bs'] is not None else 0
             v_cop = v['neto_cop'] if v and v['neto_cop'] is not None else 0
             
-            cursor.execute("SELECT saldo_usd, saldo_bs, saldo_cop FROM caja_kardex WHERE sesion_id = ? ORDER BY id DESC LIMIT 1", (sesion_id,))
-            last = cursor.fetchone()
-            
-            sis_usd = last['saldo_usd'] if last else sesion['monto_inicial_usd']
-            sis_bs = last['saldo_bs'] if last else sesion['monto_inicial_bs']
-            sis_cop = last['saldo_cop'] if last else sesion['monto_inicial_cop']
+            # Saldo corriente mantenido por _registrar_kardex
+            sis_usd = sesion['saldo_actual_usd']
+            sis_bs = sesion['saldo_actual_bs']
+            sis_cop = sesion['saldo_actual_cop']
             
             return {
                 'inicial_usd': sesion['monto_inicial_usd'], 'inicial_bs': sesion['monto_inicial_bs'], 'inicial_cop': sesion['monto_inicial_cop'],
@@ -239,20 +257,69 @@ class CashController:
             
             conn.commit()
             conn.close()
+
+            # Corte del kardex de inventario: las consultas de existencias históricas parten de aquí
+            try:
+                KardexController.generar_cortes()
+            except Exception as e_corte:
+                print(f"⚠️ Caja cerrada, pero no se pudo generar el corte del kardex: {e_corte}")
             return True, "Caja cerrada."
         except Exception as e: return False, str(e)
 
     @staticmethod
-    def obtener_saldos_actuales():
-        """Devuelve el dinero exacto que hay en la caja en este instante."""
-        sesion = CashController.obtener_sesion_activa()
+    def obtener_saldos_actuales(cursor=None):
+        """Devuelve el dinero exacto que hay en la caja de esta terminal en este instante."""
+        sesion = CashController.obtener_sesion_activa(cursor=cursor)
         if not sesion: return 0.0, 0.0, 0.0
-        
+        return sesion['saldo_actual_usd'], sesion['saldo_actual_bs'], sesion['saldo_actual_cop']
+
+    @staticmethod
+    def verificar_saldos(reparar=False, tolerancia=0.005):
+        """
+        Recalcula el saldo de cada sesión desde el libro mayor (caja_kardex) y lo
+        compara con el saldo corriente guardado en caja_sesiones.
+        Con reparar=True reescribe los saldos descuadrados.
+        Retorna la lista de sesiones con diferencias.
+        """
         conn = crear_conexion()
-        if not conn: return 0.0, 0.0, 0.0
+        if not conn: return []
         try:
             cursor = conn.cursor()
-            u, b, c = CashController._obtener_ultimo_saldo(cursor, sesion['id'])
-            return u, b, c
+            cursor.execute("""
+                SELECT s.id, s.saldo_actual_usd, s.saldo_actual_bs, s.saldo_actual_cop,
+                       COALESCE(SUM(k.entrada_usd - k.salida_usd), 0) as ledger_usd,
+                       COALESCE(SUM(k.entrada_bs - k.salida_bs), 0) as ledger_bs,
+                       COALESCE(SUM(k.entrada_cop - k.salida_cop), 0) as ledger_cop,
+                       COUNT(k.id) as asientos
+                FROM caja_sesiones s
+                LEFT JOIN caja_kardex k ON k.sesion_id = s.id
+                GROUP BY s.id
+            """)
+            
+            descuadres = []
+            for row in cursor.fetchall():
+                # Sesiones antiguas sin asientos: el saldo es el fondo inicial
+                if row['asientos'] == 0: continue
+                
+                diferencias = {
+                    moneda: row[f'saldo_actual_{moneda}'] - row[f'ledger_{moneda}']
+                    for moneda in ('usd', 'bs', 'cop')
+                }
+                if any(abs(d) > tolerancia for d in diferencias.values()):
+                    descuadres.append({
+                        'sesion_id': row['id'],
+                        'saldo_guardado': (row['saldo_actual_usd'], row['saldo_actual_bs'], row['saldo_actual_cop']),
+                        'saldo_kardex': (row['ledger_usd'], row['ledger_bs'], row['ledger_cop']),
+                        'diferencias': diferencias
+                    })
+            
+            if reparar and descuadres:
+                cursor.executemany("""
+                    UPDATE caja_sesiones SET saldo_actual_usd = ?, saldo_actual_bs = ?, saldo_actual_cop = ?
+                    WHERE id = ?
+                """, [(*d['saldo_kardex'], d['sesion_id']) for d in descuadres])
+                conn.commit()
+                
+            return descuadres
         finally:
-            conn.close()
\ No newline at end of file
+            conn.close()
@@ -0,0 +1,224 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+from data import conexion
+from controllers.inventory_controller import InventoryController
+
+class CatalogController:
+    """
+    Catálogo de productos compartido por todo el proceso (ventas, notas de entrega,
+    compras). Se carga una sola vez y luego se actualiza por producto: los
+    controladores que modifican stock o precios avisan qué ids cambiaron y las
+    vistas piden solo los cambios desde la versión que ya tienen.
+    Lo que escriben otras terminales se detecta con PRAGMA data_version (igual que
+    ConfigController): si cambió, se releen los productos anotados en
+    productos_cambios (lo llenan triggers en cada escritura a productos: stock,
+    precio, descripción, estado) desde la última revisión.
+    """
+    INTERVALO_VERIFICACION = 0.5
+
+    _lock = threading.RLock()
+    _cargado = False
+    _por_id = {}
+    _por_codigo = {}
+    _ordenados = None
+    _pendientes = set()
+    _version = 0
+    # (version, ids) de cada cambio aplicado; ids=None significa recarga completa
+    _historial = deque(maxlen=500)
+
+    _vigilante = None       # conexión propia: data_version es por conexión
+    _ruta = None
+    _data_version = None
+    _ultima_verificacion = 0.0
+    _ultimo_cambio = 0      # último id de productos_cambios ya aplicado
+
+    @staticmethod
+    def _clave_codigo(codigo):
+        """El código interno es también el código de barras: se compara sin espacios y en mayúsculas."""
+        return str(codigo).strip().upper()
+
+    # ------------------------------------------------------------------
+    # CARGA Y SINCRONIZACIÓN
+    # ------------------------------------------------------------------
+    @classmethod
+    def _registrar_version(cls, ids):
+        cls._version += 1
+        cls._historial.append((cls._version, frozenset(ids) if ids is not None else None))
+
+    @classmethod
+    def _abrir_vigilante(cls):
+        """Toma la marca (data_version, último cambio registrado) antes de leer el catálogo."""
+        if cls._vigilante is None or cls._ruta != conexion.DB_PATH:
+            if cls._vigilante: cls._vigilante.close()
+            cls._vigilante = sqlite3.connect(conexion.DB_PATH, check_same_thread=False)
+            cls._ruta = conexion.DB_PATH
+        cls._data_version = cls._vigilante.execute("PRAGMA data_version").fetchone()[0]
+        cls._ultimo_cambio = cls._vigilante.execute("SELECT COALESCE(MAX(id), 0) FROM productos_cambios").fetchone()[0]
+        cls._ultima_verificacion = time.monotonic()
+
+    @classmethod
+    def _revisar_cambios_externos(cls):
+        """Marca como pendientes los productos que otra conexión (u otra terminal) movió."""
+        ahora = time.monotonic()
+        if ahora - cls._ultima_verificacion < cls.INTERVALO_VERIFICACION: return
+        cls._ultima_verificacion = ahora
+        try:
+            version = cls._vigilante.execute("PRAGMA data_version").fetchone()[0]
+            if version == cls._data_version: return
+            cls._data_version = version
+
+            primero = cls._vigilante.execute("SELECT MIN(id) FROM productos_cambios").fetchone()[0]
+            if primero is not None and primero > cls._ultimo_cambio + 1:
+                # Se depuraron cambios que este catálogo no alcanzó a leer
+                cls._cargado = False
+                cls._asegurar_carga()
+                return
+
+            cursor = cls._vigilante.execute(
+                "SELECT producto_id, MAX(id) FROM productos_cambios WHERE id > ? GROUP BY producto_id",
+                (cls._ultimo_cambio,))
+            for pid, cambio_id in cursor.fetchall():
+                cls._pendientes.add(pid)
+                cls._ultimo_cambio = max(cls._ultimo_cambio, cambio_id)
+        except sqlite3.Error:
+            # Sin forma de saber qué cambió: recarga completa
+            cls._cargado = False
+            cls._asegurar_carga()
+
+    @classmethod
+    def _asegurar_carga(cls):
+        if cls._cargado and cls._ruta == conexion.DB_PATH: return
+        cls._abrir_vigilante()
+        productos = InventoryController.obtener_todos()
+        cls._por_id = {p['id']: p for p in productos}
+        cls._por_codigo = {cls._clave_codigo(p['codigo']): p for p in productos}
+        cls._ordenados = productos
+        cls._pendientes = set()
+        cls._cargado = True
+        cls._registrar_version(None)
+
+    @classmethod
+    def _sincronizar(cls):
+        """Relee de la BD solo los productos marcados como modificados (aquí o en otra terminal)."""
+        cls._asegurar_carga()
+        cls._revisar_cambios_externos()
+        if not cls._pendientes: return
+
+        ids = list(cls._pendientes)
+        cls._pendientes = set()
+
+        frescos = {}
+        for i in range(0, len(ids), 500):
+            for p in InventoryController.obtener_todos(ids[i:i + 500]):
+                frescos[p['id']] = p
+
+        for pid in ids:
+            actual = cls._por_id.get(pid)
+            nuevo = frescos.get(pid)
+            if nuevo is None:
+                # Eliminado o desactivado
+                if actual:
+                    cls._por_id.pop(pid, None)
+                    cls._por_codigo.pop(cls._clave_codigo(actual['codigo']), None)
+                    cls._ordenados = None
+            elif actual is None:
+                cls._por_id[pid] = nuevo
+                cls._por_codigo[cls._clave_codigo(nuevo['codigo'])] = nuevo
+                cls._ordenados = None
+            else:
+                if actual['descripcion'] != nuevo['descripcion']:
+                    cls._ordenados = None
+                if actual['codigo'] != nuevo['codigo']:
+                    cls._por_codigo.pop(cls._clave_codigo(actual['codigo']), None)
+                    cls._por_codigo[cls._clave_codigo(nuevo['codigo'])] = actual
+                # Se actualiza en sitio: quien tenga la referencia ve el dato nuevo
+                actual.update(nuevo)
+
+        cls._registrar_version(ids)
+
+    # ------------------------------------------------------------------
+    # CONSULTAS
+    # ------------------------------------------------------------------
+    @classmethod
+    def obtener_todos(cls):
+        """Lista de productos activos ordenada por descripción (mismo formato que InventoryController)."""
+        with cls._lock:
+            cls._sincronizar()
+            if cls._ordenados is None:
+                cls._ordenados = sorted(cls._por_id.values(), key=lambda p: p['descripcion'])
+            return list(cls._ordenados)
+
+    @classmethod
+    def por_id(cls, producto_id):
+        with cls._lock:
+            cls._sincronizar()
+            return cls._por_id.get(producto_id)
+
+    @classmethod
+    def por_codigo(cls, codigo):
+        """Búsqueda O(1) por código interno / código de barras escaneado."""
+        with cls._lock:
+            cls._sincronizar()
+            return cls._por_codigo.get(cls._clave_codigo(codigo))
+
+    @classmethod
+    def version(cls):
+        with cls._lock:
+            cls._sincronizar()
+            return cls._version
+
+    @classmethod
+    def cambios_desde(cls, version):
+        """
+        Retorna (version_actual, ids) con los productos que cambiaron después de
+        `version`. ids=None indica que hubo una recarga completa (o el historial
+        ya no alcanza) y la vista debe reconstruirse entera.
+        """
+        with cls._lock:
+            cls._sincronizar()
+            if version == cls._version:
+                return cls._version, set()
+            if not cls._historial or version < cls._historial[0][0] - 1:
+                return cls._version, None
+
+            ids = set()
+            for v, cambiados in cls._historial:
+                if v <= version: continue
+                if cambiados is None: return cls._version, None
+                ids |= cambiados
+            return cls._version, ids
+
+    # ------------------------------------------------------------------
+    # AVISOS DE CAMBIO (los llaman los controladores tras confirmar)
+    # ------------------------------------------------------------------
+    @classmethod
+    def marcar_modificados(cls, ids):
+        """Marca productos para releerlos de la BD en la próxima consulta."""
+        with cls._lock:
+            if cls._cargado:
+                cls._pendientes.update(ids)
+
+    @classmethod
+    def actualizar_stock(cls, stock_por_id):
+        """Aplica en memoria el stock resultante ya conocido ({producto_id: stock}), sin consultar la BD."""
+        with cls._lock:
+            if not cls._cargado or not stock_por_id: return
+            for pid, stock in stock_por_id.items():
+                producto = cls._por_id.get(pid)
+                if producto is not None:
+                    producto['stock_actual'] = stock
+                else:
+                    cls._pendientes.add(pid)
+            cls._registrar_version(stock_por_id.keys())
+
+    @classmethod
+    def invalidar(cls):
+        """Descarta todo el catálogo (p. ej. al cambiar las tasas: cambian todos los precios en Bs/COP)."""
+        with cls._lock:
+            cls._cargado = False
+            cls._por_id = {}
+            cls._por_codigo = {}
+            cls._ordenados = None
+            cls._pendientes = set()
@@ -1,5 +1,8 @@
 import sys
 import os
+import sqlite3
+import threading
+import time
 from datetime import datetime # <--- IMPORTANTE: Necesario para registrar la fecha del cambio
 
 # Agregamos la carpeta raíz al path para que Python encuentre la carpeta 'data'
@@ -11,23 +14,90 @@ try:
 except ImportError:
     # En caso de que se ejecute desde la raíz directamente
     from data.conexion import crear_conexion
+
+from data import conexion
+from core.app_signals import comunicacion
+from controllers.catalog_controller import CatalogController
     
 class ConfigController:
-    @staticmethod
-    def obtener_configuracion():
-        """Obtiene la fila única de configuración usando la conexión profesional"""
+    """
+    La fila de configuración (tasas, datos de la empresa) se lee una vez y se
+    sirve desde memoria. Se invalida al guardar desde este proceso, avisando con
+    la señal configuracion_actualizada; los cambios de otra terminal se detectan
+    con PRAGMA data_version, revisado como máximo cada INTERVALO_VERIFICACION s.
+    """
+    INTERVALO_VERIFICACION = 2.0
+
+    _lock = threading.RLock()
+    _cache = None
+    _ruta = None
+    _vigilante = None       # conexión propia: data_version es por conexión
+    _data_version = None
+    _ultima_verificacion = 0.0
+
+    @classmethod
+    def _cambio_externo(cls):
+        """True si otra conexión (o proceso) confirmó cambios en la base desde la última lectura."""
+        ahora = time.monotonic()
+        if ahora - cls._ultima_verificacion < cls.INTERVALO_VERIFICACION:
+            return False
+        cls._ultima_verificacion = ahora
+        try:
+            version = cls._vigilante.execute("PRAGMA data_version").fetchone()[0]
+        except sqlite3.Error:
+            return True
+        if version == cls._data_version:
+            return False
+        cls._data_version = version
+        return True
+
+    @classmethod
+    def _cargar(cls):
+        if cls._vigilante is None or cls._ruta != conexion.DB_PATH:
+            if cls._vigilante: cls._vigilante.close()
+            cls._vigilante = sqlite3.connect(conexion.DB_PATH, check_same_thread=False)
+            cls._ruta = conexion.DB_PATH
+        # La versión se toma antes de leer: un cambio a mitad de la lectura se detecta después
+        cls._data_version = cls._vigilante.execute("PRAGMA data_version").fetchone()[0]
+        cls._ultima_verificacion = time.monotonic()
+
         conn = crear_conexion()
         if not conn: 
             return None
         try:
-            # Esto permite acceder a las columnas por nombre (ej: config['tasa_bcv'])
-            conn.row_factory = lambda cursor, row: dict(zip([col[0] for col in cursor.description], row))
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM configuracion WHERE id = 1")
-            return cursor.fetchone()
+            row = cursor.fetchone()
+            return dict(row) if row else None
         finally:
             conn.close()
 
+    @classmethod
+    def obtener_configuracion(cls):
+        """Fila única de configuración como dict (ej: config['tasa_bcv']), servida desde la caché."""
+        with cls._lock:
+            if cls._cache is None or cls._ruta != conexion.DB_PATH or cls._cambio_externo():
+                anterior, cls._cache = cls._cache, cls._cargar()
+                # Tasas cambiadas desde otra terminal: los precios en Bs/COP del catálogo quedaron viejos
+                campos = ('tasa_bcv', 'tasa_cop')
+                if anterior and cls._cache and any(anterior.get(c) != cls._cache.get(c) for c in campos):
+                    CatalogController.invalidar()
+                    comunicacion.publicar_configuracion(list(campos))
+            return dict(cls._cache) if cls._cache else None
+
+    @classmethod
+    def obtener_tasas(cls):
+        """{'bcv': float, 'cop': float} desde la caché."""
+        config = cls.obtener_configuracion()
+        if not config: return {'bcv': 0.0, 'cop': 0.0}
+        return {'bcv': config['tasa_bcv'] or 0.0, 'cop': config['tasa_cop'] or 0.0}
+
+    @classmethod
+    def invalidar(cls):
+        """La próxima lectura vuelve a la base de datos (tras restaurar un respaldo, por ejemplo)."""
+        with cls._lock:
+            cls._cache = None
+
     @staticmethod
     def actualizar_tasas(tasa_bcv, tasa_cop):
         """Actualiza las tasas y deja registro en el historial si cambiaron"""
@@ -68,6 +138,11 @@ class ConfigController:
             """, (tasa_bcv, tasa_cop))
             
             conn.commit()
+            
+            # Cambian los precios en Bs/COP de todo el catálogo
+            ConfigController.invalidar()
+            CatalogController.invalidar()
+            comunicacion.publicar_configuracion(['tasa_bcv', 'tasa_cop'])
             return True
         except Exception as e:
             print(f"❌ Error al actualizar tasas: {e}")
@@ -97,6 +172,8 @@ class ConfigController:
                     WHERE id=1
                 """, (datos['rif'], datos['razon_social'], datos['direccion'], datos['igtf']))
             conn.commit()
+            ConfigController.invalidar()
+            comunicacion.publicar_configuracion(['rif', 'razon_social', 'direccion_fiscal', 'porcentaje_igtf'])
             return True
         except Exception as e:
             print(f"Error al guardar datos empresa: {e}")
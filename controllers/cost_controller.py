@@ -0,0 +1,90 @@
+class CostController:
+    """
+    Costo de inventario por producto, en USD:
+      - Capas FIFO (tabla costo_capas): cada entrada de mercancía abre una capa con
+        su costo; las salidas consumen las capas más antiguas primero.
+      - Costo promedio ponderado (productos.costo_promedio_usd): se recalcula con
+        cada entrada y sirve de respaldo si una salida supera las capas abiertas.
+    Todas las funciones reciben el cursor de la transacción que mueve el stock y
+    deben llamarse ANTES de actualizar stock_actual (el promedio usa el stock previo).
+    """
+
+    @staticmethod
+    def _leer_productos(cursor, ids):
+        datos = {}
+        ids = list(ids)
+        for i in range(0, len(ids), 500):
+            bloque = ids[i:i + 500]
+            marcas = ",".join("?" * len(bloque))
+            cursor.execute(f"SELECT id, stock_actual, costo_promedio_usd FROM productos WHERE id IN ({marcas})", bloque)
+            datos.update((row[0], [row[1] or 0, row[2] or 0]) for row in cursor.fetchall())
+        return datos
+
+    @staticmethod
+    def registrar_entrada(cursor, lineas, origen, referencia, fecha):
+        """
+        Abre una capa por línea y actualiza el costo promedio ponderado.
+        lineas: [(producto_id, cantidad, costo_unitario_usd), ...]
+        origen: 'COMPRA', 'DEVOLUCION', 'AJUSTE' o 'INICIAL'.
+        """
+        productos = CostController._leer_productos(cursor, {pid for pid, _, _ in lineas})
+        for producto_id, cantidad, costo in lineas:
+            if producto_id not in productos or cantidad <= 0: continue
+            stock, promedio = productos[producto_id]
+            # Con stock previo nulo o negativo el promedio es el costo de la entrada
+            if stock <= 0:
+                promedio = costo
+            else:
+                promedio = (stock * promedio + cantidad * costo) / (stock + cantidad)
+            productos[producto_id] = [stock + cantidad, promedio]
+
+        cursor.executemany("""
+            INSERT INTO costo_capas (producto_id, fecha, origen, referencia, cantidad_inicial, cantidad_restante, costo_unitario_usd)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, [(pid, fecha, origen, referencia, cant, cant, costo) for pid, cant, costo in lineas if cant > 0])
+        cursor.executemany("UPDATE productos SET costo_promedio_usd = ? WHERE id = ?",
+                           [(promedio, pid) for pid, (_, promedio) in productos.items()])
+
+    @staticmethod
+    def consumir(cursor, lineas):
+        """
+        Descuenta las cantidades de las capas FIFO abiertas.
+        lineas: [(producto_id, cantidad), ...] en el orden del documento.
+        Retorna el costo total (USD) de cada línea, en el mismo orden.
+        """
+        promedios = {pid: datos[1] for pid, datos in CostController._leer_productos(cursor, {pid for pid, _ in lineas}).items()}
+        capas = {}
+        for producto_id in promedios:
+            cursor.execute("""
+                SELECT id, cantidad_restante, costo_unitario_usd FROM costo_capas
+                WHERE producto_id = ? AND cantidad_restante > 0 ORDER BY id
+            """, (producto_id,))
+            capas[producto_id] = [list(row) for row in cursor.fetchall()]
+
+        costos = []
+        modificadas = {}
+        for producto_id, cantidad in lineas:
+            pendiente = cantidad
+            costo = 0.0
+            for capa in capas.get(producto_id, []):
+                if pendiente <= 0: break
+                if capa[1] <= 0: continue
+                tomado = min(capa[1], pendiente)
+                capa[1] -= tomado
+                pendiente -= tomado
+                costo += tomado * capa[2]
+                modificadas[capa[0]] = capa[1]
+            # Vendido sin capas (stock previo sin costo o inventario negativo): costo promedio
+            if pendiente > 0:
+                costo += pendiente * promedios.get(producto_id, 0)
+            costos.append(costo)
+
+        cursor.executemany("UPDATE costo_capas SET cantidad_restante = ? WHERE id = ?",
+                           [(restante, capa_id) for capa_id, restante in modificadas.items()])
+        return costos
+
+    @staticmethod
+    def costo_promedio(cursor, producto_id):
+        cursor.execute("SELECT costo_promedio_usd FROM productos WHERE id = ?", (producto_id,))
+        row = cursor.fetchone()
+        return (row[0] or 0) if row else 0
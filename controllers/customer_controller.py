@@ -31,6 +31,30 @@ class CustomerController:
         finally:
             conn.close()
 
+    @staticmethod
+    def obtener_pagina(texto="", limite=200, desplazamiento=0):
+        """Página de la grilla de clientes, filtrada en la BD por cédula/RIF o nombre."""
+        conn = crear_conexion()
+        if not conn: return []
+        try:
+            cursor = conn.cursor()
+            filtro = ""
+            params = []
+            texto = (texto or "").strip()
+            if texto:
+                filtro = "WHERE cedula_rif LIKE ? OR cedula_rif LIKE ? OR nombre LIKE ?"
+                params = [f"%{CustomerController.normalizar_cedula(texto)}%", f"%{texto.upper()}%", f"%{texto}%"]
+            cursor.execute(f"""
+                SELECT * FROM clientes {filtro}
+                ORDER BY nombre ASC LIMIT ? OFFSET ?
+            """, params + [limite, desplazamiento])
+            return [dict(fila) for fila in cursor.fetchall()]
+        except Exception as e:
+            print(f"Error cargando clientes: {e}")
+            return []
+        finally:
+            conn.close()
+
     @staticmethod
     def guardar_cliente(datos):
         conn = crear_conexion()
@@ -1,5 +1,5 @@
 import sqlite3
-from datetime import datetime
+from controllers.date_utils import rango_dia, filtro_rango
 
 class DashboardController:
     @staticmethod
@@ -8,21 +8,18 @@ class DashboardController:
         conn = sqlite3.connect('data/pegasus_fisco.db')
         cursor = conn.cursor()
         
-        # Obtenemos la fecha actual en formato YYYY-MM-DD
-        hoy = datetime.now().strftime('%Y-%m-%d')
-        
-        query = """
+        query = f"""
             SELECT 
                 SUM(pago_usd), 
                 SUM(pago_ves), 
                 SUM(pago_cop), 
                 SUM(total_ves) 
             FROM ventas 
-            WHERE date(fecha) = ?
+            WHERE {filtro_rango()}
         """
         
         try:
-            cursor.execute(query, (hoy,))
+            cursor.execute(query, rango_dia())
             resultado = cursor.fetchone()
             
             # Si no hay ventas, devolvemos ceros
@@ -0,0 +1,50 @@
+from datetime import date, datetime, timedelta
+
+# Las fechas se guardan como texto 'YYYY-MM-DD HH:MM:SS', así que comparar contra
+# límites 'YYYY-MM-DD' es correcto y permite usar los índices sobre la columna.
+FORMATO_DIA = "%Y-%m-%d"
+
+
+def _a_fecha(valor):
+    if valor is None:
+        return date.today()
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return datetime.strptime(str(valor)[:10], FORMATO_DIA).date()
+
+
+def rango_dia(fecha=None):
+    """Rango semiabierto [inicio, fin) de un día (por defecto, hoy)."""
+    inicio = _a_fecha(fecha)
+    fin = inicio + timedelta(days=1)
+    return inicio.strftime(FORMATO_DIA), fin.strftime(FORMATO_DIA)
+
+
+def rango_ultimos_dias(dias, hasta=None):
+    """Rango semiabierto de los últimos `dias` días, incluyendo `hasta` (por defecto, hoy)."""
+    ultimo = _a_fecha(hasta)
+    inicio = ultimo - timedelta(days=dias - 1)
+    fin = ultimo + timedelta(days=1)
+    return inicio.strftime(FORMATO_DIA), fin.strftime(FORMATO_DIA)
+
+
+def rango_semana(fecha=None):
+    """Rango semiabierto de la semana (lunes a domingo) que contiene `fecha`."""
+    dia = _a_fecha(fecha)
+    inicio = dia - timedelta(days=dia.weekday())
+    fin = inicio + timedelta(days=7)
+    return inicio.strftime(FORMATO_DIA), fin.strftime(FORMATO_DIA)
+
+
+def rango_mes(mes, anio):
+    """Rango semiabierto de un mes calendario."""
+    inicio = date(int(anio), int(mes), 1)
+    fin = date(inicio.year + 1, 1, 1) if inicio.month == 12 else date(inicio.year, inicio.month + 1, 1)
+    return inicio.strftime(FORMATO_DIA), fin.strftime(FORMATO_DIA)
+
+
+def filtro_rango(columna="fecha"):
+    """Fragmento SQL indexable para un rango semiabierto: usar con los valores de rango_*()."""
+    return f"{columna} >= ? AND {columna} < ?"
@@ -1,21 +1,98 @@
 import os
 from datetime import datetime
 from data.conexion import crear_conexion
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
+from controllers.date_utils import rango_mes, filtro_rango
 
-# --- IMPORTACIONES PARA PDF (REPORTLAB) ---
-from reportlab.lib.pagesizes import legal, landscape
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+# openpyxl y ReportLab se importan dentro de cada exportación: son pesados y
+# solo se necesitan al generar un libro, no al abrir la aplicación.
+
+# Facturas del mes con su monto exento. El exento se suma una sola vez por
+# documento en un GROUP BY (limitado al mismo rango) en vez de una subconsulta
+# correlacionada por factura.
+SQL_LIBRO_VENTAS = f"""
+    SELECT 
+        d.fecha, c.cedula_rif, c.nombre, d.nro_documento, d.nro_control, 
+        d.estado, d.total_usd, d.impuesto_iva_usd, d.tasa_cambio_momento, 
+        d.iva_retenido_bs, d.documento_referencia,
+        COALESCE(ex.exento_usd, 0) as exento_usd
+    FROM documentos d
+    JOIN clientes c ON d.cliente_id = c.id
+    LEFT JOIN (
+        SELECT dd.documento_id, SUM(dd.cantidad * dd.precio_unitario_usd) as exento_usd
+        FROM documentos d2
+        JOIN documento_detalles dd ON dd.documento_id = d2.id
+        JOIN productos p ON dd.producto_id = p.id
+        WHERE d2.tipo_doc = 'FACTURA' AND {filtro_rango('d2.fecha')} AND p.es_exento = 1
+        GROUP BY dd.documento_id
+    ) ex ON ex.documento_id = d.id
+    WHERE d.tipo_doc = 'FACTURA' 
+    AND {filtro_rango('d.fecha')}
+    ORDER BY d.fecha ASC, d.id ASC
+"""
+
+FORMATO_MONTO = '#,##0.00'
+
+def _estilos_libro():
+    """Estilos con nombre del libro: se registran una vez y cada celda solo guarda la referencia."""
+    from openpyxl.styles import Font, Alignment, PatternFill, Border, Side, NamedStyle
+    borde_fino = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+    relleno_total = PatternFill(start_color="FFFFCC", end_color="FFFFCC", fill_type="solid")
+    return [
+        NamedStyle(name="libro_titulo", font=Font(bold=True)),
+        NamedStyle(name="libro_nota", font=Font(italic=True)),
+        NamedStyle(name="libro_encabezado", font=Font(bold=True), border=borde_fino,
+                   fill=PatternFill(start_color="E0E0E0", end_color="E0E0E0", fill_type="solid"),
+                   alignment=Alignment(horizontal="center", vertical="center")),
+        NamedStyle(name="libro_dato", border=borde_fino),
+        NamedStyle(name="libro_monto", border=borde_fino, number_format=FORMATO_MONTO),
+        NamedStyle(name="libro_total", font=Font(bold=True), fill=relleno_total, border=borde_fino),
+        NamedStyle(name="libro_total_monto", font=Font(bold=True), fill=relleno_total, border=borde_fino,
+                   number_format=FORMATO_MONTO),
+    ]
+
+def _iterar_filas(cursor, tamano=1000):
+    """Recorre el resultado por bloques (fetchmany) sin cargar todo el mes en memoria."""
+    while True:
+        filas = cursor.fetchmany(tamano)
+        if not filas: return
+        yield from filas
+
+def _montos_factura(fac):
+    """Montos en Bs de una factura del libro (las anuladas van en cero)."""
+    if fac['estado'] == 'ANULADO':
+        return 0, 0, 0, 0, 0
+    tasa = fac['tasa_cambio_momento']
+    total_bs = fac['total_usd'] * tasa
+    exento_bs = fac['exento_usd'] * tasa
+    iva_bs = fac['impuesto_iva_usd'] * tasa
+    base_bs = total_bs - exento_bs - iva_bs
+    return total_bs, exento_bs, base_bs, iva_bs, fac['iva_retenido_bs']
 
 class FiscalBooksController:
     
     @staticmethod
-    def generar_excel_libro_ventas(mes, anio, ruta_guardado):
-        # (El código de Excel se mantiene intacto)
+    def contar_facturas_mes(cursor, mes, anio):
+        cursor.execute(f"SELECT COUNT(*) FROM documentos WHERE tipo_doc = 'FACTURA' AND {filtro_rango('fecha')}", rango_mes(mes, anio))
+        return cursor.fetchone()[0]
+
+    @staticmethod
+    def consultar_libro_ventas(cursor, mes, anio):
+        """Ejecuta la consulta del libro de ventas; las filas se leen del cursor."""
+        rango = rango_mes(mes, anio)
+        cursor.execute(SQL_LIBRO_VENTAS, rango + rango)
+        return cursor
+
+    @staticmethod
+    def generar_excel_libro_ventas(mes, anio, ruta_guardado, avance=None):
+        """
+        Exporta el libro de ventas en streaming: lee las facturas del cursor por
+        bloques y las escribe en un libro openpyxl write_only con estilos con
+        nombre, así la memoria no crece con el número de facturas del mes.
+        avance(porcentaje, mensaje): opcional, lo usa la cola de trabajos en segundo plano.
+        """
+        import openpyxl
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.utils import get_column_letter
         conn = crear_conexion()
         if not conn: return False, "Error de conexión a la base de datos."
         try:
@@ -27,44 +104,18 @@ class FiscalBooksController:
             mes_str = str(mes).zfill(2)
             anio_str = str(anio)
             
-            cursor.execute("""
-                SELECT 
-                    d.fecha, c.cedula_rif, c.nombre, d.nro_documento, d.nro_control, 
-                    d.estado, d.total_usd, d.impuesto_iva_usd, d.tasa_cambio_momento, 
-                    d.iva_retenido_bs, d.documento_referencia,
-                    COALESCE((
-                        SELECT SUM(dd.cantidad * dd.precio_unitario_usd) 
-                        FROM documento_detalles dd 
-                        JOIN productos p ON dd.producto_id = p.id 
-                        WHERE dd.documento_id = d.id AND p.es_exento = 1
-                    ), 0) as exento_usd
-                FROM documentos d
-                JOIN clientes c ON d.cliente_id = c.id
-                WHERE d.tipo_doc = 'FACTURA' 
-                AND strftime('%m', d.fecha) = ? AND strftime('%Y', d.fecha) = ?
-                ORDER BY d.fecha ASC, d.id ASC
-            """, (mes_str, anio_str))
-            
-            facturas = cursor.fetchall()
-            if not facturas: return False, "No hay facturas registradas en el período seleccionado."
+            total_facturas = FiscalBooksController.contar_facturas_mes(cursor, mes, anio)
+            if not total_facturas: return False, "No hay facturas registradas en el período seleccionado."
 
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.title = f"Ventas {mes_str}-{anio_str}"
-            
-            bold_font = Font(bold=True)
-            header_fill = PatternFill(start_color="E0E0E0", end_color="E0E0E0", fill_type="solid")
-            center_align = Alignment(horizontal="center", vertical="center")
-            border = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+            wb = openpyxl.Workbook(write_only=True)
+            for estilo in _estilos_libro():
+                wb.add_named_style(estilo)
+            ws = wb.create_sheet(f"Ventas {mes_str}-{anio_str}")
 
-            ws['A1'] = f"Contribuyente: {empresa['razon_social']}"
-            ws['A1'].font = bold_font
-            ws['A2'] = f"RIF: {empresa['rif']}"
-            ws['A2'].font = bold_font
-            ws['A3'] = f"LIBRO DE VENTAS - PERÍODO: {mes_str}/{anio_str}"
-            ws['A3'].font = bold_font
-            ws['A4'] = "Expresado en Bolívares (Bs.)"
-            ws['A4'].font = Font(italic=True)
+            def celda(valor, estilo=None):
+                c = WriteOnlyCell(ws, value=valor)
+                if estilo: c.style = estilo  # estilo con nombre registrado arriba
+                return c
 
             columnas = [
                 "Nro. Oper.", "Fecha Fact.", "RIF / C.I.", "Razón Social", 
@@ -72,59 +123,49 @@ class FiscalBooksController:
                 "Total Venta", "Ventas Exentas", "Base Imponible", 
                 "IVA 16%", "IVA Retenido", "Comprobante Ret."
             ]
-            ws.append([]) 
-            ws.append(columnas)
-            
+            # En modo write_only los anchos se fijan antes de escribir filas
             for col_num in range(1, len(columnas) + 1):
-                celda = ws.cell(row=6, column=col_num)
-                celda.font = bold_font; celda.fill = header_fill
-                celda.alignment = center_align; celda.border = border
-                ws.column_dimensions[openpyxl.utils.get_column_letter(col_num)].width = 16
-
+                ws.column_dimensions[get_column_letter(col_num)].width = 16
             ws.column_dimensions['D'].width = 30 
 
-            fila_actual = 7
+            ws.append([celda(f"Contribuyente: {empresa['razon_social']}", "libro_titulo")])
+            ws.append([celda(f"RIF: {empresa['rif']}", "libro_titulo")])
+            ws.append([celda(f"LIBRO DE VENTAS - PERÍODO: {mes_str}/{anio_str}", "libro_titulo")])
+            ws.append([celda("Expresado en Bolívares (Bs.)", "libro_nota")])
+            ws.append([]) 
+            ws.append([celda(c, "libro_encabezado") for c in columnas])
+
             totales = {'total': 0, 'exento': 0, 'base': 0, 'iva': 0, 'retenido': 0}
+            FiscalBooksController.consultar_libro_ventas(cursor, mes, anio)
             
-            for i, fac in enumerate(facturas, start=1):
-                tasa = fac['tasa_cambio_momento']
+            for i, fac in enumerate(_iterar_filas(cursor), start=1):
+                if avance and i % 1000 == 0:
+                    avance(i * 95 // total_facturas, f"{i} de {total_facturas} facturas")
+
+                total_bs, exento_bs, base_bs, iva_bs, retenido_bs = _montos_factura(fac)
                 es_anulada = fac['estado'] == 'ANULADO'
-                
-                total_bs = 0 if es_anulada else fac['total_usd'] * tasa
-                exento_bs = 0 if es_anulada else fac['exento_usd'] * tasa
-                iva_bs = 0 if es_anulada else fac['impuesto_iva_usd'] * tasa
-                base_bs = 0 if es_anulada else total_bs - exento_bs - iva_bs
-                retenido_bs = 0 if es_anulada else fac['iva_retenido_bs']
-                
                 fecha_formato = datetime.strptime(fac['fecha'], "%Y-%m-%d %H:%M:%S").strftime("%d/%m/%Y")
                 
-                fila_datos = [
-                    i, fecha_formato, fac['cedula_rif'], fac['nombre'], 
-                    fac['nro_documento'].replace("FAC-", ""), fac['nro_control'], 
-                    "02-ANU" if es_anulada else "01-REG", "", 
-                    round(total_bs, 2), round(exento_bs, 2), round(base_bs, 2),
-                    round(iva_bs, 2), round(retenido_bs, 2),
-                    fac['documento_referencia'] if fac['documento_referencia'] else ""
-                ]
-                
-                ws.append(fila_datos)
-                for col_num in range(1, len(fila_datos) + 1): ws.cell(row=fila_actual, column=col_num).border = border
-                for col_num in range(9, 14): ws.cell(row=fila_actual, column=col_num).number_format = '#,##0.00'
+                ws.append([
+                    celda(i, "libro_dato"), celda(fecha_formato, "libro_dato"),
+                    celda(fac['cedula_rif'], "libro_dato"), celda(fac['nombre'], "libro_dato"), 
+                    celda(fac['nro_documento'].replace("FAC-", ""), "libro_dato"), celda(fac['nro_control'], "libro_dato"), 
+                    celda("02-ANU" if es_anulada else "01-REG", "libro_dato"), celda("", "libro_dato"), 
+                    celda(round(total_bs, 2), "libro_monto"), celda(round(exento_bs, 2), "libro_monto"),
+                    celda(round(base_bs, 2), "libro_monto"), celda(round(iva_bs, 2), "libro_monto"),
+                    celda(round(retenido_bs, 2), "libro_monto"),
+                    celda(fac['documento_referencia'] if fac['documento_referencia'] else "", "libro_dato")
+                ])
                 
                 totales['total'] += total_bs; totales['exento'] += exento_bs
                 totales['base'] += base_bs; totales['iva'] += iva_bs; totales['retenido'] += retenido_bs
-                fila_actual += 1
 
-            ws.append(["", "", "", "TOTALES:", "", "", "", "", 
-                       totales['total'], totales['exento'], totales['base'], 
-                       totales['iva'], totales['retenido'], ""])
-                       
-            for col_num in range(4, 14):
-                celda = ws.cell(row=fila_actual, column=col_num)
-                celda.font = bold_font; celda.fill = PatternFill(start_color="FFFFCC", end_color="FFFFCC", fill_type="solid")
-                celda.border = border
-                if col_num >= 9: celda.number_format = '#,##0.00'
+            ws.append(["", "", "", celda("TOTALES:", "libro_total")] +
+                      [celda("", "libro_total") for _ in range(4)] +
+                      [celda(totales[k], "libro_total_monto") for k in ('total', 'exento', 'base', 'iva', 'retenido')] +
+                      [""])
 
+            if avance: avance(97, "Guardando archivo...")
             wb.save(ruta_guardado)
             return True, "Libro de Ventas Excel generado exitosamente."
         except Exception as e:
@@ -133,7 +174,12 @@ class FiscalBooksController:
             conn.close()
 
     @staticmethod
-    def generar_pdf_libro_ventas(mes, anio, ruta_guardado):
+    def generar_pdf_libro_ventas(mes, anio, ruta_guardado, avance=None):
+        """avance(porcentaje, mensaje): opcional, lo usa la cola de trabajos en segundo plano."""
+        from reportlab.lib.pagesizes import legal, landscape
+        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+        from reportlab.lib import colors
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
         conn = crear_conexion()
         if not conn: return False, "Error de conexión a la base de datos."
         
@@ -146,23 +192,7 @@ class FiscalBooksController:
             mes_str = str(mes).zfill(2)
             anio_str = str(anio)
             
-            cursor.execute("""
-                SELECT 
-                    d.fecha, c.cedula_rif, c.nombre, d.nro_documento, d.nro_control, 
-                    d.estado, d.total_usd, d.impuesto_iva_usd, d.tasa_cambio_momento, 
-                    d.iva_retenido_bs, d.documento_referencia,
-                    COALESCE((
-                        SELECT SUM(dd.cantidad * dd.precio_unitario_usd) 
-                        FROM documento_detalles dd 
-                        JOIN productos p ON dd.producto_id = p.id 
-                        WHERE dd.documento_id = d.id AND p.es_exento = 1
-                    ), 0) as exento_usd
-                FROM documentos d
-                JOIN clientes c ON d.cliente_id = c.id
-                WHERE d.tipo_doc = 'FACTURA' 
-                AND strftime('%m', d.fecha) = ? AND strftime('%Y', d.fecha) = ?
-                ORDER BY d.fecha ASC, d.id ASC
-            """, (mes_str, anio_str))
+            FiscalBooksController.consultar_libro_ventas(cursor, mes, anio)
             
             facturas = cursor.fetchall()
             if not facturas: return False, "No hay facturas registradas en este mes."
@@ -196,15 +226,11 @@ class FiscalBooksController:
             estilo_celda = ParagraphStyle(name="CeldaNormal", fontSize=7, leading=8)
             
             for i, fac in enumerate(facturas, start=1):
-                tasa = fac['tasa_cambio_momento']
+                if avance and i % 200 == 0:
+                    avance(i * 40 // len(facturas), f"{i} de {len(facturas)} facturas")
+                total_bs, exento_bs, base_bs, iva_bs, retenido_bs = _montos_factura(fac)
                 es_anulada = fac['estado'] == 'ANULADO'
                 
-                total_bs = 0 if es_anulada else fac['total_usd'] * tasa
-                exento_bs = 0 if es_anulada else fac['exento_usd'] * tasa
-                iva_bs = 0 if es_anulada else fac['impuesto_iva_usd'] * tasa
-                base_bs = 0 if es_anulada else total_bs - exento_bs - iva_bs
-                retenido_bs = 0 if es_anulada else fac['iva_retenido_bs']
-                
                 fecha_formato = datetime.strptime(fac['fecha'], "%Y-%m-%d %H:%M:%S").strftime("%d/%m/%y")
                 
                 # Se usa Paragraph para la razón social para que se ajuste al ancho
@@ -263,6 +289,7 @@ class FiscalBooksController:
             tabla.setStyle(estilo_tabla)
             
             elementos.append(tabla)
+            if avance: avance(50, "Maquetando PDF...")
             doc.build(elementos)
 
             return True, "Libro de Ventas PDF generado exitosamente."
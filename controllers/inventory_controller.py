@@ -1,29 +1,75 @@
 import sqlite3
-from data.conexion import crear_conexion
+from data.conexion import crear_conexion, busqueda_fts_disponible, expresion_fts
 from datetime import datetime
 
 class InventoryController:
     
     @staticmethod
     def obtener_tasas():
-        """Retorna un dict con las tasas actuales: {'bcv': float, 'cop': float}"""
-        conn = crear_conexion()
-        if not conn: return {'bcv': 0, 'cop': 0}
-        try:
-            cursor = conn.cursor()
-            cursor.execute("SELECT tasa_bcv, tasa_cop FROM configuracion LIMIT 1")
-            row = cursor.fetchone()
-            if row:
-                return {'bcv': row[0] or 0.0, 'cop': row[1] or 0.0}
-            return {'bcv': 0.0, 'cop': 0.0}
-        except:
-            return {'bcv': 0.0, 'cop': 0.0}
-        finally:
-            conn.close()
+        """Retorna un dict con las tasas actuales: {'bcv': float, 'cop': float} (caché de ConfigController)"""
+        # Importación local: config_controller importa el catálogo, que importa este módulo
+        from controllers.config_controller import ConfigController
+        return ConfigController.obtener_tasas()
+
+    @staticmethod
+    def aplicar_movimientos_lote(cursor, lineas, tipo_movimiento, motivo, referencia, fecha,
+                                 proveedor_id=None, usuario_id=1):
+        """
+        Aplica en bloque movimientos de stock dentro de la transacción del cursor.
+        lineas: [(producto_id, cantidad), ...] en el orden del documento.
+        Agrupa por producto, actualiza el stock con un executemany, lee los saldos
+        finales en una sola consulta y asienta todo el kardex con otro executemany.
+        Retorna {producto_id: stock_final}.
+        """
+        signo = 1 if tipo_movimiento == 'ENTRADA' else -1
+
+        totales = {}
+        for producto_id, cantidad in lineas:
+            totales[producto_id] = totales.get(producto_id, 0) + cantidad
+
+        cursor.executemany(
+            "UPDATE productos SET stock_actual = stock_actual + ? WHERE id = ?",
+            [(signo * cantidad, producto_id) for producto_id, cantidad in totales.items()]
+        )
+
+        stock_final = {}
+        ids = list(totales)
+        for i in range(0, len(ids), 500):
+            bloque = ids[i:i + 500]
+            marcas = ",".join("?" * len(bloque))
+            cursor.execute(f"SELECT id, stock_actual FROM productos WHERE id IN ({marcas})", bloque)
+            stock_final.update((row[0], row[1]) for row in cursor.fetchall())
+
+        faltantes = [pid for pid in ids if pid not in stock_final]
+        if faltantes:
+            raise ValueError(f"Producto(s) no encontrado(s): {faltantes}")
+
+        # Stock resultante línea a línea (un producto puede repetirse en el documento)
+        corriente = {pid: stock_final[pid] - signo * totales[pid] for pid in ids}
+        filas_kardex = []
+        for producto_id, cantidad in lineas:
+            corriente[producto_id] += signo * cantidad
+            filas_kardex.append((
+                producto_id, tipo_movimiento, cantidad, corriente[producto_id],
+                motivo, referencia, proveedor_id, fecha, usuario_id
+            ))
+
+        cursor.executemany("""
+            INSERT INTO inventario_kardex (
+                producto_id, tipo_movimiento, cantidad, stock_resultante, 
+                motivo, referencia, proveedor_id, fecha, usuario_id
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, filas_kardex)
+
+        return stock_final
 
     @staticmethod
-    def obtener_todos():
-        """Devuelve productos con cálculos de moneda incluidos."""
+    def obtener_todos(ids=None, limite=None, desplazamiento=0):
+        """
+        Devuelve productos con cálculos de moneda incluidos.
+        ids: si se indica, solo esos productos (los inactivos no se devuelven).
+        limite/desplazamiento: página de resultados (para las grillas paginadas).
+        """
         conn = crear_conexion()
         if not conn: return []
         conn.row_factory = sqlite3.Row
@@ -31,39 +77,119 @@ class InventoryController:
             cursor = conn.cursor()
             
             # 1. Obtenemos tasas primero
-            cursor.execute("SELECT tasa_bcv, tasa_cop FROM configuracion LIMIT 1")
-            config = cursor.fetchone()
-            tasa_bcv = config['tasa_bcv'] if config else 0
-            tasa_cop = config['tasa_cop'] if config else 0
+            tasa_bcv, tasa_cop = InventoryController._leer_tasas(cursor)
 
             # 2. Obtenemos productos
-            cursor.execute("""
+            filtro = ""
+            params = []
+            if ids is not None:
+                ids = list(ids)
+                if not ids: return []
+                filtro = f" AND p.id IN ({','.join('?' * len(ids))})"
+                params = ids
+
+            paginacion = ""
+            if limite is not None:
+                paginacion = " LIMIT ? OFFSET ?"
+                params = params + [limite, desplazamiento]
+
+            cursor.execute(f"""
                 SELECT p.*, c.nombre as categoria_nombre, pr.razon_social as proveedor_nombre
                 FROM productos p
                 LEFT JOIN categorias c ON p.categoria_id = c.id
                 LEFT JOIN proveedores pr ON p.proveedor_id = pr.id
-                WHERE p.estado = 1
-                ORDER BY p.descripcion ASC
-            """)
+                WHERE p.estado = 1{filtro}
+                ORDER BY p.descripcion ASC{paginacion}
+            """, params)
             
-            productos = []
-            for row in cursor.fetchall():
-                d = dict(row)
-                d['codigo'] = d['codigo_interno'] 
-                d['categoria'] = d['categoria_nombre']
-                d['proveedor'] = d['proveedor_nombre']
-                
-                # CÁLCULOS MULTIMONEDA
-                precio_usd = d['precio_usd']
-                d['precio_bs'] = precio_usd * tasa_bcv
-                d['precio_cop'] = precio_usd * tasa_cop
-                
-                productos.append(d)
-                
-            return productos
+            return [InventoryController._fila_a_producto(row, tasa_bcv, tasa_cop) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _leer_tasas(cursor):
+        tasas = InventoryController.obtener_tasas()
+        return tasas['bcv'], tasas['cop']
+
+    @staticmethod
+    def _fila_a_producto(row, tasa_bcv, tasa_cop):
+        d = dict(row)
+        d['codigo'] = d['codigo_interno'] 
+        d['categoria'] = d['categoria_nombre']
+        d['proveedor'] = d['proveedor_nombre']
+        
+        # CÁLCULOS MULTIMONEDA
+        precio_usd = d['precio_usd']
+        d['precio_bs'] = precio_usd * tasa_bcv
+        d['precio_cop'] = precio_usd * tasa_cop
+        return d
+
+    @staticmethod
+    def buscar_productos(texto, limite=20, desplazamiento=0, categoria_id=None, proveedor_id=None):
+        """
+        Búsqueda por código, descripción, categoría o proveedor usando el índice FTS5.
+        Cada palabra se busca como prefijo y sin acentos; el código exacto va primero
+        y luego el resto por relevancia (bm25). Paginado con limite/desplazamiento.
+        Retorna dicts con el mismo formato que obtener_todos().
+        """
+        expresion = expresion_fts(texto)
+        if not expresion: return []
+
+        conn = crear_conexion()
+        if not conn: return []
+        conn.row_factory = sqlite3.Row
+        try:
+            cursor = conn.cursor()
+            tasa_bcv, tasa_cop = InventoryController._leer_tasas(cursor)
+
+            filtro = ""
+            params = []
+            if categoria_id:
+                filtro += " AND p.categoria_id = ?"
+                params.append(categoria_id)
+            if proveedor_id:
+                filtro += " AND p.proveedor_id = ?"
+                params.append(proveedor_id)
+
+            if busqueda_fts_disponible(cursor):
+                cursor.execute(f"""
+                    SELECT p.*, c.nombre as categoria_nombre, pr.razon_social as proveedor_nombre
+                    FROM productos_fts
+                    JOIN productos p ON p.id = productos_fts.rowid
+                    LEFT JOIN categorias c ON p.categoria_id = c.id
+                    LEFT JOIN proveedores pr ON p.proveedor_id = pr.id
+                    WHERE productos_fts MATCH ? AND p.estado = 1{filtro}
+                    ORDER BY (p.codigo_interno = ?) DESC,
+                             bm25(productos_fts, 10.0, 5.0, 1.0, 1.0), p.descripcion
+                    LIMIT ? OFFSET ?
+                """, [expresion] + params + [str(texto).strip(), limite, desplazamiento])
+            else:
+                # SQLite sin FTS5: búsqueda lineal de respaldo
+                patron = f"%{str(texto).strip()}%"
+                cursor.execute(f"""
+                    SELECT p.*, c.nombre as categoria_nombre, pr.razon_social as proveedor_nombre
+                    FROM productos p
+                    LEFT JOIN categorias c ON p.categoria_id = c.id
+                    LEFT JOIN proveedores pr ON p.proveedor_id = pr.id
+                    WHERE p.estado = 1 AND (p.codigo_interno LIKE ? OR p.descripcion LIKE ?){filtro}
+                    ORDER BY p.descripcion ASC
+                    LIMIT ? OFFSET ?
+                """, [patron, patron] + params + [limite, desplazamiento])
+
+            return [InventoryController._fila_a_producto(row, tasa_bcv, tasa_cop) for row in cursor.fetchall()]
+        except Exception as e:
+            print(f"Error buscando productos: {e}")
+            return []
         finally:
             conn.close()
 
+    @staticmethod
+    def obtener_pagina(texto="", limite=200, desplazamiento=0):
+        """Página de la grilla de inventario: todo el catálogo o, si hay texto, la búsqueda FTS."""
+        if texto and texto.strip():
+            return InventoryController.buscar_productos(texto, limite, desplazamiento)
+        return InventoryController.obtener_todos(limite=limite, desplazamiento=desplazamiento)
+
     @staticmethod
     def añadir_producto(datos):
         conn = crear_conexion()
@@ -87,8 +213,12 @@ class InventoryController:
                 stock_inicial, datos['stock_minimo'], datos['es_exento'],
                 datos['categoria_id'], datos['proveedor_id']
             ))
+            producto_id = cursor.lastrowid
             
             conn.commit()
+            
+            from controllers.catalog_controller import CatalogController
+            CatalogController.marcar_modificados([producto_id])
             return True
         except Exception as e:
             print(f"Error añadiendo producto: {e}")
@@ -111,6 +241,9 @@ class InventoryController:
                 datos['es_exento'], datos['categoria_id'], datos['proveedor_id'], id_producto
             ))
             conn.commit()
+            
+            from controllers.catalog_controller import CatalogController
+            CatalogController.marcar_modificados([id_producto])
             return True
         except: return False
         finally: conn.close()
\ No newline at end of file
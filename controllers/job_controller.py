@@ -0,0 +1,188 @@
+import threading
+import itertools
+from datetime import datetime
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+class TrabajoCancelado(BaseException):
+    """
+    Se lanza desde el callback de avance cuando el usuario cancela el trabajo.
+    Hereda de BaseException para atravesar los `except Exception` de los
+    generadores de PDF/Excel sin ser tratado como un error.
+    """
+
+class _SenalesTrabajo(QObject):
+    iniciado = pyqtSignal(int)
+    avance = pyqtSignal(int, int, str)
+    terminado = pyqtSignal(int, object)
+    fallo = pyqtSignal(int, str)
+    cancelado = pyqtSignal(int)
+
+class _Trabajo(QRunnable):
+    def __init__(self, id_trabajo, funcion, args, kwargs, reporta_avance):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.id = id_trabajo
+        self.funcion = funcion
+        self.args = args
+        self.kwargs = kwargs
+        self.reporta_avance = reporta_avance
+        self.cancelacion = threading.Event()
+        self.senales = _SenalesTrabajo()
+
+    def _avance(self, porcentaje, mensaje=""):
+        if self.cancelacion.is_set(): raise TrabajoCancelado()
+        self.senales.avance.emit(self.id, int(porcentaje), mensaje)
+
+    def run(self):
+        if self.cancelacion.is_set():
+            return self.senales.cancelado.emit(self.id)
+        self.senales.iniciado.emit(self.id)
+        try:
+            kwargs = dict(self.kwargs)
+            if self.reporta_avance: kwargs['avance'] = self._avance
+            resultado = self.funcion(*self.args, **kwargs)
+        except TrabajoCancelado:
+            return self.senales.cancelado.emit(self.id)
+        except Exception as e:
+            return self.senales.fallo.emit(self.id, str(e))
+
+        if self.cancelacion.is_set():
+            self.senales.cancelado.emit(self.id)
+        else:
+            self.senales.terminado.emit(self.id, resultado)
+
+class GestorTrabajos(QObject):
+    """
+    Cola de trabajos pesados (PDF, Excel) que se ejecutan en un QThreadPool.
+    Las señales de cada trabajo llegan a este objeto, que vive en el hilo de la
+    interfaz, así que los callbacks al_terminar/al_fallar pueden tocar widgets.
+    Cada hilo del pool usa su propia conexión SQLite (ver crear_conexion).
+    """
+    trabajos_cambiados = pyqtSignal()
+
+    EN_COLA = 'EN COLA'
+    EJECUTANDO = 'EJECUTANDO'
+    TERMINADO = 'TERMINADO'
+    ERROR = 'ERROR'
+    CANCELADO = 'CANCELADO'
+
+    def __init__(self, max_hilos=2):
+        super().__init__()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_hilos)
+        self._ids = itertools.count(1)
+        self._trabajos = {}
+
+    def enviar(self, titulo, funcion, *args, al_terminar=None, al_fallar=None, reporta_avance=False, **kwargs):
+        """
+        Encola funcion(*args, **kwargs). Si reporta_avance=True la función recibe
+        `avance(porcentaje, mensaje)`, que además corta el trabajo si se cancela.
+        al_terminar(resultado) y al_fallar(mensaje) se ejecutan en el hilo de la UI.
+        Retorna el id del trabajo.
+        """
+        id_trabajo = next(self._ids)
+        trabajo = _Trabajo(id_trabajo, funcion, args, kwargs, reporta_avance)
+        trabajo.senales.iniciado.connect(self._al_iniciar)
+        trabajo.senales.avance.connect(self._al_avanzar)
+        trabajo.senales.terminado.connect(self._al_terminar)
+        trabajo.senales.fallo.connect(self._al_fallar)
+        trabajo.senales.cancelado.connect(self._al_cancelar)
+
+        self._trabajos[id_trabajo] = {
+            'id': id_trabajo, 'titulo': titulo, 'estado': self.EN_COLA,
+            'progreso': 0, 'mensaje': "", 'creado': datetime.now(),
+            'trabajo': trabajo, 'al_terminar': al_terminar, 'al_fallar': al_fallar,
+        }
+        self.pool.start(trabajo)
+        self.trabajos_cambiados.emit()
+        return id_trabajo
+
+    def cancelar(self, id_trabajo):
+        info = self._trabajos.get(id_trabajo)
+        if not info or info['estado'] not in (self.EN_COLA, self.EJECUTANDO): return False
+        info['trabajo'].cancelacion.set()
+        # Si aún no arrancó se saca de la cola; si ya corre, se detiene en el próximo avance
+        if self.pool.tryTake(info['trabajo']):
+            self._al_cancelar(id_trabajo)
+        else:
+            info['mensaje'] = "Cancelando..."
+            self.trabajos_cambiados.emit()
+        return True
+
+    def listar(self):
+        """Estado de los trabajos (más recientes primero) para la ventana de cola."""
+        campos = ('id', 'titulo', 'estado', 'progreso', 'mensaje', 'creado')
+        return [{k: t[k] for k in campos} for t in sorted(self._trabajos.values(), key=lambda t: -t['id'])]
+
+    def pendientes(self):
+        return sum(1 for t in self._trabajos.values() if t['estado'] in (self.EN_COLA, self.EJECUTANDO))
+
+    def limpiar_finalizados(self):
+        for id_trabajo in [i for i, t in self._trabajos.items() if t['estado'] not in (self.EN_COLA, self.EJECUTANDO)]:
+            del self._trabajos[id_trabajo]
+        self.trabajos_cambiados.emit()
+
+    def esperar(self, milisegundos=-1):
+        """Al cerrar la aplicación: espera a que terminen los trabajos en curso."""
+        return self.pool.waitForDone(milisegundos)
+
+    # --- Slots (hilo de la interfaz) ---
+    def _al_iniciar(self, id_trabajo):
+        info = self._trabajos.get(id_trabajo)
+        if not info or info['estado'] != self.EN_COLA: return
+        info['estado'] = self.EJECUTANDO
+        self.trabajos_cambiados.emit()
+
+    def _al_avanzar(self, id_trabajo, porcentaje, mensaje):
+        info = self._trabajos.get(id_trabajo)
+        if not info or info['estado'] == self.CANCELADO: return
+        info['estado'] = self.EJECUTANDO
+        info['progreso'] = porcentaje
+        if mensaje: info['mensaje'] = mensaje
+        self.trabajos_cambiados.emit()
+
+    def _finalizar(self, id_trabajo, estado, mensaje):
+        info = self._trabajos.get(id_trabajo)
+        if not info: return None
+        info['estado'] = estado
+        info['mensaje'] = mensaje
+        if estado == self.TERMINADO: info['progreso'] = 100
+        info['trabajo'] = None
+        self.trabajos_cambiados.emit()
+        return info
+
+    def _al_terminar(self, id_trabajo, resultado):
+        info = self._finalizar(id_trabajo, self.TERMINADO, "Listo")
+        if info and info['al_terminar']:
+            try:
+                info['al_terminar'](resultado)
+            except Exception as e:
+                print(f"Error en callback de trabajo '{info['titulo']}': {e}")
+
+    def _al_fallar(self, id_trabajo, mensaje):
+        info = self._finalizar(id_trabajo, self.ERROR, mensaje)
+        print(f"❌ Trabajo fallido: {mensaje}")
+        if info and info['al_fallar']:
+            info['al_fallar'](mensaje)
+
+    def _al_cancelar(self, id_trabajo):
+        self._finalizar(id_trabajo, self.CANCELADO, "Cancelado por el usuario")
+
+class JobController:
+    """Acceso a la cola de trabajos en segundo plano compartida por todas las vistas."""
+    _gestor = None
+
+    @classmethod
+    def gestor(cls):
+        # Se crea al primer uso (requiere QApplication activa)
+        if cls._gestor is None:
+            cls._gestor = GestorTrabajos()
+        return cls._gestor
+
+    @classmethod
+    def enviar(cls, titulo, funcion, *args, **kwargs):
+        return cls.gestor().enviar(titulo, funcion, *args, **kwargs)
+
+    @classmethod
+    def cancelar(cls, id_trabajo):
+        return cls.gestor().cancelar(id_trabajo)
@@ -0,0 +1,169 @@
+from datetime import date, timedelta
+from data.conexion import crear_conexion, transaccion
+from controllers.date_utils import rango_dia, FORMATO_DIA
+
+# Cantidad con signo de un asiento del kardex de inventario
+SQL_CANTIDAD_FIRMADA = "CASE WHEN tipo_movimiento = 'ENTRADA' THEN cantidad ELSE -cantidad END"
+
+class KardexController:
+    """
+    Existencias históricas desde inventario_kardex con cortes periódicos
+    (tabla kardex_cortes: stock de cada producto al inicio de un día).
+    La existencia a una fecha es el último corte anterior más los movimientos
+    entre ese corte y la fecha, así que la consulta nunca recorre todo el libro.
+    """
+
+    @staticmethod
+    def _generar(cursor, dia):
+        """Corte al inicio de `dia` para los productos que se movieron desde su corte anterior."""
+        # Los productos sin fila en el último corte no tuvieron movimientos desde su
+        # propio corte, así que basta recorrer los asientos posteriores al último corte.
+        cursor.execute("SELECT MAX(dia) FROM kardex_cortes WHERE dia <= ?", (dia,))
+        desde = cursor.fetchone()[0] or ''
+        cursor.execute(f"""
+            WITH ult AS (
+                SELECT producto_id, MAX(dia) as dia, stock FROM kardex_cortes
+                WHERE dia <= ? GROUP BY producto_id
+            ),
+            mov AS (
+                SELECT k.producto_id, SUM({SQL_CANTIDAD_FIRMADA}) as delta
+                FROM inventario_kardex k LEFT JOIN ult ON ult.producto_id = k.producto_id
+                WHERE k.fecha >= ? AND k.fecha < ? AND (ult.dia IS NULL OR k.fecha >= ult.dia)
+                GROUP BY k.producto_id
+            )
+            INSERT OR REPLACE INTO kardex_cortes (producto_id, dia, stock)
+            SELECT mov.producto_id, ?, COALESCE(ult.stock, 0) + mov.delta
+            FROM mov LEFT JOIN ult ON ult.producto_id = mov.producto_id
+        """, (dia, desde, dia, dia))
+        # rowcount no se informa en sentencias que empiezan con WITH
+        cursor.execute("SELECT changes()")
+        return cursor.fetchone()[0]
+
+    @staticmethod
+    def generar_cortes(dia=None):
+        """
+        Registra el corte al inicio de `dia` (por defecto, hoy: incluye todo lo anterior).
+        Se llama al cerrar caja; repetirlo el mismo día no cambia nada.
+        Retorna cuántos productos recibieron corte.
+        """
+        dia = rango_dia(dia)[0]
+        with transaccion() as cursor:
+            return KardexController._generar(cursor, dia)
+
+    @staticmethod
+    def reconstruir_cortes(cada_dias=7):
+        """Borra los cortes y los rehace cada `cada_dias` días desde el primer movimiento hasta hoy."""
+        with transaccion() as cursor:
+            cursor.execute("DELETE FROM kardex_cortes")
+            cursor.execute("SELECT MIN(fecha) FROM inventario_kardex")
+            primero = cursor.fetchone()[0]
+            if not primero: return 0
+
+            dia = date.fromisoformat(primero[:10]) + timedelta(days=cada_dias)
+            hoy = date.today()
+            cortes = 0
+            while dia < hoy:
+                KardexController._generar(cursor, dia.strftime(FORMATO_DIA))
+                cortes += 1
+                dia += timedelta(days=cada_dias)
+            KardexController._generar(cursor, hoy.strftime(FORMATO_DIA))
+            return cortes + 1
+
+    @staticmethod
+    def stock_a_fecha(producto_id, fecha):
+        """Existencia de un producto al cierre del día `fecha` (un corte + los movimientos posteriores)."""
+        limite = rango_dia(fecha)[1]
+        conn = crear_conexion()
+        if not conn: return None
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT dia, stock FROM kardex_cortes WHERE producto_id = ? AND dia <= ?
+                ORDER BY dia DESC LIMIT 1
+            """, (producto_id, limite))
+            corte = cursor.fetchone()
+            desde, stock = (corte['dia'], corte['stock']) if corte else ('', 0.0)
+            cursor.execute(f"""
+                SELECT COALESCE(SUM({SQL_CANTIDAD_FIRMADA}), 0) FROM inventario_kardex
+                WHERE producto_id = ? AND fecha >= ? AND fecha < ?
+            """, (producto_id, desde, limite))
+            return stock + cursor.fetchone()[0]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def existencias_a_fecha(fecha, ids=None):
+        """
+        Existencia de todos los productos (o de `ids`) al cierre del día `fecha`.
+        Retorna {producto_id: stock}; los productos sin movimientos hasta esa fecha valen 0.
+        """
+        limite = rango_dia(fecha)[1]
+        conn = crear_conexion()
+        if not conn: return {}
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                WITH ult AS (
+                    SELECT producto_id, MAX(dia) as dia, stock FROM kardex_cortes
+                    WHERE dia <= ? GROUP BY producto_id
+                )
+                SELECT p.id, COALESCE(ult.stock, 0) + COALESCE((
+                    SELECT SUM({SQL_CANTIDAD_FIRMADA}) FROM inventario_kardex k
+                    WHERE k.producto_id = p.id AND k.fecha >= COALESCE(ult.dia, '') AND k.fecha < ?
+                ), 0) as stock
+                FROM productos p LEFT JOIN ult ON ult.producto_id = p.id
+            """, (limite, limite))
+            existencias = {row[0]: row[1] for row in cursor.fetchall()}
+            if ids is not None:
+                existencias = {pid: existencias.get(pid, 0.0) for pid in ids}
+            return existencias
+        finally:
+            conn.close()
+
+    @staticmethod
+    def verificar_stock(completo=False, tolerancia=0.0001):
+        """
+        Recalcula el stock de cada producto desde el kardex y lo compara con
+        productos.stock_actual y con el stock_resultante del último asiento.
+        completo=False parte del último corte; completo=True suma el libro entero
+        (sirve también para detectar cortes dañados).
+        Retorna la lista de productos con diferencias.
+        """
+        conn = crear_conexion()
+        if not conn: return []
+        try:
+            cursor = conn.cursor()
+            filtro_cortes = "WHERE 0" if completo else ""
+            cursor.execute(f"""
+                WITH ult AS (
+                    SELECT producto_id, MAX(dia) as dia, stock FROM kardex_cortes {filtro_cortes}
+                    GROUP BY producto_id
+                )
+                SELECT p.id, p.codigo_interno, p.descripcion, p.stock_actual,
+                       COALESCE(ult.stock, 0) + COALESCE((
+                           SELECT SUM({SQL_CANTIDAD_FIRMADA}) FROM inventario_kardex k
+                           WHERE k.producto_id = p.id AND k.fecha >= COALESCE(ult.dia, '')
+                       ), 0) as stock_kardex,
+                       (SELECT stock_resultante FROM inventario_kardex k
+                        WHERE k.producto_id = p.id ORDER BY k.id DESC LIMIT 1) as ultimo_resultante
+                FROM productos p LEFT JOIN ult ON ult.producto_id = p.id
+            """)
+
+            descuadres = []
+            for row in cursor.fetchall():
+                stock_actual = row['stock_actual'] or 0
+                diferencia = stock_actual - row['stock_kardex']
+                resultante_errado = row['ultimo_resultante'] is not None and abs(row['ultimo_resultante'] - stock_actual) > tolerancia
+                if abs(diferencia) > tolerancia or resultante_errado:
+                    descuadres.append({
+                        'producto_id': row['id'],
+                        'codigo': row['codigo_interno'],
+                        'descripcion': row['descripcion'],
+                        'stock_actual': stock_actual,
+                        'stock_kardex': row['stock_kardex'],
+                        'ultimo_resultante': row['ultimo_resultante'],
+                        'diferencia': diferencia
+                    })
+            return descuadres
+        finally:
+            conn.close()
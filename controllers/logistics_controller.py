@@ -1,5 +1,8 @@
-from data.conexion import crear_conexion
+from datetime import datetime
+from data.conexion import crear_conexion, transaccion, busqueda_fts_disponible, expresion_fts
 from core.app_signals import comunicacion
+from controllers.catalog_controller import CatalogController
+from controllers.cost_controller import CostController
 
 class LogisticsController:
     @staticmethod
@@ -23,58 +26,72 @@ class LogisticsController:
                proveedor_id, referencia, observaciones
         """
         try:
-            conn = crear_conexion()
-            cursor = conn.cursor()
+            # BEGIN IMMEDIATE: el saldo que valida "no negativo" se lee con el bloqueo de
+            # escritura tomado; dos salidas simultáneas no pueden pasar ambas la validación
+            with transaccion() as cursor:
+                # 1. Obtener stock actual
+                cursor.execute("SELECT stock_actual FROM productos WHERE id = ?", (datos['producto_id'],))
+                res = cursor.fetchone()
+                if not res: return False, "Producto no encontrado"
+                stock_actual = res[0]
             
-            # 1. Obtener stock actual
-            cursor.execute("SELECT stock_actual FROM productos WHERE id = ?", (datos['producto_id'],))
-            res = cursor.fetchone()
-            if not res: return False, "Producto no encontrado"
-            stock_actual = res[0]
-            
-            # 2. Calcular nuevo stock
-            cantidad = float(datos['cantidad'])
-            if datos['tipo'] == "ENTRADA":
-                nuevo_stock = stock_actual + cantidad
-            else:
-                nuevo_stock = stock_actual - cantidad
-                if nuevo_stock < 0:
-                    conn.close()
-                    return False, "Error: El stock no puede quedar en negativo."
+                # 2. Calcular nuevo stock
+                cantidad = float(datos['cantidad'])
+                if datos['tipo'] == "ENTRADA":
+                    nuevo_stock = stock_actual + cantidad
+                else:
+                    nuevo_stock = stock_actual - cantidad
+                    if nuevo_stock < 0:
+                        return False, "Error: El stock no puede quedar en negativo."
+
+                # Hora local, como el resto de los asientos del kardex (datetime('now') de SQLite es UTC)
+                fecha_actual = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-            # 3. Actualizar tabla productos
-            cursor.execute("UPDATE productos SET stock_actual = ? WHERE id = ?", (nuevo_stock, datos['producto_id']))
+                # 3. Capas de costo: las entradas manuales entran al costo promedio vigente,
+                #    las salidas (mermas, consumo) consumen las capas más antiguas
+                if datos['tipo'] == "ENTRADA":
+                    costo = CostController.costo_promedio(cursor, datos['producto_id'])
+                    CostController.registrar_entrada(cursor, [(datos['producto_id'], cantidad, costo)],
+                                                     'AJUSTE', datos.get('referencia'), fecha_actual)
+                else:
+                    CostController.consumir(cursor, [(datos['producto_id'], cantidad)])
+
+                # 4. Actualizar tabla productos (incremento relativo sobre el saldo leído con el bloqueo tomado)
+                delta = cantidad if datos['tipo'] == "ENTRADA" else -cantidad
+                cursor.execute("UPDATE productos SET stock_actual = stock_actual + ? WHERE id = ? RETURNING stock_actual",
+                               (delta, datos['producto_id']))
+                nuevo_stock = cursor.fetchone()[0]
             
-            # 4. Registrar en Kardex
-            # CORRECCIÓN: Usamos 'referencia' en vez de 'nro_referencia' y agregamos 'usuario_id'
-            cursor.execute("""
-                INSERT INTO inventario_kardex (
-                    producto_id, tipo_movimiento, cantidad, stock_resultante, motivo, 
-                    proveedor_id, referencia, observaciones, fecha, usuario_id
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, datetime('now'), 1)
-            """, (
-                datos['producto_id'], 
-                datos['tipo'], 
-                cantidad, 
-                nuevo_stock, 
-                datos['motivo'],
-                datos.get('proveedor_id'), 
-                datos.get('referencia'), 
-                datos['observaciones']
-            ))
+                # 5. Registrar en Kardex
+                # CORRECCIÓN: Usamos 'referencia' en vez de 'nro_referencia' y agregamos 'usuario_id'
+                cursor.execute("""
+                    INSERT INTO inventario_kardex (
+                        producto_id, tipo_movimiento, cantidad, stock_resultante, motivo, 
+                        proveedor_id, referencia, observaciones, fecha, usuario_id
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+                """, (
+                    datos['producto_id'], 
+                    datos['tipo'], 
+                    cantidad, 
+                    nuevo_stock, 
+                    datos['motivo'],
+                    datos.get('proveedor_id'), 
+                    datos.get('referencia'), 
+                    datos['observaciones'],
+                    fecha_actual
+                ))
             
-            conn.commit()
-            conn.close()
+            CatalogController.actualizar_stock({datos['producto_id']: nuevo_stock})
             
-            # --- 5. AVISAR AL SISTEMA ---
-            comunicacion.inventario_actualizado.emit()
+            # --- 6. AVISAR AL SISTEMA ---
+            comunicacion.publicar_inventario([datos['producto_id']])
 
             return True, "Movimiento registrado con éxito."
         except Exception as e:
             return False, str(e)
    
     @staticmethod
-    def filtrar_productos(texto="", categoria_id=None, proveedor_id=None):
+    def filtrar_productos(texto="", categoria_id=None, proveedor_id=None, limite=None, desplazamiento=0):
         try:
             conn = crear_conexion()
             cursor = conn.cursor()
@@ -89,7 +106,11 @@ class LogisticsController:
             """
             params = []
 
-            if texto:
+            expresion = expresion_fts(texto) if texto else ""
+            if expresion and busqueda_fts_disponible(cursor):
+                query += " AND p.id IN (SELECT rowid FROM productos_fts WHERE productos_fts MATCH ?)"
+                params.append(expresion)
+            elif texto:
                 query += " AND (p.codigo_interno LIKE ? OR p.descripcion LIKE ?)"
                 params.extend([f"%{texto}%", f"%{texto}%"])
             if categoria_id:
@@ -99,6 +120,10 @@ class LogisticsController:
                 query += " AND p.proveedor_id = ?"
                 params.append(proveedor_id)
 
+            if limite is not None:
+                query += " ORDER BY p.descripcion LIMIT ? OFFSET ?"
+                params.extend([limite, desplazamiento])
+
             cursor.execute(query, params)
             regs = cursor.fetchall()
             conn.close()
@@ -1,6 +1,7 @@
 import sqlite3
 from data.conexion import crear_conexion
 from controllers.customer_controller import CustomerController
+from controllers.catalog_controller import CatalogController
 
 class MasterDataController:
     
@@ -79,6 +80,9 @@ class MasterDataController:
             """, (rif_limpio, nombre.strip(), contacto.strip(), id_prov))
             conn.commit()
             conn.close()
+            
+            # El nombre del proveedor viaja en cada producto del catálogo
+            CatalogController.invalidar()
             return True
         except Exception as e:
             return str(e)
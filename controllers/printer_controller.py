@@ -1,9 +1,6 @@
 import os
 import textwrap
 from data.conexion import crear_conexion
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import mm
-from reportlab.lib.pagesizes import letter
 
 class PrinterController:
     
@@ -53,6 +50,9 @@ class PrinterController:
     @staticmethod
     def _generar_pdf_carta(doc, empresa, detalles):
         """Genera un PDF en formato Tamaño Carta (Letter) para uso Administrativo"""
+        # ReportLab se importa al generar el primer PDF (arranque más rápido)
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.pagesizes import letter
         os.makedirs('temp', exist_ok=True)
         ruta_pdf = os.path.abspath(f"temp/ne_{doc['nro_documento']}.pdf")
         
@@ -149,6 +149,9 @@ class PrinterController:
     @staticmethod
     def _generar_pdf_ticket(doc, empresa, detalles):
         """Versión Definitiva SENIAT para Facturas (80mm)"""
+        # ReportLab se importa al generar el primer PDF (arranque más rápido)
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.units import mm
         os.makedirs('temp', exist_ok=True)
         ruta_pdf = os.path.abspath(f"temp/ticket_{doc['nro_documento']}.pdf")
 
@@ -1,118 +1,305 @@
+import csv
+import json
+import os
+import re
 import sqlite3
 from datetime import datetime
-from data.conexion import crear_conexion
+from data.conexion import crear_conexion, transaccion
 from core.app_signals import comunicacion
+from controllers.catalog_controller import CatalogController
+from controllers.cost_controller import CostController
+
+# Las líneas de la factura viajan a SQLite como un solo parámetro JSON
+# [[producto_id, cantidad, costo_unitario_bs], ...]: el detalle, el stock y el
+# kardex se escriben con una sentencia cada uno, sin importar cuántas líneas traiga.
+SQL_LINEAS_JSON = """
+    SELECT json_extract(value, '$[0]') as producto_id,
+           json_extract(value, '$[1]') as cantidad,
+           json_extract(value, '$[2]') as costo_unitario_bs,
+           key as orden
+    FROM json_each(?)
+"""
+
+# Columnas aceptadas en los archivos de factura (CSV o XLSX, primera fila = encabezados)
+COLUMNAS_ARCHIVO = {
+    'codigo': ('codigo', 'código', 'codigo_interno', 'sku'),
+    'cantidad': ('cantidad', 'cant'),
+    'costo_bs': ('costo_bs', 'costo', 'costo_unitario_bs', 'costo unitario'),
+}
 
 class PurchasesController:
-    
+
     @staticmethod
-    def inicializar_tabla_detalles():
-        """Auto-migración: Crea la tabla de detalles de compra si no existe."""
-        conn = crear_conexion()
-        if conn:
-            try:
-                conn.execute("""
-                    CREATE TABLE IF NOT EXISTS compra_detalles (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        compra_id INTEGER,
-                        producto_id INTEGER,
-                        cantidad REAL,
-                        costo_unitario_bs REAL,
-                        FOREIGN KEY(compra_id) REFERENCES compras(id)
-                    )
-                """)
-                conn.commit()
-            except Exception as e:
-                print(f"Error en migración de compras: {e}")
-            finally:
-                conn.close()
+    def agrupar_lineas(carrito_productos):
+        """
+        Une las líneas repetidas de un mismo producto (facturas de 500-2000 líneas).
+        Retorna [(producto_id, cantidad, costo_unitario_bs), ...] en el orden de la
+        primera aparición, con el costo ponderado por cantidad.
+        """
+        agrupadas = {}
+        for item in carrito_productos:
+            cantidad, costo = agrupadas.get(item['id'], (0.0, 0.0))
+            agrupadas[item['id']] = (cantidad + item['cantidad'], costo + item['cantidad'] * item['costo_bs'])
+        return [(pid, cantidad, costo / cantidad if cantidad else 0.0) for pid, (cantidad, costo) in agrupadas.items()]
+
+    @staticmethod
+    def calcular_totales(carrito_productos):
+        """Exento, base, IVA (16%) y total en Bs, igual que la pantalla de compras."""
+        exento_bs = sum(i['cantidad'] * i['costo_bs'] for i in carrito_productos if i['es_exento'])
+        base_bs = sum(i['cantidad'] * i['costo_bs'] for i in carrito_productos if not i['es_exento'])
+        iva_bs = base_bs * 0.16
+        return {
+            'monto_exento_bs': exento_bs,
+            'base_imponible_bs': base_bs,
+            'impuesto_iva_bs': iva_bs,
+            'total_compra_bs': exento_bs + base_bs + iva_bs,
+        }
 
     @staticmethod
-    def registrar_compra(datos_compra, carrito_productos):
+    def registrar_compra(datos_compra, carrito_productos, usuario_id=1):
         """
-        Guarda la factura del proveedor para el Libro de Compras 
+        Guarda la factura del proveedor para el Libro de Compras
         e inyecta el stock automáticamente al inventario.
         """
-        PurchasesController.inicializar_tabla_detalles()
-        
-        conn = crear_conexion()
-        if not conn: return False, "Error de conexión con la base de datos."
-        
-        conn.execute("PRAGMA busy_timeout = 5000")
-        
+        if not carrito_productos:
+            return False, "La factura no tiene productos."
+        lineas = PurchasesController.agrupar_lineas(carrito_productos)
+        lineas_json = json.dumps(lineas)
+
         try:
-            cursor = conn.cursor()
-            fecha_actual = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
-            # 1. INSERTAR LA CABECERA FISCAL (Para el Libro de Compras)
-            cursor.execute("""
-                INSERT INTO compras (
-                    proveedor_id, nro_factura, nro_control, fecha_emision, fecha_registro,
-                    tasa_cambio, total_compra_bs, base_imponible_bs, 
-                    monto_exento_bs, impuesto_iva_bs, tipo_transaccion
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, '01-REG')
-            """, (
-                datos_compra['proveedor_id'], 
-                datos_compra['nro_factura'], 
-                datos_compra['nro_control'], 
-                datos_compra['fecha_emision'], # Fecha que trae el papel físico
-                fecha_actual,                  # Fecha en la que lo estás registrando
-                datos_compra['tasa_cambio'], 
-                datos_compra['total_compra_bs'],
-                datos_compra['base_imponible_bs'], 
-                datos_compra['monto_exento_bs'],
-                datos_compra['impuesto_iva_bs']
-            ))
-            
-            compra_id = cursor.lastrowid
-            
-            # 2. INSERTAR DETALLES Y ALIMENTAR INVENTARIO
-            for item in carrito_productos:
-                
-                # A) Guardar qué se compró y a qué precio
+            with transaccion() as cursor:
+                fecha_actual = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+                # 1. INSERTAR LA CABECERA FISCAL (Para el Libro de Compras)
                 cursor.execute("""
+                    INSERT INTO compras (
+                        proveedor_id, nro_factura, nro_control, fecha_emision, fecha_registro,
+                        tasa_cambio, total_compra_bs, base_imponible_bs,
+                        monto_exento_bs, impuesto_iva_bs, tipo_transaccion
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, '01-REG')
+                """, (
+                    datos_compra['proveedor_id'],
+                    datos_compra['nro_factura'],
+                    datos_compra['nro_control'],
+                    datos_compra['fecha_emision'], # Fecha que trae el papel físico
+                    fecha_actual,                  # Fecha en la que lo estás registrando
+                    datos_compra['tasa_cambio'],
+                    datos_compra['total_compra_bs'],
+                    datos_compra['base_imponible_bs'],
+                    datos_compra['monto_exento_bs'],
+                    datos_compra['impuesto_iva_bs']
+                ))
+
+                compra_id = cursor.lastrowid
+
+                cursor.execute(f"SELECT COUNT(*) FROM productos WHERE id IN (SELECT producto_id FROM ({SQL_LINEAS_JSON}))", (lineas_json,))
+                if cursor.fetchone()[0] != len(lineas):
+                    raise ValueError("La factura incluye productos que no existen en el inventario.")
+
+                # Capas de costo y promedio ponderado (en USD a la tasa de la factura, antes de sumar el stock)
+                tasa = datos_compra['tasa_cambio'] or 1
+                CostController.registrar_entrada(
+                    cursor, [(pid, cantidad, costo / tasa) for pid, cantidad, costo in lineas],
+                    'COMPRA', datos_compra['nro_factura'], fecha_actual
+                )
+
+                # 2. DETALLE: qué se compró y a qué precio
+                cursor.execute(f"""
                     INSERT INTO compra_detalles (compra_id, producto_id, cantidad, costo_unitario_bs)
-                    VALUES (?, ?, ?, ?)
-                """, (compra_id, item['id'], item['cantidad'], item['costo_bs']))
-                
-                # B) Sumar la mercancía física al estante
-                cursor.execute("""
-                    UPDATE productos 
-                    SET stock_actual = stock_actual + ? 
-                    WHERE id = ?
-                """, (item['cantidad'], item['id']))
-                
-                # C) Consultar cómo quedó el estante tras sumar
-                cursor.execute("SELECT stock_actual FROM productos WHERE id=?", (item['id'],))
-                nuevo_stock = cursor.fetchone()[0]
-                
-                # D) Asentar la operación en el Libro Mayor de Inventario (Kardex)
-                cursor.execute("""
+                    SELECT ?, producto_id, cantidad, costo_unitario_bs FROM ({SQL_LINEAS_JSON}) ORDER BY orden
+                """, (compra_id, lineas_json))
+
+                # 3. Sumar la mercancía física al estante (una línea por producto tras agrupar)
+                cursor.execute(f"""
+                    UPDATE productos SET stock_actual = stock_actual + l.cantidad
+                    FROM ({SQL_LINEAS_JSON}) l
+                    WHERE productos.id = l.producto_id
+                """, (lineas_json,))
+
+                # 4. Asentar la operación en el Libro Mayor de Inventario (Kardex) con el stock ya sumado
+                cursor.execute(f"""
                     INSERT INTO inventario_kardex (
-                        producto_id, tipo_movimiento, cantidad, stock_resultante, 
+                        producto_id, tipo_movimiento, cantidad, stock_resultante,
                         motivo, referencia, proveedor_id, fecha, usuario_id
-                    ) VALUES (?, 'ENTRADA', ?, ?, 'COMPRA', ?, ?, ?, 1)
-                """, (
-                    item['id'], item['cantidad'], nuevo_stock, 
-                    datos_compra['nro_factura'], datos_compra['proveedor_id'], 
-                    fecha_actual
-                ))
+                    )
+                    SELECT p.id, 'ENTRADA', l.cantidad, p.stock_actual, 'COMPRA', ?, ?, ?, ?
+                    FROM ({SQL_LINEAS_JSON}) l JOIN productos p ON p.id = l.producto_id
+                    ORDER BY l.orden
+                """, (datos_compra['nro_factura'], datos_compra['proveedor_id'], fecha_actual, usuario_id, lineas_json))
+
+            ids = [pid for pid, _, _ in lineas]
+            CatalogController.marcar_modificados(ids)
 
-            conn.commit()
-            
             # Avisar al resto del sistema (Ventana de ventas, etc.) que hay mercancía nueva
             try:
-                comunicacion.inventario_actualizado.emit()
+                comunicacion.publicar_inventario(ids)
             except Exception as e_sig:
                 print(f"Compra registrada, pero error en señal: {e_sig}")
-            
+
             return True, "Factura de compra registrada e inventario actualizado."
-            
+
         except sqlite3.IntegrityError:
-            conn.rollback()
             return False, "Error: Verifique que no esté registrando una factura duplicada."
+        except ValueError as e:
+            return False, str(e)
         except Exception as e:
-            conn.rollback()
             return False, f"Error crítico al guardar la compra: {e}"
-        finally:
-            conn.close()
\ No newline at end of file
+
+    # --- IMPORTACIÓN DE FACTURAS DESDE ARCHIVO ---
+
+    @staticmethod
+    def _numero(valor):
+        """
+        Acepta números de Excel y texto con coma o punto decimal ('1.234,50', '1,234.50').
+        Con ambos signos, el decimal es el último. Un único signo seguido de tres
+        dígitos ('1.234', '12,500') puede ser de miles o decimal: se rechaza.
+        """
+        if isinstance(valor, (int, float)): return float(valor)
+        texto = str(valor or '').strip().replace(' ', '')
+        coma, punto = texto.rfind(','), texto.rfind('.')
+        if coma >= 0 and punto >= 0:
+            decimal, miles = (',', '.') if coma > punto else ('.', ',')
+            entero, _, fraccion = texto.rpartition(decimal)
+            if not re.fullmatch(rf'[-+]?\d{{1,3}}(\{miles}\d{{3}})*', entero):
+                raise ValueError(f"Número mal formado: '{texto}'.")
+            texto = f"{entero.replace(miles, '')}.{fraccion}"
+        elif coma >= 0 or punto >= 0:
+            signo = ',' if coma >= 0 else '.'
+            partes = texto.split(signo)
+            if len(partes) > 2:
+                # Solo separadores de miles: 1.234.567
+                if not re.fullmatch(rf'[-+]?\d{{1,3}}(\{signo}\d{{3}})+', texto):
+                    raise ValueError(f"Número mal formado: '{texto}'.")
+                texto = texto.replace(signo, '')
+            else:
+                entero, fraccion = partes
+                if len(fraccion) == 3 and re.fullmatch(r'[-+]?[1-9]\d{0,2}', entero):
+                    raise ValueError(f"Valor ambiguo '{texto}' (¿miles o decimales?): escríbalo sin separador de miles o con ambos separadores.")
+                texto = f"{entero}.{fraccion}"
+        try:
+            return float(texto)
+        except ValueError:
+            raise ValueError(f"Valor no numérico: '{texto}'.") from None
+
+    @staticmethod
+    def _filas_archivo(ruta):
+        """
+        Genera las filas del archivo como (nro_fila, {columna: valor}) sin cargarlo
+        completo: csv lee línea a línea y openpyxl en modo read_only.
+        """
+        extension = os.path.splitext(ruta)[1].lower()
+        if extension in ('.xlsx', '.xlsm'):
+            import openpyxl
+            wb = openpyxl.load_workbook(ruta, read_only=True, data_only=True)
+            try:
+                filas = wb.active.iter_rows(values_only=True)
+                yield from PurchasesController._con_encabezados(filas)
+            finally:
+                wb.close()
+        elif extension in ('.csv', '.txt'):
+            with open(ruta, newline='', encoding='utf-8-sig') as f:
+                # El separador sale del encabezado: en los datos la coma puede ser decimal
+                encabezado = f.readline()
+                f.seek(0)
+                separador = max(';,\t', key=encabezado.count)
+                yield from PurchasesController._con_encabezados(csv.reader(f, delimiter=separador))
+        else:
+            raise ValueError(f"Formato no soportado: {extension} (use CSV o XLSX).")
+
+    @staticmethod
+    def _con_encabezados(filas):
+        encabezados = next(filas, None)
+        if not encabezados:
+            raise ValueError("El archivo está vacío.")
+        nombres = [str(h or '').strip().lower() for h in encabezados]
+        posiciones = {}
+        for columna, alias in COLUMNAS_ARCHIVO.items():
+            posicion = next((i for i, nombre in enumerate(nombres) if nombre in alias), None)
+            if posicion is None:
+                raise ValueError(f"Falta la columna '{columna}' en el encabezado.")
+            posiciones[columna] = posicion
+
+        for nro, fila in enumerate(filas, start=2):
+            if not fila or all(v in (None, '') for v in fila): continue
+            yield nro, {col: (fila[i] if i < len(fila) else None) for col, i in posiciones.items()}
+
+    @staticmethod
+    def _resolver_bloque(bloque, carrito, errores):
+        """Valida un bloque de filas y busca sus productos con una sola consulta."""
+        codigos = list({str(datos['codigo']).strip().upper() for _, datos in bloque if datos['codigo'] not in (None, '')})
+        productos = {}
+        if codigos:
+            conn = crear_conexion()
+            if not conn: raise ValueError("Error de conexión con la base de datos.")
+            try:
+                cursor = conn.cursor()
+                marcas = ",".join("?" * len(codigos))
+                cursor.execute(f"""
+                    SELECT id, codigo_interno, descripcion, es_exento FROM productos
+                    WHERE codigo_interno IN ({marcas}) AND estado = 1
+                """, codigos)
+                productos = {row['codigo_interno'].upper(): row for row in cursor.fetchall()}
+            finally:
+                conn.close()
+
+        for nro, datos in bloque:
+            codigo = str(datos['codigo'] or '').strip().upper()
+            if not codigo:
+                errores.append({'fila': nro, 'error': "Código vacío."}); continue
+            producto = productos.get(codigo)
+            if not producto:
+                errores.append({'fila': nro, 'error': f"Producto '{codigo}' no existe o está inactivo."}); continue
+            try:
+                cantidad = PurchasesController._numero(datos['cantidad'])
+                costo = PurchasesController._numero(datos['costo_bs'])
+            except ValueError as e:
+                errores.append({'fila': nro, 'error': f"Cantidad o costo: {e}"}); continue
+            if cantidad <= 0:
+                errores.append({'fila': nro, 'error': "La cantidad debe ser mayor que cero."}); continue
+            if costo < 0:
+                errores.append({'fila': nro, 'error': "El costo no puede ser negativo."}); continue
+            carrito.append({
+                'id': producto['id'], 'codigo': producto['codigo_interno'], 'descripcion': producto['descripcion'],
+                'cantidad': cantidad, 'costo_bs': costo, 'es_exento': producto['es_exento']
+            })
+
+    @staticmethod
+    def leer_factura_archivo(ruta, tamano_bloque=500):
+        """
+        Lee una factura de proveedor desde CSV/XLSX (columnas codigo, cantidad, costo_bs).
+        Las filas se validan por bloques mientras se leen.
+        Retorna (carrito, errores): carrito con el formato de la pantalla de compras y
+        errores como [{'fila': n, 'error': texto}] (fila 0 = error del archivo).
+        """
+        carrito, errores, bloque = [], [], []
+        try:
+            for nro, datos in PurchasesController._filas_archivo(ruta):
+                bloque.append((nro, datos))
+                if len(bloque) >= tamano_bloque:
+                    PurchasesController._resolver_bloque(bloque, carrito, errores)
+                    bloque = []
+            if bloque:
+                PurchasesController._resolver_bloque(bloque, carrito, errores)
+        except (OSError, ValueError, csv.Error) as e:
+            errores.append({'fila': 0, 'error': str(e)})
+        except Exception as e:
+            errores.append({'fila': 0, 'error': f"No se pudo leer el archivo: {e}"})
+        return carrito, errores
+
+    @staticmethod
+    def importar_factura(ruta, datos_compra, usuario_id=1):
+        """
+        Lee, valida y registra una factura de proveedor desde archivo.
+        Los montos fiscales que no vengan en datos_compra se calculan de las líneas.
+        Si alguna fila tiene errores no se registra nada.
+        Retorna (exito, mensaje, errores).
+        """
+        carrito, errores = PurchasesController.leer_factura_archivo(ruta)
+        if errores:
+            return False, f"{len(errores)} fila(s) con errores; la factura no se registró.", errores
+        if not carrito:
+            return False, "El archivo no tiene líneas.", []
+
+        datos = {**PurchasesController.calcular_totales(carrito), **datos_compra}
+        exito, msj = PurchasesController.registrar_compra(datos, carrito, usuario_id)
+        return exito, msj, []
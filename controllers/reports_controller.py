@@ -2,8 +2,7 @@ import sqlite3
 import os
 from datetime import datetime
 from data.conexion import crear_conexion
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import mm
+from controllers.terminal_controller import TerminalController
 
 class ReportsController:
     
@@ -15,9 +14,10 @@ class ReportsController:
         try:
             cursor = conn.cursor()
             cursor.execute("""
-                SELECT cs.*, u.username as cajero 
+                SELECT cs.*, u.username as cajero, t.codigo as terminal
                 FROM caja_sesiones cs
                 LEFT JOIN usuarios u ON cs.usuario_id = u.id
+                LEFT JOIN terminales t ON cs.terminal_id = t.id
                 ORDER BY cs.id DESC LIMIT 50
             """)
             return [dict(row) for row in cursor.fetchall()]
@@ -40,10 +40,19 @@ class ReportsController:
             
             fecha_inicio = sesion['fecha_apertura']
             fecha_fin = sesion['fecha_cierre'] if sesion['fecha_cierre'] else datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+            # Solo las facturas de la terminal de esta sesión. Las emitidas antes de
+            # existir las terminales (terminal_id NULL) eran de la única caja; las
+            # sesiones de esa época no tienen terminal y se filtran solo por horario.
+            filtro_terminal = ""
+            params = [fecha_inicio, fecha_fin]
+            if sesion.get('terminal_id') is not None:
+                filtro_terminal = " AND (terminal_id = ? OR terminal_id IS NULL)"
+                params.append(sesion['terminal_id'])
             
             # EXTRACCIÓN ESTRICTAMENTE FISCAL
             # Se convierte todo a Bolívares usando la tasa del momento de cada factura
-            cursor.execute("""
+            cursor.execute(f"""
                 SELECT 
                     COUNT(id) as cantidad_facturas, 
                     MIN(nro_documento) as doc_inicial, 
@@ -52,8 +61,8 @@ class ReportsController:
                     SUM(impuesto_iva_usd * tasa_cambio_momento) as iva_bs, 
                     SUM(total_usd * tasa_cambio_momento) as total_bs
                 FROM documentos 
-                WHERE tipo_doc = 'FACTURA' AND fecha BETWEEN ? AND ? AND estado = 'PROCESADO'
-            """, (fecha_inicio, fecha_fin))
+                WHERE tipo_doc = 'FACTURA' AND fecha BETWEEN ? AND ? AND estado = 'PROCESADO'{filtro_terminal}
+            """, params)
             
             fiscal = dict(cursor.fetchone())
             
@@ -128,6 +137,9 @@ class ReportsController:
 
     @staticmethod
     def generar_pdf_ticket(datos, filepath):
+        # ReportLab se importa al generar el primer PDF (arranque más rápido)
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.pagesizes import mm
         if not datos: return False
         
         texto = ReportsController.generar_texto_ticket(datos)
@@ -151,11 +163,13 @@ class ReportsController:
 
     @staticmethod
     def obtener_sesion_activa_id():
+        """Sesión abierta de esta terminal (las demás cajas tienen su propio reporte X)."""
+        terminal_id = TerminalController.actual()['id']
         conn = crear_conexion()
         if not conn: return None
         try:
             cursor = conn.cursor()
-            cursor.execute("SELECT id FROM caja_sesiones WHERE estado = 'ABIERTA' ORDER BY id DESC LIMIT 1")
+            cursor.execute("SELECT id FROM caja_sesiones WHERE terminal_id = ? AND estado = 'ABIERTA'", (terminal_id,))
             row = cursor.fetchone()
             return row[0] if row else None
         finally:
@@ -163,11 +177,13 @@ class ReportsController:
 
     @staticmethod
     def obtener_ultima_sesion_cerrada_id():
+        terminal_id = TerminalController.actual()['id']
         conn = crear_conexion()
         if not conn: return None
         try:
             cursor = conn.cursor()
-            cursor.execute("SELECT id FROM caja_sesiones WHERE estado = 'CERRADA' ORDER BY id DESC LIMIT 1")
+            cursor.execute("SELECT id FROM caja_sesiones WHERE terminal_id = ? AND estado = 'CERRADA' ORDER BY id DESC LIMIT 1",
+                           (terminal_id,))
             row = cursor.fetchone()
             return row[0] if row else None
         finally:
@@ -2,12 +2,15 @@ import os
 import sqlite3
 import textwrap
 from datetime import datetime
-from data.conexion import crear_conexion
+from data.conexion import crear_conexion, transaccion
 from core.app_signals import comunicacion
 from controllers.cash_controller import CashController
-
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import mm
+from controllers.inventory_controller import InventoryController
+from controllers.catalog_controller import CatalogController
+from controllers.stats_controller import StatsController
+from controllers.cost_controller import CostController
+from controllers.sequence_controller import SequenceController
+from controllers.terminal_controller import TerminalController
 
 class ReturnsController:
     
@@ -55,128 +58,158 @@ class ReturnsController:
 
     @staticmethod
     def procesar_devolucion(nro_factura, items_a_devolver, metodo_reembolso, total_reembolso_usd):
-        conn = crear_conexion()
-        if not conn: return False, "Error de conexión."
-        conn.execute("PRAGMA busy_timeout = 5000")
-        
+        # La terminal se resuelve antes de escribir (su primer registro usa otra conexión)
+        terminal = TerminalController.actual()
         try:
-            cursor = conn.cursor()
-            fecha_actual = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            # BEGIN IMMEDIATE: la factura, el saldo de la sesión y la verificación de fondos
+            # se leen con el bloqueo de escritura tomado (igual que registrar_venta)
+            with transaccion() as cursor:
+                fecha_actual = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
-            cursor.execute("SELECT * FROM documentos WHERE nro_documento = ?", (nro_factura,))
-            factura_orig = cursor.fetchone()
+                cursor.execute("SELECT * FROM documentos WHERE nro_documento = ?", (nro_factura,))
+                factura_orig = cursor.fetchone()
             
-            cursor.execute("SELECT tasa_bcv, tasa_cop, proximo_nro_nc, proximo_nro_control FROM configuracion LIMIT 1")
-            conf = cursor.fetchone()
+                cursor.execute("SELECT tasa_bcv, tasa_cop FROM configuracion LIMIT 1")
+                conf = cursor.fetchone()
             
-            tasa_historica = factura_orig['tasa_cambio_momento']
-            tasa_cop_actual = conf['tasa_cop']
-            cliente_id = factura_orig['cliente_id']
+                tasa_historica = factura_orig['tasa_cambio_momento']
+                tasa_cop_actual = conf['tasa_cop']
+                cliente_id = factura_orig['cliente_id']
             
-            # --- CANDADO DE CAJA ---
-            m_usd = 0; m_bs = 0; m_cop = 0
-            if "Saldo a Favor" not in metodo_reembolso:
-                sesion = CashController.obtener_sesion_activa()
-                if not sesion: return False, "No hay una caja abierta para entregar el efectivo."
+                # --- CANDADO DE CAJA (la sesión de esta terminal; sus asientos van a nombre de su cajero) ---
+                sesion = CashController.obtener_sesion_activa(terminal_id=terminal['id'], cursor=cursor)
+                usuario_id = sesion['usuario_id'] if sesion else 1
+                m_usd = 0; m_bs = 0; m_cop = 0
+                if "Saldo a Favor" not in metodo_reembolso:
+                    if not sesion: return False, "No hay una caja abierta en esta terminal para entregar el efectivo."
                 
-                saldo_u, saldo_b, saldo_c = CashController.obtener_saldos_actuales()
+                    saldo_u, saldo_b, saldo_c = sesion['saldo_actual_usd'], sesion['saldo_actual_bs'], sesion['saldo_actual_cop']
                 
-                if "USD" in metodo_reembolso: m_usd = total_reembolso_usd
-                elif "Bs" in metodo_reembolso: m_bs = total_reembolso_usd * tasa_historica
-                elif "Pesos" in metodo_reembolso: m_cop = total_reembolso_usd * tasa_cop_actual
+                    if "USD" in metodo_reembolso: m_usd = total_reembolso_usd
+                    elif "Bs" in metodo_reembolso: m_bs = total_reembolso_usd * tasa_historica
+                    elif "Pesos" in metodo_reembolso: m_cop = total_reembolso_usd * tasa_cop_actual
                 
-                if (m_usd > saldo_u) or (m_bs > saldo_b) or (m_cop > saldo_c):
-                    return False, (f"FONDOS INSUFICIENTES EN CAJA.\n\n"
-                                   f"Saldo Disponible: $ {saldo_u:.2f} | Bs {saldo_b:.2f} | COP {saldo_c:,.0f}\n"
-                                   f"Requerido: $ {m_usd:.2f} | Bs {m_bs:.2f} | COP {m_cop:,.0f}\n\n"
-                                   f"Vaya al módulo 'Facturación' y registre un INGRESO manual de fondos.")
-
-            # --- GENERAR CORRELATIVOS ---
-            nro_nc = f"NC-{str(conf['proximo_nro_nc']).zfill(8)}"
-            nro_ctrl_nc = f"00-{str(conf['proximo_nro_control']).zfill(8)}"
-            
-            # --- CÁLCULO FISCAL ---
-            base_usd = 0; iva_usd = 0; exento_usd = 0
-            for item in items_a_devolver:
-                subt = item['cantidad'] * item['precio_usd']
-                if item['es_exento']: exento_usd += subt
-                else: 
-                    base_usd += subt
-                    iva_usd += subt * 0.16 
+                    if (m_usd > saldo_u) or (m_bs > saldo_b) or (m_cop > saldo_c):
+                        return False, (f"FONDOS INSUFICIENTES EN CAJA.\n\n"
+                                       f"Saldo Disponible: $ {saldo_u:.2f} | Bs {saldo_b:.2f} | COP {saldo_c:,.0f}\n"
+                                       f"Requerido: $ {m_usd:.2f} | Bs {m_bs:.2f} | COP {m_cop:,.0f}\n\n"
+                                       f"Vaya al módulo 'Facturación' y registre un INGRESO manual de fondos.")
+
+                # --- GENERAR CORRELATIVOS (tabla secuencias; si la transacción se revierte, el número queda libre) ---
+                nro_nc = SequenceController.numero_documento(cursor, 'NOTA_CREDITO')
+                nro_ctrl_nc = SequenceController.numero_control(cursor, terminal['id'])
             
-            # --- INSERTAR DOCUMENTO NC ---
-            cursor.execute("""
-                INSERT INTO documentos (
-                    tipo_doc, nro_documento, nro_control, cliente_id, fecha, tasa_cambio_momento,
-                    subtotal_usd, impuesto_iva_usd, total_usd, 
-                    documento_referencia, metodo_pago, estado
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'PROCESADO')
-            """, ('NOTA_CREDITO', nro_nc, nro_ctrl_nc, cliente_id, fecha_actual, tasa_historica,
-                  (base_usd + exento_usd), iva_usd, total_reembolso_usd, nro_factura, metodo_reembolso))
-            nc_id = cursor.lastrowid
+                # --- CÁLCULO FISCAL ---
+                base_usd = 0; iva_usd = 0; exento_usd = 0
+                for item in items_a_devolver:
+                    subt = item['cantidad'] * item['precio_usd']
+                    if item['es_exento']: exento_usd += subt
+                    else: 
+                        base_usd += subt
+                        iva_usd += subt * 0.16 
             
-            # --- ACTUALIZAR FACTURA ORIGINAL, DEVOLVER INVENTARIO Y KARDEX ---
-            for item in items_a_devolver:
-                # 1. Registrar detalle de la Nota de Crédito
-                cursor.execute("INSERT INTO documento_detalles (documento_id, producto_id, cantidad, precio_unitario_usd) VALUES (?, ?, ?, ?)", 
-                               (nc_id, item['producto_id'], item['cantidad'], item['precio_usd']))
-                
-                # 2. RESTAR DISPONIBILIDAD EN LA FACTURA ORIGINAL
-                cursor.execute("UPDATE documento_detalles SET cantidad_devuelta = cantidad_devuelta + ? WHERE id = ?", 
-                               (item['cantidad'], item['detalle_id']))
-
-                # 3. Devolver producto al inventario
-                cursor.execute("UPDATE productos SET stock_actual = stock_actual + ? WHERE id = ?", (item['cantidad'], item['producto_id']))
-                cursor.execute("SELECT stock_actual FROM productos WHERE id=?", (item['producto_id'],))
-                nuevo_stock = cursor.fetchone()[0]
-                
-                # 4. Registrar movimiento en Kardex de inventario
+                # --- INSERTAR DOCUMENTO NC ---
                 cursor.execute("""
-                    INSERT INTO inventario_kardex (producto_id, tipo_movimiento, cantidad, stock_resultante, motivo, referencia, fecha, usuario_id) 
-                    VALUES (?, 'ENTRADA', ?, ?, 'DEVOLUCION', ?, ?, 1)
-                """, (item['producto_id'], item['cantidad'], nuevo_stock, nro_nc, fecha_actual))
-
-            # --- MOVIMIENTOS DE DINERO ---
-            if "Saldo a Favor" in metodo_reembolso:
-                cursor.execute("UPDATE clientes SET saldo_favor = saldo_favor + ? WHERE id = ?", (total_reembolso_usd, cliente_id))
-            else:
-                desc = f"Devolución {nro_nc} (Fact: {nro_factura})"
+                    INSERT INTO documentos (
+                        tipo_doc, nro_documento, nro_control, cliente_id, fecha, tasa_cambio_momento,
+                        subtotal_usd, impuesto_iva_usd, total_usd, 
+                        documento_referencia, metodo_pago, estado
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'PROCESADO')
+                """, ('NOTA_CREDITO', nro_nc, nro_ctrl_nc, cliente_id, fecha_actual, tasa_historica,
+                      (base_usd + exento_usd), iva_usd, total_reembolso_usd, nro_factura, metodo_reembolso))
+                nc_id = cursor.lastrowid
+            
+                # --- COSTO DE LO DEVUELTO: el mismo costo unitario con que salió en la factura ---
+                costos_unitarios = []
+                for item in items_a_devolver:
+                    cursor.execute("SELECT cantidad, costo_usd FROM documento_detalles WHERE id = ?", (item['detalle_id'],))
+                    linea = cursor.fetchone()
+                    if linea and linea['cantidad']:
+                        costos_unitarios.append((linea['costo_usd'] or 0) / linea['cantidad'])
+                    else:
+                        costos_unitarios.append(CostController.costo_promedio(cursor, item['producto_id']))
+                # La mercancía vuelve como una capa nueva (antes de sumar el stock)
+                CostController.registrar_entrada(
+                    cursor, [(item['producto_id'], item['cantidad'], costo) for item, costo in zip(items_a_devolver, costos_unitarios)],
+                    'DEVOLUCION', nro_nc, fecha_actual
+                )
+                factor_desc = 1 - (factura_orig['descuento_porcentaje'] or 0) / 100
+
+                # --- DETALLE DE LA NC, FACTURA ORIGINAL, INVENTARIO Y KARDEX (en bloque, como en ventas) ---
+                # Margen negativo: la línea de la NC revierte el de la venta
+                costos_linea = [item['cantidad'] * costo for item, costo in zip(items_a_devolver, costos_unitarios)]
+                margenes = [-(item['cantidad'] * item['precio_usd'] * factor_desc - costo)
+                            for item, costo in zip(items_a_devolver, costos_linea)]
+                margen_nc = sum(margenes)
+                cursor.executemany("""
+                    INSERT INTO documento_detalles (documento_id, producto_id, cantidad, precio_unitario_usd, costo_usd, margen_usd)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, [(nc_id, item['producto_id'], item['cantidad'], item['precio_usd'], costo, margen)
+                      for item, costo, margen in zip(items_a_devolver, costos_linea, margenes)])
+
+                # Restar disponibilidad en la factura original
+                cursor.executemany("UPDATE documento_detalles SET cantidad_devuelta = cantidad_devuelta + ? WHERE id = ?",
+                                   [(item['cantidad'], item['detalle_id']) for item in items_a_devolver])
+
+                # Devolver el producto al inventario y asentar el kardex
+                stock_final = InventoryController.aplicar_movimientos_lote(
+                    cursor,
+                    [(item['producto_id'], item['cantidad']) for item in items_a_devolver],
+                    'ENTRADA', 'DEVOLUCION', nro_nc, fecha_actual,
+                    usuario_id=usuario_id
+                )
+
+                # Resúmenes diarios del dashboard
+                StatsController.acumular_documento(
+                    cursor, fecha_actual, 'NOTA_CREDITO', metodo_reembolso, total_reembolso_usd,
+                    [(item['producto_id'], item['cantidad']) for item in items_a_devolver], margen_nc
+                )
+
+                # --- MOVIMIENTOS DE DINERO ---
+                if "Saldo a Favor" in metodo_reembolso:
+                    cursor.execute("UPDATE clientes SET saldo_favor = saldo_favor + ? WHERE id = ?", (total_reembolso_usd, cliente_id))
+                else:
+                    desc = f"Devolución {nro_nc} (Fact: {nro_factura})"
                 
-                cursor.execute("""
-                    INSERT INTO caja_movimientos (sesion_id, tipo, monto_usd, monto_bs, monto_cop, motivo, fecha, usuario_id) 
-                    VALUES (?, 'EGRESO', ?, ?, ?, ?, ?, 1)
-                """, (sesion['id'], m_usd, m_bs, m_cop, desc, fecha_actual))
+                    cursor.execute("""
+                        INSERT INTO caja_movimientos (sesion_id, tipo, monto_usd, monto_bs, monto_cop, motivo, fecha, usuario_id) 
+                        VALUES (?, 'EGRESO', ?, ?, ?, ?, ?, ?)
+                    """, (sesion['id'], m_usd, m_bs, m_cop, desc, fecha_actual, usuario_id))
                 
-                CashController._registrar_kardex(
-                    cursor, sesion['id'], 'EGRESO',
-                    0, m_usd, 0, m_bs, 0, m_cop, 
-                    desc, nro_nc
-                )
+                    CashController._registrar_kardex(
+                        cursor, sesion['id'], 'EGRESO',
+                        0, m_usd, 0, m_bs, 0, m_cop, 
+                        desc, nro_nc
+                    )
 
-            # --- FINALIZAR Y EVALUAR ANULACIÓN DE FACTURA ---
-            cursor.execute("UPDATE configuracion SET proximo_nro_nc = proximo_nro_nc + 1, proximo_nro_control = proximo_nro_control + 1")
+                # --- FINALIZAR Y EVALUAR ANULACIÓN DE FACTURA ---
             
-            # Comprobamos si la factura ya se devolvió al 100%
-            cursor.execute("SELECT sum(cantidad) as tot, sum(cantidad_devuelta) as dev FROM documento_detalles WHERE documento_id = ?", (factura_orig['id'],))
-            estado_factura = cursor.fetchone()
+                # Comprobamos si la factura ya se devolvió al 100%
+                cursor.execute("SELECT sum(cantidad) as tot, sum(cantidad_devuelta) as dev FROM documento_detalles WHERE documento_id = ?", (factura_orig['id'],))
+                estado_factura = cursor.fetchone()
             
-            # Solo si la suma de las devoluciones iguala o supera lo comprado, se anula la factura madre.
-            if estado_factura and (estado_factura['tot'] <= estado_factura['dev']):
-                cursor.execute("UPDATE documentos SET estado = 'ANULADO', motivo_anulacion = ? WHERE nro_documento = ?", 
-                               (f"Devolución Total completada con {nro_nc}", nro_factura))
+                # Solo si la suma de las devoluciones iguala o supera lo comprado, se anula la factura madre.
+                if estado_factura and (estado_factura['tot'] <= estado_factura['dev']):
+                    cursor.execute("UPDATE documentos SET estado = 'ANULADO', motivo_anulacion = ? WHERE nro_documento = ?", 
+                                   (f"Devolución Total completada con {nro_nc}", nro_factura))
 
-            conn.commit()
+            productos_ids = [item['producto_id'] for item in items_a_devolver]
+            CatalogController.actualizar_stock(stock_final)
+
+            # Avisar al resto del sistema: volvió mercancía al inventario y cambió el resumen del día
+            comunicacion.publicar_inventario(productos_ids)
+            comunicacion.publicar_venta(nc_id, nro_nc, 'NOTA_CREDITO', total_reembolso_usd, productos_ids)
             return True, nro_nc
             
         except Exception as e:
-            conn.rollback()
             return False, f"Error en BD: {str(e)}"
-        finally:
-            conn.close()
 
     @staticmethod
     def generar_pdf_nota_credito(nro_nc, ruta_pdf):
         """Genera el PDF de la Nota de Crédito en formato Ticket de 80mm"""
+        # ReportLab se importa al generar el primer PDF (arranque más rápido)
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.units import mm
         conn = crear_conexion()
         if not conn: return False
         
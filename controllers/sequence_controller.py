@@ -0,0 +1,141 @@
+import sqlite3
+from collections import Counter
+from data.conexion import crear_conexion, transaccion, SERIES_DOCUMENTO
+
+class SequenceController:
+    """
+    Numeración fiscal sin saltos ni duplicados (tabla secuencias).
+    siguiente()/numero_documento()/numero_control() reciben el cursor de la
+    transacción que inserta el documento: el UPDATE ... RETURNING toma y avanza
+    el contador en un solo paso, y un rollback lo devuelve.
+    """
+
+    @staticmethod
+    def siguiente(cursor, serie):
+        cursor.execute("""
+            UPDATE secuencias SET siguiente = siguiente + 1
+            WHERE serie = ? AND (hasta IS NULL OR siguiente <= hasta)
+            RETURNING siguiente - 1
+        """, (serie,))
+        row = cursor.fetchone()
+        if row: return row[0]
+
+        cursor.execute("SELECT hasta FROM secuencias WHERE serie = ?", (serie,))
+        existe = cursor.fetchone()
+        if existe:
+            raise ValueError(f"Se agotó el rango de la serie {serie} (hasta {existe[0]}).")
+        raise ValueError(f"La serie {serie} no existe.")
+
+    @staticmethod
+    def numero_documento(cursor, tipo_doc):
+        """'FAC-00000001', 'NE-00000001' o 'NC-00000001'."""
+        return f"{SERIES_DOCUMENTO[tipo_doc]}-{str(SequenceController.siguiente(cursor, tipo_doc)).zfill(8)}"
+
+    @staticmethod
+    def numero_control(cursor, terminal_id=None):
+        """Número de control del rango propio de la terminal si lo tiene; si no, del contador global."""
+        serie = 'CONTROL'
+        if terminal_id is not None:
+            cursor.execute("SELECT 1 FROM secuencias WHERE serie = ?", (f"CONTROL:{terminal_id}",))
+            if cursor.fetchone(): serie = f"CONTROL:{terminal_id}"
+        return f"00-{str(SequenceController.siguiente(cursor, serie)).zfill(8)}"
+
+    @staticmethod
+    def asignar_rango_control(terminal_id, desde, hasta):
+        """
+        Reserva [desde, hasta] para los números de control de una terminal.
+        El rango no puede pisar el de otra terminal ni números ya emitidos por
+        el contador global, que queda limitado para no alcanzar ningún rango.
+        """
+        if desde < 1 or hasta < desde:
+            return False, "Rango inválido."
+        try:
+            with transaccion() as cursor:
+                cursor.execute("SELECT siguiente FROM secuencias WHERE serie = 'CONTROL'")
+                siguiente_global = cursor.fetchone()[0]
+                if desde < siguiente_global:
+                    return False, f"El rango debe empezar en {siguiente_global} o después (números ya emitidos)."
+
+                cursor.execute("""
+                    SELECT serie, desde, hasta, siguiente FROM secuencias
+                    WHERE serie LIKE 'CONTROL:%' AND desde <= ? AND hasta >= ?
+                """, (hasta, desde))
+                for otro in cursor.fetchall():
+                    if otro['serie'] != f"CONTROL:{terminal_id}":
+                        return False, f"El rango se cruza con el de otra terminal ({otro['desde']}-{otro['hasta']})."
+
+                # Si la terminal ya emitió números de su rango, el nuevo debe contenerlos y sigue desde ahí
+                cursor.execute("SELECT siguiente, desde FROM secuencias WHERE serie = ?", (f"CONTROL:{terminal_id}",))
+                actual = cursor.fetchone()
+                inicio = desde
+                if actual and actual['siguiente'] > actual['desde']:
+                    if desde > actual['desde'] or hasta < actual['siguiente'] - 1:
+                        return False, (f"La terminal ya emitió {actual['desde']}-{actual['siguiente'] - 1}: "
+                                       f"el nuevo rango debe contenerlos.")
+                    inicio = actual['siguiente']
+
+                cursor.execute("""
+                    INSERT INTO secuencias (serie, siguiente, desde, hasta, terminal_id) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(serie) DO UPDATE SET siguiente = excluded.siguiente, desde = excluded.desde, hasta = excluded.hasta
+                """, (f"CONTROL:{terminal_id}", inicio, desde, hasta, terminal_id))
+
+                # El contador global se detiene antes del primer rango reservado por encima de él
+                cursor.execute("SELECT MIN(desde) FROM secuencias WHERE serie LIKE 'CONTROL:%' AND desde >= ?", (siguiente_global,))
+                tope = cursor.fetchone()[0]
+                cursor.execute("UPDATE secuencias SET hasta = ? WHERE serie = 'CONTROL'", (tope - 1 if tope else None,))
+            return True, "Rango de control asignado."
+        except sqlite3.Error as e:
+            return False, f"Error asignando rango: {e}"
+
+    @staticmethod
+    def obtener_secuencias():
+        conn = crear_conexion()
+        if not conn: return []
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT * FROM secuencias ORDER BY serie")
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def verificar():
+        """
+        Revisa que cada serie de documentos y los números de control emitidos
+        sean consecutivos: retorna {serie: {'emitidos', 'duplicados', 'faltantes'}}.
+        Los faltantes se buscan entre el inicio de la serie y el último número emitido.
+        """
+        conn = crear_conexion()
+        if not conn: return None
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT serie, desde, siguiente FROM secuencias")
+            secuencias = {row['serie']: (row['desde'], row['siguiente']) for row in cursor.fetchall()}
+
+            numeros = {}
+            for tipo_doc, prefijo in SERIES_DOCUMENTO.items():
+                cursor.execute("SELECT nro_documento FROM documentos WHERE tipo_doc = ? AND nro_documento LIKE ?",
+                               (tipo_doc, f"{prefijo}-%"))
+                numeros[tipo_doc] = [int(row[0].split('-', 1)[1]) for row in cursor.fetchall()]
+
+            # Control: cada número se atribuye a la serie (global o de terminal) en cuyo rango cae
+            rangos = [(serie, desde, siguiente) for serie, (desde, siguiente) in secuencias.items() if serie.startswith('CONTROL:')]
+            cursor.execute("SELECT nro_control FROM documentos WHERE nro_control LIKE '00-%'")
+            for row in cursor.fetchall():
+                nro = int(row[0].split('-', 1)[1])
+                serie = next((s for s, desde, siguiente in rangos if desde <= nro < siguiente), 'CONTROL')
+                numeros.setdefault(serie, []).append(nro)
+
+            resultado = {}
+            for serie, emitidos in numeros.items():
+                conteo = Counter(emitidos)
+                desde = secuencias.get(serie, (1, 1))[0]
+                tope = max(conteo) if conteo else desde - 1
+                resultado[serie] = {
+                    'emitidos': len(emitidos),
+                    'duplicados': sorted(n for n, veces in conteo.items() if veces > 1),
+                    'faltantes': [n for n in range(desde, tope + 1) if n not in conteo],
+                }
+            return resultado
+        finally:
+            conn.close()
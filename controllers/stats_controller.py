@@ -1,34 +1,69 @@
+import sys
 import sqlite3
-from data.conexion import crear_conexion
+from data.conexion import crear_conexion, transaccion, reconstruir_resumenes_diarios
 from datetime import datetime, timedelta
+from controllers.date_utils import rango_dia, rango_ultimos_dias, filtro_rango
 
 class StatsController:
-    
+    """
+    El dashboard lee de resumen_ventas_diario y resumen_productos_diario (unas
+    pocas filas por día) en lugar de agrupar toda la tabla de documentos.
+    """
+
+    @staticmethod
+    def acumular_documento(cursor, fecha, tipo_doc, metodo_pago, total_usd, lineas, margen_usd=0):
+        """
+        Suma un documento a los resúmenes diarios. Se llama con el cursor de la
+        transacción que lo registra, así el resumen nunca queda desfasado.
+        lineas: [(producto_id, cantidad), ...]
+        margen_usd: suma de documento_detalles.margen_usd del documento.
+        """
+        dia = str(fecha)[:10]
+        cursor.execute("""
+            INSERT INTO resumen_ventas_diario (fecha, tipo_doc, metodo_pago, documentos, total_usd, margen_usd)
+            VALUES (?, ?, ?, 1, ?, ?)
+            ON CONFLICT (fecha, tipo_doc, metodo_pago)
+            DO UPDATE SET documentos = documentos + 1, total_usd = total_usd + excluded.total_usd,
+                          margen_usd = margen_usd + excluded.margen_usd
+        """, (dia, tipo_doc, metodo_pago or '', total_usd or 0, margen_usd or 0))
+        cursor.executemany("""
+            INSERT INTO resumen_productos_diario (fecha, tipo_doc, producto_id, cantidad)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (fecha, tipo_doc, producto_id)
+            DO UPDATE SET cantidad = cantidad + excluded.cantidad
+        """, [(dia, tipo_doc, producto_id, cantidad) for producto_id, cantidad in lineas])
+
+    @staticmethod
+    def reconstruir_resumenes(desde=None):
+        """Recalcula los resúmenes desde los documentos (todo el historial o a partir de `desde`)."""
+        try:
+            with transaccion() as cursor:
+                reconstruir_resumenes_diarios(cursor, desde)
+            return True, "Resúmenes reconstruidos."
+        except Exception as e:
+            return False, f"Error reconstruyendo resúmenes: {e}"
+
     @staticmethod
     def obtener_kpis_hoy():
         """Devuelve las métricas clave del día actual."""
-        hoy = datetime.now().strftime("%Y-%m-%d")
+        rango_hoy = rango_dia()
         conn = crear_conexion()
         if not conn: return None
         
         try:
             cursor = conn.cursor()
             
-            # 1. Ventas Totales ($) (Solo Facturas para dinero real)
+            # 1. Ventas Totales ($) (Solo Facturas para dinero real) y 2. Transacciones (Facturas + Notas)
             cursor.execute("""
-                SELECT SUM(total_usd), COUNT(*) 
-                FROM documentos 
-                WHERE date(fecha) = ? AND tipo_doc = 'FACTURA'
-            """, (hoy,))
-            res_ventas = cursor.fetchone()
-            ventas_hoy = res_ventas[0] if res_ventas[0] else 0
-            
-            # 2. Transacciones (Facturas + Notas)
-            cursor.execute("SELECT COUNT(*) FROM documentos WHERE date(fecha) = ?", (hoy,))
-            transacciones = cursor.fetchone()[0]
+                SELECT SUM(CASE WHEN tipo_doc = 'FACTURA' THEN total_usd ELSE 0 END), SUM(documentos)
+                FROM resumen_ventas_diario WHERE fecha = ?
+            """, (rango_hoy[0],))
+            res = cursor.fetchone()
+            ventas_hoy = res[0] if res[0] else 0
+            transacciones = res[1] or 0
             
-            # 3. Ganancia Estimada (Venta - Costo)
-            ganancia_estimada = ventas_hoy * 0.30 
+            # 3. Ganancia (Venta - Costo FIFO), neta de notas de crédito
+            ganancia_estimada = StatsController._sumar_ganancia(cursor, *rango_hoy)
             
             # 4. Productos con Stock Crítico
             cursor.execute("SELECT COUNT(*) FROM productos WHERE stock_actual <= stock_minimo AND estado=1")
@@ -47,6 +82,26 @@ class StatsController:
         finally:
             conn.close()
 
+    @staticmethod
+    def _sumar_ganancia(cursor, desde, hasta):
+        cursor.execute(f"""
+            SELECT SUM(margen_usd) FROM resumen_ventas_diario
+            WHERE tipo_doc IN ('FACTURA', 'NOTA_CREDITO') AND {filtro_rango()}
+        """, (desde, hasta))
+        return cursor.fetchone()[0] or 0
+
+    @staticmethod
+    def obtener_ganancia(desde, hasta):
+        """Ganancia (margen sobre costo) de las facturas en el rango [desde, hasta), neta de devoluciones."""
+        conn = crear_conexion()
+        try:
+            return StatsController._sumar_ganancia(conn.cursor(), desde, hasta)
+        except Exception as e:
+            print(f"Error Ganancia: {e}")
+            return 0
+        finally:
+            conn.close()
+
     @staticmethod
     def obtener_ventas_semana():
         """Devuelve las ventas ($) de los últimos 7 días (SOLO FACTURAS)."""
@@ -58,21 +113,21 @@ class StatsController:
         try:
             cursor = conn.cursor()
             
+            # Una fila por día y método de pago en el rango de 7 días
+            cursor.execute(f"""
+                SELECT fecha, SUM(total_usd) FROM resumen_ventas_diario 
+                WHERE tipo_doc = 'FACTURA' AND {filtro_rango()}
+                GROUP BY fecha
+            """, rango_ultimos_dias(7))
+            por_dia = {row[0]: row[1] or 0 for row in cursor.fetchall()}
+            
             # Generamos los últimos 7 días para asegurar que existan en la gráfica
             for i in range(6, -1, -1):
                 fecha = (datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d")
                 
-                cursor.execute("""
-                    SELECT SUM(total_usd) FROM documentos 
-                    WHERE date(fecha) = ? AND tipo_doc = 'FACTURA'
-                """, (fecha,))
-                
-                res = cursor.fetchone()
-                monto = res[0] if res and res[0] else 0
-                
                 # Formato corto DD/MM
                 fechas.append(datetime.strptime(fecha, "%Y-%m-%d").strftime("%d/%m"))
-                montos.append(monto)
+                montos.append(por_dia.get(fecha, 0))
                 
             return fechas, montos
         except Exception as e:
@@ -90,8 +145,8 @@ class StatsController:
         try:
             cursor = conn.cursor()
             cursor.execute("""
-                SELECT metodo_pago, COUNT(*) as cantidad 
-                FROM documentos 
+                SELECT metodo_pago, SUM(documentos) as cantidad 
+                FROM resumen_ventas_diario 
                 WHERE tipo_doc = 'FACTURA'
                 GROUP BY metodo_pago
             """)
@@ -112,19 +167,29 @@ class StatsController:
         conn = crear_conexion()
         try:
             cursor = conn.cursor()
-            # --- ÚNICA MODIFICACIÓN AQUÍ ---
-            # Agregamos p.codigo_interno al SELECT para que SalesView pueda usarlo
+            # Agregamos p.codigo_interno al SELECT para que SalesView pueda usarlo.
+            # Lo devuelto en notas de crédito se descuenta de lo vendido.
             cursor.execute("""
-                SELECT p.codigo_interno, p.descripcion, SUM(d.cantidad) as total_vendido
-                FROM documento_detalles d
-                JOIN productos p ON d.producto_id = p.id
-                GROUP BY d.producto_id
-                ORDER BY total_vendido DESC
-                LIMIT ?
+                SELECT p.codigo_interno, p.descripcion, r.total_vendido
+                FROM (
+                    SELECT producto_id,
+                           SUM(CASE WHEN tipo_doc = 'NOTA_CREDITO' THEN -cantidad ELSE cantidad END) as total_vendido
+                    FROM resumen_productos_diario
+                    GROUP BY producto_id
+                    ORDER BY total_vendido DESC
+                    LIMIT ?
+                ) r
+                JOIN productos p ON r.producto_id = p.id
+                ORDER BY r.total_vendido DESC
             """, (limite,))
             return cursor.fetchall()
         except Exception as e:
             print(f"Error Top: {e}")
             return []
         finally:
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+if __name__ == "__main__":
+    # Reconstrucción manual: python -m controllers.stats_controller [AAAA-MM-DD]
+    exito, msg = StatsController.reconstruir_resumenes(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(("✅ " if exito else "❌ ") + msg)
@@ -0,0 +1,194 @@
+import sqlite3
+from datetime import datetime
+from data.conexion import crear_conexion, transaccion
+from core.app_signals import comunicacion
+from controllers.catalog_controller import CatalogController
+from controllers.cost_controller import CostController
+
+class StockCountController:
+    """
+    Toma de inventario (conteo físico). Las cantidades escaneadas se guardan en
+    conteo_lineas sin tocar el stock; al aplicar, la diferencia contra
+    stock_actual se asienta de una vez: una transacción, un INSERT ... SELECT al
+    kardex, un UPDATE ... FROM a productos y una sola notificación al resto del sistema.
+    """
+
+    @staticmethod
+    def obtener_conteo_abierto():
+        conn = crear_conexion()
+        if not conn: return None
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT c.*, (SELECT COUNT(*) FROM conteo_lineas l WHERE l.conteo_id = c.id) as productos_contados
+                FROM conteos c WHERE c.estado = 'ABIERTO' ORDER BY c.id DESC LIMIT 1
+            """)
+            row = cursor.fetchone()
+            return dict(row) if row else None
+        finally:
+            conn.close()
+
+    @staticmethod
+    def abrir_conteo(observaciones="", usuario_id=1):
+        """Inicia una toma de inventario; solo puede haber una abierta."""
+        try:
+            with transaccion() as cursor:
+                cursor.execute("SELECT id FROM conteos WHERE estado = 'ABIERTO'")
+                if cursor.fetchone():
+                    return False, "Ya hay una toma de inventario abierta."
+                cursor.execute("INSERT INTO conteos (fecha_inicio, estado, usuario_id, observaciones) VALUES (?, 'ABIERTO', ?, ?)",
+                               (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), usuario_id, observaciones))
+                return True, cursor.lastrowid
+        except sqlite3.Error as e:
+            return False, f"Error abriendo la toma de inventario: {e}"
+
+    @staticmethod
+    def registrar_conteos(conteo_id, lineas, acumular=True):
+        """
+        Guarda cantidades contadas: lineas [(producto_id, cantidad), ...].
+        acumular=True suma a lo ya contado (cada escaneo suma); False reemplaza.
+        """
+        actualizar = "conteo_lineas.cantidad + excluded.cantidad" if acumular else "excluded.cantidad"
+        fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            with transaccion() as cursor:
+                cursor.execute("SELECT estado FROM conteos WHERE id = ?", (conteo_id,))
+                conteo = cursor.fetchone()
+                if not conteo or conteo['estado'] != 'ABIERTO':
+                    return False, "La toma de inventario no está abierta."
+                cursor.executemany(f"""
+                    INSERT INTO conteo_lineas (conteo_id, producto_id, cantidad, fecha) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(conteo_id, producto_id) DO UPDATE SET cantidad = {actualizar}, fecha = excluded.fecha
+                """, [(conteo_id, pid, cantidad, fecha) for pid, cantidad in lineas])
+            return True, f"{len(lineas)} conteo(s) registrados."
+        except sqlite3.Error as e:
+            return False, f"Error registrando el conteo: {e}"
+
+    @staticmethod
+    def registrar_codigo(conteo_id, codigo, cantidad=1, acumular=True):
+        """Escaneo de un código: retorna (exito, mensaje) con la cantidad contada del producto."""
+        producto = CatalogController.por_codigo(codigo.strip().upper())
+        if not producto:
+            return False, f"Código '{codigo}' no encontrado."
+        exito, msg = StockCountController.registrar_conteos(conteo_id, [(producto['id'], cantidad)], acumular)
+        if not exito: return exito, msg
+
+        conn = crear_conexion()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT cantidad FROM conteo_lineas WHERE conteo_id = ? AND producto_id = ?", (conteo_id, producto['id']))
+            return True, f"{producto['descripcion']}: {cursor.fetchone()[0]:g} contado(s)"
+        finally:
+            conn.close()
+
+    @staticmethod
+    def obtener_diferencias(conteo_id, solo_diferencias=False, limite=None, desplazamiento=0):
+        """Líneas contadas contra el stock actual: codigo, descripcion, stock_actual, contado, diferencia."""
+        conn = crear_conexion()
+        if not conn: return []
+        try:
+            cursor = conn.cursor()
+            query = """
+                SELECT p.id, p.codigo_interno, p.descripcion, p.stock_actual, l.cantidad as contado,
+                       l.cantidad - p.stock_actual as diferencia
+                FROM conteo_lineas l JOIN productos p ON p.id = l.producto_id
+                WHERE l.conteo_id = ?
+            """
+            params = [conteo_id]
+            if solo_diferencias:
+                query += " AND l.cantidad <> p.stock_actual"
+            query += " ORDER BY ABS(l.cantidad - p.stock_actual) DESC, p.descripcion"
+            if limite is not None:
+                query += " LIMIT ? OFFSET ?"
+                params.extend([limite, desplazamiento])
+            cursor.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    @staticmethod
+    def aplicar_conteo(conteo_id, usuario_id=1, no_contados_en_cero=False):
+        """
+        Ajusta el stock de todos los productos contados al valor contado, en una
+        sola transacción. no_contados_en_cero=True (toma total) lleva a cero los
+        productos activos que no se contaron.
+        """
+        fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        referencia = f"CONTEO-{conteo_id}"
+        try:
+            with transaccion() as cursor:
+                cursor.execute("UPDATE conteos SET estado = 'APLICADO', fecha_cierre = ? WHERE id = ? AND estado = 'ABIERTO'",
+                               (fecha, conteo_id))
+                if cursor.rowcount != 1:
+                    return False, "La toma de inventario no está abierta."
+
+                if no_contados_en_cero:
+                    cursor.execute("""
+                        INSERT INTO conteo_lineas (conteo_id, producto_id, cantidad, fecha)
+                        SELECT ?, p.id, 0, ? FROM productos p
+                        WHERE p.estado = 1 AND p.stock_actual <> 0
+                          AND NOT EXISTS (SELECT 1 FROM conteo_lineas l WHERE l.conteo_id = ? AND l.producto_id = p.id)
+                    """, (conteo_id, fecha, conteo_id))
+
+                # 1. Foto del stock del sistema al aplicar (queda como auditoría de la toma)
+                cursor.execute("""
+                    UPDATE conteo_lineas SET stock_sistema = p.stock_actual
+                    FROM productos p WHERE conteo_lineas.conteo_id = ? AND p.id = conteo_lineas.producto_id
+                """, (conteo_id,))
+
+                # 2. Capas de costo: sobrantes al costo promedio vigente, faltantes consumen FIFO
+                cursor.execute("""
+                    SELECT l.producto_id, l.cantidad - l.stock_sistema as diferencia, COALESCE(p.costo_promedio_usd, 0) as costo
+                    FROM conteo_lineas l JOIN productos p ON p.id = l.producto_id
+                    WHERE l.conteo_id = ? AND l.cantidad <> l.stock_sistema
+                """, (conteo_id,))
+                ajustes = cursor.fetchall()
+                if not ajustes:
+                    return True, "Toma aplicada: el inventario coincide con lo contado."
+                sobrantes = [(row['producto_id'], row['diferencia'], row['costo']) for row in ajustes if row['diferencia'] > 0]
+                faltantes = [(row['producto_id'], -row['diferencia']) for row in ajustes if row['diferencia'] < 0]
+                if sobrantes:
+                    CostController.registrar_entrada(cursor, sobrantes, 'AJUSTE', referencia, fecha)
+                if faltantes:
+                    CostController.consumir(cursor, faltantes)
+
+                # 3. Kardex: un asiento por producto ajustado, en una sola sentencia
+                cursor.execute("""
+                    INSERT INTO inventario_kardex (
+                        producto_id, tipo_movimiento, cantidad, stock_resultante,
+                        motivo, referencia, observaciones, fecha, usuario_id
+                    )
+                    SELECT producto_id, CASE WHEN cantidad > stock_sistema THEN 'ENTRADA' ELSE 'SALIDA' END,
+                           ABS(cantidad - stock_sistema), cantidad, 'TOMA INVENTARIO', ?, 'Ajuste por conteo físico', ?, ?
+                    FROM conteo_lineas WHERE conteo_id = ? AND cantidad <> stock_sistema
+                """, (referencia, fecha, usuario_id, conteo_id))
+
+                # 4. Stock al valor contado
+                cursor.execute("""
+                    UPDATE productos SET stock_actual = l.cantidad
+                    FROM conteo_lineas l
+                    WHERE l.conteo_id = ? AND productos.id = l.producto_id AND l.cantidad <> l.stock_sistema
+                """, (conteo_id,))
+
+                cursor.execute("SELECT producto_id, cantidad FROM conteo_lineas WHERE conteo_id = ? AND cantidad <> stock_sistema",
+                               (conteo_id,))
+                nuevos = {row[0]: row[1] for row in cursor.fetchall()}
+
+            CatalogController.actualizar_stock(nuevos)
+            # Una sola notificación (coalescida) para todos los productos ajustados
+            comunicacion.publicar_inventario(list(nuevos))
+            return True, f"Toma aplicada: {len(nuevos)} producto(s) ajustados."
+        except sqlite3.Error as e:
+            return False, f"Error aplicando la toma de inventario: {e}"
+
+    @staticmethod
+    def anular_conteo(conteo_id):
+        try:
+            with transaccion() as cursor:
+                cursor.execute("UPDATE conteos SET estado = 'ANULADO', fecha_cierre = ? WHERE id = ? AND estado = 'ABIERTO'",
+                               (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), conteo_id))
+                if cursor.rowcount != 1:
+                    return False, "La toma de inventario no está abierta."
+            return True, "Toma de inventario anulada."
+        except sqlite3.Error as e:
+            return False, f"Error anulando la toma de inventario: {e}"
@@ -0,0 +1,77 @@
+import os
+import socket
+import threading
+from datetime import datetime
+from data import conexion
+
+class TerminalController:
+    """
+    Identidad de la terminal (caja) que ejecuta este proceso. Varias terminales
+    pueden trabajar sobre la misma base de datos: cada una tiene su propia
+    sesión de caja, y su saldo corriente vive en la fila de esa sesión.
+    El código sale de la variable PEGASUS_TERMINAL o, si no está, del nombre del equipo.
+    """
+    _lock = threading.Lock()
+    _codigo = None
+    _cache = {}  # (DB_PATH, codigo) -> fila de terminales
+
+    @classmethod
+    def codigo_local(cls):
+        return (cls._codigo or os.environ.get("PEGASUS_TERMINAL") or socket.gethostname()).strip().upper()
+
+    @classmethod
+    def configurar(cls, codigo):
+        """Fija el código de esta terminal (configuración o pruebas de carga)."""
+        with cls._lock:
+            cls._codigo = codigo
+            cls._cache.clear()
+
+    @classmethod
+    def actual(cls):
+        """
+        Retorna {'id', 'codigo', 'nombre'} de esta terminal; la registra la primera vez.
+        Llamar antes de abrir una transacción de escritura (el registro usa su propia conexión).
+        """
+        codigo = cls.codigo_local()
+        clave = (conexion.DB_PATH, codigo)
+        terminal = cls._cache.get(clave)
+        if terminal: return terminal
+
+        conn = conexion.crear_conexion()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, codigo, nombre FROM terminales WHERE codigo = ?", (codigo,))
+            row = cursor.fetchone()
+            if not row:
+                cursor.execute("INSERT OR IGNORE INTO terminales (codigo, nombre, fecha_registro) VALUES (?, ?, ?)",
+                               (codigo, codigo, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+                cursor.execute("SELECT id, codigo, nombre FROM terminales WHERE codigo = ?", (codigo,))
+                row = cursor.fetchone()
+                # Caja abierta antes de existir las terminales: la adopta la primera que se registre
+                cursor.execute("""
+                    UPDATE caja_sesiones SET terminal_id = ?
+                    WHERE id = (SELECT MAX(id) FROM caja_sesiones WHERE terminal_id IS NULL AND estado = 'ABIERTA')
+                """, (row[0],))
+                conn.commit()
+            terminal = {'id': row[0], 'codigo': row[1], 'nombre': row[2]}
+        finally:
+            conn.close()
+
+        with cls._lock:
+            cls._cache[clave] = terminal
+        return terminal
+
+    @staticmethod
+    def listar():
+        conn = conexion.crear_conexion()
+        if not conn: return []
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT t.id, t.codigo, t.nombre,
+                       (SELECT id FROM caja_sesiones s WHERE s.terminal_id = t.id AND s.estado = 'ABIERTA') as sesion_abierta
+                FROM terminales t ORDER BY t.codigo
+            """)
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
@@ -0,0 +1,181 @@
+import csv
+import os
+from data.conexion import crear_conexion
+from controllers.date_utils import rango_dia
+from controllers.config_controller import ConfigController
+
+# Costo de la existencia de cada producto activo, en USD, desde las capas FIFO
+# abiertas (las mantiene CostController en cada entrada y salida). Si el stock
+# supera las capas (stock previo sin costo) el resto va al costo promedio; si
+# las capas superan al stock se prorratean.
+SQL_COSTO_PRODUCTOS = """
+    SELECT p.id, p.codigo_interno, p.descripcion, p.categoria_id, p.proveedor_id,
+           COALESCE(p.stock_actual, 0) as stock, COALESCE(p.precio_usd, 0) as precio_usd,
+           CASE
+               WHEN COALESCE(p.stock_actual, 0) <= 0 THEN 0
+               WHEN c.cantidad IS NULL THEN p.stock_actual * COALESCE(p.costo_promedio_usd, 0)
+               WHEN p.stock_actual <= c.cantidad THEN c.valor * p.stock_actual / c.cantidad
+               ELSE c.valor + (p.stock_actual - c.cantidad) * COALESCE(p.costo_promedio_usd, 0)
+           END as costo_usd
+    FROM productos p
+    LEFT JOIN (
+        SELECT producto_id, SUM(cantidad_restante) as cantidad, SUM(cantidad_restante * costo_unitario_usd) as valor
+        FROM costo_capas WHERE cantidad_restante > 0 GROUP BY producto_id
+    ) c ON c.producto_id = p.id
+    WHERE p.estado = 1
+"""
+
+# agrupar_por -> (clave, nombre) del grupo
+AGRUPACIONES = {
+    'categoria': ("v.categoria_id", "COALESCE(cat.nombre, 'Sin Categoría')"),
+    'proveedor': ("v.proveedor_id", "COALESCE(prov.razon_social, 'Sin Proveedor')"),
+    'categoria_proveedor': ("COALESCE(v.categoria_id, 0) || '-' || COALESCE(v.proveedor_id, 0)",
+                            "COALESCE(cat.nombre, 'Sin Categoría') || ' / ' || COALESCE(prov.razon_social, 'Sin Proveedor')"),
+}
+
+COLUMNAS_EXPORTACION = ["Código", "Descripción", "Categoría", "Proveedor", "Existencia",
+                        "Costo USD", "Costo Bs", "Venta USD", "Venta Bs"]
+
+class ValuationController:
+    """
+    Valorización del inventario: costo y valor de venta de la existencia actual,
+    agrupado por categoría y/o proveedor, en USD y en Bs a la tasa vigente o a
+    la de una fecha (historial_tasas). Todo sale de una sola consulta agregada.
+    """
+
+    @staticmethod
+    def tasa_a_fecha(fecha=None, moneda='BCV'):
+        """
+        Tasa vigente al cierre del día `fecha` según historial_tasas. Antes del primer
+        cambio registrado vale la tasa anterior a ese cambio; sin historial, la actual.
+        """
+        tasas = ConfigController.obtener_tasas()
+        actual = tasas['bcv'] if moneda == 'BCV' else tasas['cop']
+        if fecha is None: return actual
+
+        limite = rango_dia(fecha)[1]
+        conn = crear_conexion()
+        if not conn: return actual
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT tasa_nueva FROM historial_tasas WHERE moneda = ? AND fecha < ?
+                ORDER BY fecha DESC LIMIT 1
+            """, (moneda, limite))
+            row = cursor.fetchone()
+            if row: return row[0]
+            cursor.execute("""
+                SELECT tasa_anterior FROM historial_tasas WHERE moneda = ? AND fecha >= ?
+                ORDER BY fecha LIMIT 1
+            """, (moneda, limite))
+            row = cursor.fetchone()
+            return row[0] if row and row[0] else actual
+        finally:
+            conn.close()
+
+    @staticmethod
+    def valorizar(agrupar_por='categoria', fecha_tasa=None, tasa=None):
+        """
+        Retorna {'tasa', 'grupos': [...], 'totales': {...}}. Cada grupo trae
+        grupo, productos, unidades, costo_usd, costo_bs, venta_usd y venta_bs.
+        tasa: si se indica, se usa en lugar de la vigente o la de fecha_tasa.
+        """
+        clave, nombre = AGRUPACIONES[agrupar_por]
+        if tasa is None:
+            tasa = ValuationController.tasa_a_fecha(fecha_tasa)
+
+        conn = crear_conexion()
+        if not conn: return None
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT {clave} as grupo_id, {nombre} as grupo, COUNT(*) as productos,
+                       SUM(MAX(v.stock, 0)) as unidades, SUM(v.costo_usd) as costo_usd,
+                       SUM(MAX(v.stock, 0) * v.precio_usd) as venta_usd
+                FROM ({SQL_COSTO_PRODUCTOS}) v
+                LEFT JOIN categorias cat ON cat.id = v.categoria_id
+                LEFT JOIN proveedores prov ON prov.id = v.proveedor_id
+                GROUP BY 1
+                ORDER BY costo_usd DESC
+            """)
+            grupos = []
+            totales = {'productos': 0, 'unidades': 0.0, 'costo_usd': 0.0, 'venta_usd': 0.0}
+            for row in cursor.fetchall():
+                grupo = dict(row)
+                grupo['costo_bs'] = grupo['costo_usd'] * tasa
+                grupo['venta_bs'] = grupo['venta_usd'] * tasa
+                grupos.append(grupo)
+                for k in totales: totales[k] += grupo[k]
+            totales['costo_bs'] = totales['costo_usd'] * tasa
+            totales['venta_bs'] = totales['venta_usd'] * tasa
+            return {'tasa': tasa, 'agrupar_por': agrupar_por, 'grupos': grupos, 'totales': totales}
+        finally:
+            conn.close()
+
+    @staticmethod
+    def exportar_valorizacion(ruta, fecha_tasa=None, tasa=None, avance=None):
+        """
+        Exporta el detalle por producto a CSV o XLSX (según la extensión) leyendo
+        el cursor por bloques: la memoria no crece con el número de productos.
+        avance(porcentaje, mensaje): opcional, lo usa la cola de trabajos en segundo plano.
+        """
+        if tasa is None:
+            tasa = ValuationController.tasa_a_fecha(fecha_tasa)
+        es_excel = os.path.splitext(ruta)[1].lower() == '.xlsx'
+
+        conn = crear_conexion()
+        if not conn: return False, "Error de conexión a la base de datos."
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) FROM productos WHERE estado = 1")
+            total = cursor.fetchone()[0]
+            cursor.execute(f"""
+                SELECT v.codigo_interno, v.descripcion, COALESCE(cat.nombre, '') as categoria,
+                       COALESCE(prov.razon_social, '') as proveedor, v.stock, v.costo_usd,
+                       MAX(v.stock, 0) * v.precio_usd as venta_usd
+                FROM ({SQL_COSTO_PRODUCTOS}) v
+                LEFT JOIN categorias cat ON cat.id = v.categoria_id
+                LEFT JOIN proveedores prov ON prov.id = v.proveedor_id
+                ORDER BY categoria, v.descripcion
+            """)
+
+            def filas():
+                i = 0
+                while True:
+                    bloque = cursor.fetchmany(1000)
+                    if not bloque: return
+                    for row in bloque:
+                        yield [row['codigo_interno'], row['descripcion'], row['categoria'], row['proveedor'],
+                               row['stock'], round(row['costo_usd'], 2), round(row['costo_usd'] * tasa, 2),
+                               round(row['venta_usd'], 2), round(row['venta_usd'] * tasa, 2)]
+                    i += len(bloque)
+                    if avance and total: avance(i * 95 // total, f"{i} de {total} productos")
+
+            if es_excel:
+                import openpyxl
+                from openpyxl.cell import WriteOnlyCell
+                from openpyxl.styles import Font
+                wb = openpyxl.Workbook(write_only=True)
+                ws = wb.create_sheet("Valorización")
+                ws.append([f"Valorización de inventario - Tasa: {tasa:,.2f} Bs/$"])
+                celdas = []
+                for texto in COLUMNAS_EXPORTACION:
+                    celda = WriteOnlyCell(ws, value=texto)
+                    celda.font = Font(bold=True)
+                    celdas.append(celda)
+                ws.append(celdas)
+                for fila in filas():
+                    ws.append(fila)
+                wb.save(ruta)
+            else:
+                with open(ruta, 'w', newline='', encoding='utf-8-sig') as f:
+                    escritor = csv.writer(f, delimiter=';')
+                    escritor.writerow(COLUMNAS_EXPORTACION)
+                    escritor.writerows(filas())
+
+            if avance: avance(100, "Listo")
+            return True, f"Valorización exportada: {total} productos a tasa {tasa:,.2f}."
+        except OSError as e:
+            return False, f"No se pudo escribir el archivo: {e}"
+        finally:
+            conn.close()
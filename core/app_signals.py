@@ -0,0 +1,140 @@
+import threading
+from PyQt6.QtCore import QObject, QTimer, QEvent, QCoreApplication, pyqtSignal
+
+# --- EVENTOS (lo que viaja en cada señal) ---
+class CambioInventario:
+    """Productos cuyo stock o datos cambiaron. productos_ids=None: cambió todo el catálogo."""
+    def __init__(self, productos_ids=None):
+        self.productos_ids = set(productos_ids) if productos_ids is not None else None
+
+    def combinar(self, otro):
+        if self.productos_ids is None or otro.productos_ids is None:
+            return CambioInventario(None)
+        return CambioInventario(self.productos_ids | otro.productos_ids)
+
+class VentaRegistrada:
+    """
+    Documentos registrados (facturas, notas de entrega, notas de crédito).
+    totales: {tipo_doc: total_usd} acumulado de los documentos incluidos.
+    """
+    def __init__(self, documentos=(), productos_ids=(), totales=None):
+        self.documentos = list(documentos)      # [{'id', 'nro_documento', 'tipo_doc', 'total_usd'}]
+        self.productos_ids = set(productos_ids)
+        self.totales = dict(totales or {})
+
+    @classmethod
+    def de_documento(cls, documento_id, nro_documento, tipo_doc, total_usd, productos_ids):
+        doc = {'id': documento_id, 'nro_documento': nro_documento, 'tipo_doc': tipo_doc, 'total_usd': total_usd}
+        return cls([doc], productos_ids, {tipo_doc: total_usd})
+
+    def combinar(self, otro):
+        totales = dict(self.totales)
+        for tipo, monto in otro.totales.items():
+            totales[tipo] = totales.get(tipo, 0) + monto
+        return VentaRegistrada(self.documentos + otro.documentos, self.productos_ids | otro.productos_ids, totales)
+
+class CambioConfiguracion:
+    """Campos de configuracion que cambiaron (tasas, datos de la empresa). campos=None: todos."""
+    def __init__(self, campos=None):
+        self.campos = set(campos) if campos is not None else None
+
+    def combinar(self, otro):
+        if self.campos is None or otro.campos is None:
+            return CambioConfiguracion(None)
+        return CambioConfiguracion(self.campos | otro.campos)
+
+    def incluye(self, *campos):
+        return self.campos is None or any(c in self.campos for c in campos)
+
+# --- BUS ---
+class _EntregaDiferida(QObject):
+    """Guarda (combinando) los eventos que llegan mientras la vista está oculta y los entrega al mostrarse."""
+    def __init__(self, vista, callback):
+        super().__init__(vista)
+        self.vista = vista
+        self.callback = callback
+        self.pendiente = None
+        vista.installEventFilter(self)
+
+    def recibir(self, evento):
+        if self.vista.isVisible():
+            self.callback(evento)
+        else:
+            self.pendiente = evento if self.pendiente is None else self.pendiente.combinar(evento)
+
+    def eventFilter(self, obj, event):
+        if obj is self.vista and event.type() == QEvent.Type.Show and self.pendiente is not None:
+            evento, self.pendiente = self.pendiente, None
+            # Se entrega tras terminar de mostrarse (no bloquea el cambio de pantalla)
+            QTimer.singleShot(0, lambda: self.callback(evento))
+        return False
+
+class BusEventos(QObject):
+    """
+    Señales globales de la aplicación. Los controladores publican qué cambió
+    (publicar_venta / publicar_inventario); los eventos que llegan dentro de la
+    ventana de tiempo se combinan en uno solo, así una ráfaga de ventas provoca
+    un único refresco. Puede publicarse desde cualquier hilo.
+    Sin aplicación Qt (scripts, benchmarks) no hay bucle de eventos: los eventos
+    se entregan al instante y no se crea ningún timer.
+    """
+    venta_realizada = pyqtSignal(object)         # VentaRegistrada
+    inventario_actualizado = pyqtSignal(object)  # CambioInventario
+    configuracion_actualizada = pyqtSignal(object)  # CambioConfiguracion
+    _programar = pyqtSignal()
+
+    def __init__(self, ventana_ms=150):
+        super().__init__()
+        self.ventana_ms = ventana_ms
+        self._lock = threading.Lock()
+        self._pendientes = {}  # nombre de señal -> evento combinado
+        self._timer = None     # se crea en el primer publicar, en el hilo de la interfaz
+        # Desde otro hilo la conexión queda en cola: el timer se arranca en el hilo de la interfaz
+        self._programar.connect(self._iniciar_timer)
+
+    def configurar_ventana(self, milisegundos):
+        """Tiempo durante el cual se acumulan eventos antes de emitirlos (0 = siguiente vuelta del bucle)."""
+        self.ventana_ms = max(0, int(milisegundos))
+
+    def publicar(self, nombre_senal, evento):
+        with self._lock:
+            previo = self._pendientes.get(nombre_senal)
+            self._pendientes[nombre_senal] = evento if previo is None else previo.combinar(evento)
+        if QCoreApplication.instance() is None:
+            self._despachar()
+            return
+        self._programar.emit()
+
+    def publicar_venta(self, documento_id, nro_documento, tipo_doc, total_usd, productos_ids):
+        self.publicar('venta_realizada', VentaRegistrada.de_documento(documento_id, nro_documento, tipo_doc, total_usd, productos_ids))
+
+    def publicar_inventario(self, productos_ids=None):
+        self.publicar('inventario_actualizado', CambioInventario(productos_ids))
+
+    def publicar_configuracion(self, campos=None):
+        self.publicar('configuracion_actualizada', CambioConfiguracion(campos))
+
+    def suscribir(self, vista, nombre_senal, callback):
+        """
+        Conecta callback(evento) a la señal. Si la vista está oculta, los eventos
+        se combinan y se entregan una sola vez cuando vuelve a mostrarse.
+        """
+        entrega = _EntregaDiferida(vista, callback)
+        getattr(self, nombre_senal).connect(entrega.recibir)
+        return entrega
+
+    def _iniciar_timer(self):
+        if self._timer is None:
+            self._timer = QTimer(self)
+            self._timer.setSingleShot(True)
+            self._timer.timeout.connect(self._despachar)
+        if not self._timer.isActive():
+            self._timer.start(self.ventana_ms)
+
+    def _despachar(self):
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, {}
+        for nombre_senal, evento in pendientes.items():
+            getattr(self, nombre_senal).emit(evento)
+
+comunicacion = BusEventos()
@@ -0,0 +1,106 @@
+from PyQt6.QtWidgets import QWidget
+from PyQt6.QtCore import Qt, QRectF
+from PyQt6.QtGui import QPainter, QColor, QPen, QFont
+
+COLORES_DONA = ['#03DAC6', '#BB86FC', '#CF6679', '#018786', '#3700B3']
+
+class GraficoBarras(QWidget):
+    """
+    Gráfico de barras dibujado con QPainter: alternativa liviana a matplotlib
+    (no requiere la librería y cada actualización es un simple repintado).
+    """
+    def __init__(self, color='#6200EE', parent=None):
+        super().__init__(parent)
+        self.color = QColor(color)
+        self.etiquetas = []
+        self.valores = []
+        self.setMinimumHeight(180)
+
+    def actualizar(self, etiquetas, valores):
+        self.etiquetas = list(etiquetas)
+        self.valores = list(valores)
+        self.update()
+
+    def paintEvent(self, event):
+        p = QPainter(self)
+        p.setRenderHint(QPainter.RenderHint.Antialiasing)
+        p.fillRect(self.rect(), QColor('#1E1E1E'))
+        fuente = QFont(self.font())
+        fuente.setPixelSize(10)
+        p.setFont(fuente)
+
+        if not self.valores:
+            p.setPen(QColor('#555'))
+            p.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, "Sin datos recientes")
+            return
+
+        margen_x, alto_texto = 10, 18
+        area = QRectF(margen_x, alto_texto, self.width() - 2 * margen_x, self.height() - 2 * alto_texto)
+        p.setPen(QPen(QColor('#444'), 1))
+        p.drawLine(area.bottomLeft(), area.bottomRight())
+
+        tope = max(max(self.valores), 1) * 1.15
+        ancho_celda = area.width() / len(self.valores)
+        for i, (etiqueta, valor) in enumerate(zip(self.etiquetas, self.valores)):
+            x = area.left() + i * ancho_celda
+            alto = area.height() * valor / tope
+            barra = QRectF(x + ancho_celda * 0.2, area.bottom() - alto, ancho_celda * 0.6, alto)
+            p.fillRect(barra, self.color)
+
+            # Etiquetas encima de las barras y fecha debajo
+            if valor > 0:
+                p.setPen(QColor('white'))
+                p.drawText(QRectF(x, barra.top() - alto_texto, ancho_celda, alto_texto),
+                           Qt.AlignmentFlag.AlignHCenter | Qt.AlignmentFlag.AlignBottom, f"${int(valor)}")
+            p.setPen(QColor('#AAAAAA'))
+            p.drawText(QRectF(x, area.bottom(), ancho_celda, alto_texto), Qt.AlignmentFlag.AlignCenter, etiqueta)
+
+class GraficoDona(QWidget):
+    """Gráfico de dona dibujado con QPainter (porcentaje en cada porción y leyenda al centro)."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.etiquetas = []
+        self.valores = []
+        self.setMinimumHeight(180)
+
+    def actualizar(self, etiquetas, valores):
+        self.etiquetas = list(etiquetas)
+        self.valores = list(valores)
+        self.update()
+
+    def paintEvent(self, event):
+        p = QPainter(self)
+        p.setRenderHint(QPainter.RenderHint.Antialiasing)
+        p.fillRect(self.rect(), QColor('#1E1E1E'))
+        fuente = QFont(self.font())
+        fuente.setPixelSize(10)
+        p.setFont(fuente)
+
+        total = float(sum(self.valores))
+        if not total:
+            p.setPen(QColor('#555'))
+            p.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, "Sin ventas")
+            return
+
+        lado = min(self.width(), self.height()) - 20
+        grosor = lado * 0.15
+        # El trazo va centrado sobre el arco: se encoge el rectángulo medio grosor
+        aro = QRectF((self.width() - lado) / 2 + grosor / 2, (self.height() - lado) / 2 + grosor / 2,
+                     lado - grosor, lado - grosor)
+
+        # Ángulos de Qt: 0° a las 3, sentido antihorario, en 1/16 de grado. Se empieza arriba (90°).
+        angulo = 90.0
+        for i, valor in enumerate(self.valores):
+            barrido = 360.0 * valor / total
+            color = QColor(COLORES_DONA[i % len(COLORES_DONA)])
+            p.setPen(QPen(color, grosor, Qt.PenStyle.SolidLine, Qt.PenCapStyle.FlatCap))
+            p.drawArc(aro, int(angulo * 16), int(barrido * 16))
+            angulo += barrido
+
+        # Leyenda al centro
+        alto_linea = 14
+        y = aro.center().y() - alto_linea * len(self.etiquetas) / 2
+        for i, (etiqueta, valor) in enumerate(zip(self.etiquetas, self.valores)):
+            p.setPen(QColor(COLORES_DONA[i % len(COLORES_DONA)]))
+            p.drawText(QRectF(aro.left(), y + i * alto_linea, aro.width(), alto_linea),
+                       Qt.AlignmentFlag.AlignCenter, f"{etiqueta} {100.0 * valor / total:.1f}%")
@@ -0,0 +1,151 @@
+import math
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+
+COLOR_FONDO = '#1E1E1E'
+COLOR_TEXTO = '#AAAAAA'
+COLORES_DONA = ['#03DAC6', '#BB86FC', '#CF6679', '#018786', '#3700B3']
+
+def aplicar_estilo_oscuro(fig, ax):
+    """Aplica colores oscuros a los gráficos de Matplotlib"""
+    fig.patch.set_facecolor(COLOR_FONDO)
+    ax.set_facecolor(COLOR_FONDO)
+
+    # Colores de ejes y textos
+    ax.tick_params(axis='x', colors=COLOR_TEXTO)
+    ax.tick_params(axis='y', colors=COLOR_TEXTO)
+    ax.spines['bottom'].set_color('#444')
+    ax.spines['left'].set_color('#444')
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+
+class _CanvasIncremental(FigureCanvas):
+    """
+    Canvas que separa lo fijo (ejes, leyenda) de lo que cambia con los datos
+    (artistas `animated`). Tras un dibujo completo guarda el fondo; en cada
+    actualización solo repinta los artistas animados encima (blitting).
+    """
+    def __init__(self, figsize):
+        super().__init__(Figure(figsize=figsize))
+        self.animados = []
+        self._fondo = None
+        self.mpl_connect('draw_event', self._al_dibujar)
+
+    def _al_dibujar(self, event):
+        self._fondo = self.copy_from_bbox(self.figure.bbox)
+        for artista in self.animados:
+            self.figure.draw_artist(artista)
+
+    def repintar(self, completo=False):
+        if completo or self._fondo is None:
+            # Cambió algo fijo: dibujo completo cuando Qt esté libre (recaptura el fondo)
+            self.draw_idle()
+            return
+        self.restore_region(self._fondo)
+        for artista in self.animados:
+            self.figure.draw_artist(artista)
+        self.blit(self.figure.bbox)
+
+class GraficoBarrasMpl(_CanvasIncremental):
+    """Barras de ventas por día: las barras y sus etiquetas se crean una vez y se actualizan con set_height."""
+    def __init__(self, color='#6200EE'):
+        super().__init__((5, 3))
+        self.ax = self.figure.add_subplot()
+        aplicar_estilo_oscuro(self.figure, self.ax)
+        self.color = color
+        self.barras = []
+        self.textos = []
+        self.etiquetas = []
+        self.aviso = self.ax.text(0.5, 0.5, "Sin datos recientes", ha='center', va='center', color='#555',
+                                  transform=self.ax.transAxes, visible=False)
+
+    def _construir(self, cantidad):
+        for artista in self.barras + self.textos: artista.remove()
+        # Posiciones numéricas: las fechas del eje X cambian cada día sin acumular categorías
+        self.barras = list(self.ax.bar(range(cantidad), [0] * cantidad, color=self.color, width=0.6))
+        self.textos = [self.ax.text(0, 0, "", ha='center', va='bottom', color='white', fontsize=9) for _ in self.barras]
+        self.animados = self.barras + self.textos
+        for artista in self.animados: artista.set_animated(True)
+
+    def actualizar(self, etiquetas, valores):
+        completo = False
+        if not valores:
+            for artista in self.animados: artista.set_visible(False)
+            completo = not self.aviso.get_visible()
+            self.aviso.set_visible(True)
+            return self.repintar(completo)
+
+        if self.aviso.get_visible():
+            self.aviso.set_visible(False)
+            completo = True
+        if len(etiquetas) != len(self.barras):
+            self._construir(len(etiquetas))
+        if list(etiquetas) != self.etiquetas:
+            self.ax.set_xticks(range(len(etiquetas)), labels=etiquetas)
+            self.etiquetas = list(etiquetas)
+            completo = True
+
+        for barra, texto, valor in zip(self.barras, self.textos, valores):
+            barra.set_visible(True)
+            barra.set_height(valor)
+            # Etiquetas encima de las barras
+            texto.set_visible(valor > 0)
+            texto.set_text(f'${int(valor)}')
+            texto.set_position((barra.get_x() + barra.get_width() / 2., valor))
+
+        # El eje Y solo se reescala si el máximo se sale del rango o queda muy chico (evita redibujar todo)
+        tope = max(max(valores), 1) * 1.15
+        _, limite = self.ax.get_ylim()
+        if tope > limite or tope < limite * 0.5:
+            self.ax.set_ylim(0, tope)
+            completo = True
+        self.repintar(completo)
+
+class GraficoDonaMpl(_CanvasIncremental):
+    """Dona de métodos de pago: si las categorías no cambian, solo se mueven los ángulos de las porciones."""
+    INICIO = 90
+    DISTANCIA_PCT = 0.85
+
+    def __init__(self):
+        super().__init__((4, 3))
+        self.ax = self.figure.add_subplot()
+        self.figure.patch.set_facecolor(COLOR_FONDO) # Fondo figura
+        self.etiquetas = None
+        self.porciones = []
+        self.porcentajes = []
+
+    def _construir(self, etiquetas, valores):
+        self.ax.clear()
+        self.etiquetas = list(etiquetas)
+        if not valores:
+            self.porciones, self.porcentajes, self.animados = [], [], []
+            self.ax.text(0, 0, "Sin ventas", ha='center', va='center', color='#555')
+            return
+
+        # Dona: porciones con ancho en lugar de un círculo pintado encima
+        self.porciones, _, self.porcentajes = self.ax.pie(
+            valores, labels=None, autopct='%1.1f%%',
+            startangle=self.INICIO, colors=COLORES_DONA, pctdistance=self.DISTANCIA_PCT,
+            wedgeprops=dict(width=0.30),
+            textprops=dict(color="white", fontsize=9, weight="bold")
+        )
+        self.animados = list(self.porciones) + list(self.porcentajes)
+        for artista in self.animados: artista.set_animated(True)
+        self.ax.legend(self.porciones, etiquetas, loc="center", frameon=False, labelcolor="#CCC", fontsize=8)
+
+    def actualizar(self, etiquetas, valores):
+        if list(etiquetas) != self.etiquetas or not valores:
+            self._construir(etiquetas, valores)
+            return self.repintar(completo=True)
+
+        total = float(sum(valores)) or 1.0
+        angulo = self.INICIO
+        for porcion, texto, valor in zip(self.porciones, self.porcentajes, valores):
+            barrido = 360.0 * valor / total
+            porcion.set_theta1(angulo)
+            porcion.set_theta2(angulo + barrido)
+            medio = math.radians(angulo + barrido / 2)
+            texto.set_position((self.DISTANCIA_PCT * math.cos(medio), self.DISTANCIA_PCT * math.sin(medio)))
+            texto.set_text(f"{100.0 * valor / total:.1f}%")
+            angulo += barrido
+        self.repintar()
@@ -1,9 +1,10 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                             QLineEdit, QPushButton, QTableWidget, 
-                             QTableWidgetItem, QHeaderView, QMessageBox, QFrame)
+                             QLineEdit, QPushButton, QTableView, 
+                             QHeaderView, QMessageBox, QFrame)
 from PyQt6.QtCore import Qt
 from controllers.customer_controller import CustomerController
 from views.customer_dialog import CustomerDialog
+from views.table_models import Columna, ModeloPaginado, DelegadoBoton
 
 class CustomerView(QWidget):
     def __init__(self):
@@ -45,13 +46,26 @@ class CustomerView(QWidget):
         search_layout.addWidget(self.txt_buscar)
         layout.addWidget(search_frame)
 
-        # --- TABLA ---
-        self.tabla = QTableWidget()
-        self.tabla.setColumnCount(5)
-        self.tabla.setHorizontalHeaderLabels(["CÉDULA / RIF", "NOMBRE", "TELÉFONO", "DIRECCIÓN", "GESTIÓN"])
+        # --- TABLA (modelo paginado) ---
+        # Convertimos a string para evitar errores con None
+        texto = lambda campo: (lambda c: str(c[campo]) if c[campo] else "")
+        self.modelo = ModeloPaginado([
+            Columna("CÉDULA / RIF", texto('cedula_rif'), alineacion=Qt.AlignmentFlag.AlignCenter),
+            Columna("NOMBRE", texto('nombre')),
+            Columna("TELÉFONO", texto('telefono')),
+            Columna("DIRECCIÓN", texto('direccion')),
+            Columna("GESTIÓN", None),
+        ], self.cargar_pagina, parent=self)
+
+        self.tabla = QTableView()
+        self.tabla.setModel(self.modelo)
+        self.delegado_editar = DelegadoBoton("EDITAR", parent=self.tabla)
+        self.delegado_editar.pulsado.connect(self.abrir_dialogo_editar)
+        self.tabla.setItemDelegateForColumn(4, self.delegado_editar)
+        self.tabla.setMouseTracking(True)
         
-        self.tabla.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self.tabla.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.tabla.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        self.tabla.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
         self.tabla.verticalHeader().setVisible(False)
         self.tabla.setFocusPolicy(Qt.FocusPolicy.NoFocus)
 
@@ -62,11 +76,11 @@ class CustomerView(QWidget):
         self.tabla.setColumnWidth(4, 150)
 
         self.tabla.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #121212; color: white; gridline-color: #222;
                 border: none; outline: none;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #1E1E1E; color: #6200EE;
                 border-bottom: 2px solid #6200EE;
             }
@@ -79,57 +93,15 @@ class CustomerView(QWidget):
         layout.addWidget(self.tabla)
         self.cargar_datos()
 
-    def _crear_acciones(self, cliente):
-        container = QWidget()
-        layout = QHBoxLayout(container)
-        layout.setContentsMargins(5, 2, 5, 2)
-        layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-
-        btn_edit = QPushButton("EDITAR")
-        btn_edit.setCursor(Qt.CursorShape.PointingHandCursor)
-        btn_edit.setMinimumWidth(80) 
-        btn_edit.setStyleSheet("""
-            QPushButton {
-                color: #2196F3; background: transparent;
-                border: 1px solid #2196F3; border-radius: 4px;
-                font-size: 11px; font-weight: bold; padding: 5px;
-            }
-            QPushButton:hover { background: #2196F3; color: white; }
-        """)
-        btn_edit.clicked.connect(lambda: self.abrir_dialogo_editar(cliente))
-        
-        layout.addWidget(btn_edit)
-        return container
+    def cargar_pagina(self, desplazamiento, limite):
+        return CustomerController.obtener_pagina(self.txt_buscar.text(), limite, desplazamiento)
 
     def cargar_datos(self):
-        clientes = CustomerController.obtener_todos()
-        self.tabla.setRowCount(0)
-        for c in clientes:
-            row = self.tabla.rowCount()
-            self.tabla.insertRow(row)
-            
-            # Convertimos a string para evitar errores con None
-            rif = str(c['cedula_rif']) if c['cedula_rif'] else ""
-            nombre = str(c['nombre']) if c['nombre'] else ""
-            telf = str(c['telefono']) if c['telefono'] else ""
-            direc = str(c['direccion']) if c['direccion'] else ""
-
-            item_rif = QTableWidgetItem(rif)
-            item_rif.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            
-            self.tabla.setItem(row, 0, item_rif)
-            self.tabla.setItem(row, 1, QTableWidgetItem(nombre))
-            self.tabla.setItem(row, 2, QTableWidgetItem(telf))
-            self.tabla.setItem(row, 3, QTableWidgetItem(direc))
-            
-            self.tabla.setCellWidget(row, 4, self._crear_acciones(c))
+        self.modelo.recargar()
 
     def filtrar_tabla(self):
-        filtro = self.txt_buscar.text().lower()
-        for fila in range(self.tabla.rowCount()):
-            rif = self.tabla.item(fila, 0).text().lower()
-            nombre = self.tabla.item(fila, 1).text().lower()
-            self.tabla.setRowHidden(fila, not (filtro in rif or filtro in nombre))
+        # El filtro se aplica en la BD; la tabla vuelve a pedir la primera página
+        self.modelo.recargar()
 
     def abrir_dialogo_nuevo(self):
         # --- AQUÍ ESTABA EL ERROR ---
@@ -1,15 +1,9 @@
+import os
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QFrame, QGridLayout, QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView)
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QTimer
 from PyQt6.QtGui import QFont, QColor
-
-# Intentamos importar matplotlib, si falla mostramos aviso elegante
-try:
-    import matplotlib.pyplot as plt
-    from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-    MATPLOTLIB_AVAILABLE = True
-except ImportError:
-    MATPLOTLIB_AVAILABLE = False
+from views.startup_timing import RegistroArranque
 
 from controllers.stats_controller import StatsController
 from core.app_signals import comunicacion
@@ -20,8 +14,8 @@ class DashboardView(QWidget):
         self.init_ui()
         self.cargar_datos()
         
-        # Conectamos señal para actualización en tiempo real
-        comunicacion.venta_realizada.connect(self.cargar_datos)
+        # Actualización en tiempo real (si el dashboard está oculto, al volver a mostrarse)
+        comunicacion.suscribir(self, 'venta_realizada', self.al_registrar_venta)
 
     def init_ui(self):
         self.layout_principal = QVBoxLayout(self)
@@ -54,39 +48,14 @@ class DashboardView(QWidget):
         self.layout_graficos = QHBoxLayout()
         self.layout_graficos.setSpacing(15)
         
-        if MATPLOTLIB_AVAILABLE:
-            # Contenedor Gráfico Barras (Izquierda)
-            frame_barras = QFrame()
-            frame_barras.setStyleSheet("background-color: #1E1E1E; border-radius: 10px; border: 1px solid #333;")
-            lay_barras = QVBoxLayout(frame_barras)
-            
-            self.fig_barras, self.ax_barras = plt.subplots(figsize=(5, 3))
-            self.aplicar_estilo_oscuro(self.fig_barras, self.ax_barras)
-            
-            self.canvas_barras = FigureCanvas(self.fig_barras)
-            lay_barras.addWidget(QLabel("📅 Ventas Últimos 7 Días"))
-            lay_barras.addWidget(self.canvas_barras)
-            
-            # Contenedor Gráfico Torta (Derecha)
-            frame_pie = QFrame()
-            frame_pie.setStyleSheet("background-color: #1E1E1E; border-radius: 10px; border: 1px solid #333;")
-            lay_pie = QVBoxLayout(frame_pie)
-            
-            self.fig_pie, self.ax_pie = plt.subplots(figsize=(4, 3))
-            self.fig_pie.patch.set_facecolor('#1E1E1E') # Fondo figura
-            
-            self.canvas_pie = FigureCanvas(self.fig_pie)
-            lay_pie.addWidget(QLabel("💳 Métodos de Pago"))
-            lay_pie.addWidget(self.canvas_pie)
-            
-            # Añadir al layout (60% barras, 40% torta)
-            self.layout_graficos.addWidget(frame_barras, 6)
-            self.layout_graficos.addWidget(frame_pie, 4)
-        else:
-            lbl_error = QLabel("⚠️ Librería 'matplotlib' no instalada. Los gráficos no están disponibles.")
-            lbl_error.setStyleSheet("color: #CF6679; padding: 20px; background: #222; border-radius: 8px;")
-            lbl_error.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.layout_graficos.addWidget(lbl_error)
+        # matplotlib tarda en importarse: los gráficos se crean después del primer pintado
+        self.graficos_listos = False
+        self.graficos_pendientes = False
+        self.lbl_graficos = QLabel("Cargando gráficos...")
+        self.lbl_graficos.setStyleSheet("color: #555; padding: 20px; background: #1E1E1E; border-radius: 8px;")
+        self.lbl_graficos.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.layout_graficos.addWidget(self.lbl_graficos)
+        QTimer.singleShot(0, self.crear_graficos)
 
         self.layout_principal.addLayout(self.layout_graficos)
 
@@ -137,6 +106,48 @@ class DashboardView(QWidget):
         """)
         self.layout_principal.addWidget(self.tabla_top)
 
+    def crear_graficos(self):
+        # matplotlib con actualización incremental; si no está instalado (o se pide con
+        # PEGASUS_GRAFICOS=ligero) se usan los gráficos QPainter de views/charts.py
+        clases = None
+        if os.environ.get("PEGASUS_GRAFICOS", "matplotlib") != "ligero":
+            try:
+                with RegistroArranque.medir("módulo", "matplotlib (gráficos del dashboard)"):
+                    from views.charts_mpl import GraficoBarrasMpl, GraficoDonaMpl
+                clases = (GraficoBarrasMpl, GraficoDonaMpl)
+            except ImportError:
+                print("Aviso: matplotlib no está instalado. Usando gráficos livianos. (pip install matplotlib)")
+        if clases is None:
+            from views.charts import GraficoBarras as GraficoBarrasLigero, GraficoDona as GraficoDonaLigero
+            clases = (GraficoBarrasLigero, GraficoDonaLigero)
+        GraficoBarras, GraficoDona = clases
+
+        self.layout_graficos.removeWidget(self.lbl_graficos)
+        self.lbl_graficos.deleteLater()
+
+        # Contenedor Gráfico Barras (Izquierda)
+        frame_barras = QFrame()
+        frame_barras.setStyleSheet("background-color: #1E1E1E; border-radius: 10px; border: 1px solid #333;")
+        lay_barras = QVBoxLayout(frame_barras)
+        self.grafico_barras = GraficoBarras()
+        lay_barras.addWidget(QLabel("📅 Ventas Últimos 7 Días"))
+        lay_barras.addWidget(self.grafico_barras)
+
+        # Contenedor Gráfico Torta (Derecha)
+        frame_pie = QFrame()
+        frame_pie.setStyleSheet("background-color: #1E1E1E; border-radius: 10px; border: 1px solid #333;")
+        lay_pie = QVBoxLayout(frame_pie)
+        self.grafico_pie = GraficoDona()
+        lay_pie.addWidget(QLabel("💳 Métodos de Pago"))
+        lay_pie.addWidget(self.grafico_pie)
+
+        # Añadir al layout (60% barras, 40% torta)
+        self.layout_graficos.addWidget(frame_barras, 6)
+        self.layout_graficos.addWidget(frame_pie, 4)
+
+        self.graficos_listos = True
+        self.actualizar_graficos()
+
     def crear_card(self, titulo, valor, icono, color_borde):
         frame = QFrame()
         frame.setStyleSheet(f"""
@@ -167,21 +178,8 @@ class DashboardView(QWidget):
         
         return frame
 
-    def aplicar_estilo_oscuro(self, fig, ax):
-        """Aplica colores oscuros a los gráficos de Matplotlib"""
-        color_bg = '#1E1E1E'
-        color_text = '#AAAAAA'
-        
-        fig.patch.set_facecolor(color_bg)
-        ax.set_facecolor(color_bg)
-        
-        # Colores de ejes y textos
-        ax.tick_params(axis='x', colors=color_text)
-        ax.tick_params(axis='y', colors=color_text)
-        ax.spines['bottom'].set_color('#444')
-        ax.spines['left'].set_color('#444')
-        ax.spines['top'].set_visible(False)
-        ax.spines['right'].set_visible(False)
+    def al_registrar_venta(self, evento):
+        self.cargar_datos()
 
     def cargar_datos(self):
         # 1. Cargar KPIs
@@ -192,9 +190,7 @@ class DashboardView(QWidget):
             self.card_trans.findChild(QLabel, "valor").setText(str(kpis['transacciones']))
             self.card_stock.findChild(QLabel, "valor").setText(f"{kpis['stock_bajo']}")
 
-        if MATPLOTLIB_AVAILABLE:
-            self.actualizar_grafico_barras()
-            self.actualizar_grafico_pie()
+        self.actualizar_graficos()
 
         # 4. Cargar Tabla Top
         top_prods = StatsController.obtener_top_productos()
@@ -220,42 +216,17 @@ class DashboardView(QWidget):
             item_cant.setFont(QFont("Arial", 10, QFont.Weight.Bold))
             self.tabla_top.setItem(row, 2, item_cant)
 
-    def actualizar_grafico_barras(self):
-        fechas, montos = StatsController.obtener_ventas_semana()
-        self.ax_barras.clear()
-        
-        if fechas:
-            barras = self.ax_barras.bar(fechas, montos, color='#6200EE', width=0.6)
-            
-            # Etiquetas encima de las barras
-            for bar in barras:
-                height = bar.get_height()
-                if height > 0:
-                    self.ax_barras.text(bar.get_x() + bar.get_width()/2., height,
-                            f'${int(height)}', ha='center', va='bottom', color='white', fontsize=9)
-        else:
-            self.ax_barras.text(0.5, 0.5, "Sin datos recientes", ha='center', va='center', color='#555')
-
-        self.canvas_barras.draw()
-
-    def actualizar_grafico_pie(self):
-        labels, values = StatsController.obtener_metodos_pago()
-        self.ax_pie.clear()
-        
-        if values:
-            colors = ['#03DAC6', '#BB86FC', '#CF6679', '#018786', '#3700B3']
-            wedges, texts, autotexts = self.ax_pie.pie(
-                values, labels=None, autopct='%1.1f%%',
-                startangle=90, colors=colors, pctdistance=0.85,
-                textprops=dict(color="white", fontsize=9, weight="bold")
-            )
-            
-            # Dona (Agujero en el centro)
-            centre_circle = plt.Circle((0,0),0.70,fc='#1E1E1E')
-            self.fig_pie.gca().add_artist(centre_circle)
-            
-            self.ax_pie.legend(wedges, labels, loc="center", frameon=False, labelcolor="#CCC", fontsize=8)
-        else:
-            self.ax_pie.text(0, 0, "Sin ventas", ha='center', va='center', color='#555')
-
-        self.canvas_pie.draw()
\ No newline at end of file
+    def actualizar_graficos(self):
+        # Con el dashboard oculto no se consulta ni se dibuja: se hace al volver a mostrarlo
+        if not self.graficos_listos: return
+        if not self.isVisible():
+            self.graficos_pendientes = True
+            return
+        self.graficos_pendientes = False
+        self.grafico_barras.actualizar(*StatsController.obtener_ventas_semana())
+        self.grafico_pie.actualizar(*StatsController.obtener_metodos_pago())
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.graficos_pendientes:
+            QTimer.singleShot(0, self.actualizar_graficos)
@@ -1,19 +1,21 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QLineEdit, QTableWidget, QTableWidgetItem, 
                              QPushButton, QFrame, QHeaderView, QMessageBox, 
-                             QCompleter, QInputDialog, QAbstractItemView, QApplication,
+                             QCompleter, QInputDialog, QAbstractItemView,
                              QGridLayout)
 from PyQt6.QtCore import Qt
-from controllers.inventory_controller import InventoryController
+from controllers.catalog_controller import CatalogController
 from controllers.sales_controller import SalesController
 from controllers.master_data_controller import MasterDataController
 from controllers.config_controller import ConfigController
 from controllers.printer_controller import PrinterController
+from controllers.job_controller import JobController
 from controllers.customer_controller import CustomerController
 from controllers.cash_controller import CashController
 from views.customer_dialog import CustomerDialog
 from views.invoice_viewer_dialog import InvoiceViewerDialog
 from views.payment_dialog import PaymentDialog
+from core.app_signals import comunicacion
 
 class DeliveryNoteView(QWidget):
     def __init__(self):
@@ -29,6 +31,8 @@ class DeliveryNoteView(QWidget):
         self.configurar_buscador()
         self.actualizar_tasas()
 
+        comunicacion.suscribir(self, 'configuracion_actualizada', self.al_cambiar_configuracion)
+
     def init_ui(self):
         layout = QVBoxLayout(self)
         layout.setContentsMargins(20, 20, 20, 20)
@@ -125,8 +129,13 @@ class DeliveryNoteView(QWidget):
             self.lbl_total_bs.setText(f"Bs: 0.00 (Tasa: {self.tasa_bcv})")
             self.lbl_total_cop.setText(f"COP: 0 (Tasa: {self.tasa_cop:,.0f})")
 
+    def al_cambiar_configuracion(self, evento=None):
+        if evento and not evento.incluye('tasa_bcv', 'tasa_cop'): return
+        self.actualizar_tasas()
+        self.actualizar_tabla()
+
     def configurar_buscador(self):
-        self.prods_cache = InventoryController.obtener_todos()
+        self.prods_cache = CatalogController.obtener_todos()
         nombres = [f"{p['codigo']} | {p['descripcion']}" for p in self.prods_cache]
         completer = QCompleter(nombres, self)
         completer.setFilterMode(Qt.MatchFlag.MatchContains)
@@ -181,7 +190,7 @@ class DeliveryNoteView(QWidget):
 
     def agregar_producto(self, texto):
         codigo = texto.split(" | ")[0]
-        prod = next((p for p in self.prods_cache if p['codigo'] == codigo), None)
+        prod = CatalogController.por_codigo(codigo)
         if prod:
             cant, ok = QInputDialog.getDouble(self, "Cantidad", f"Stock actual: {prod['stock_actual']}\nCantidad a despachar:", 1.0, 0.01, float(prod['stock_actual']), 2)
             if ok:
@@ -280,20 +289,8 @@ class DeliveryNoteView(QWidget):
             )
             
             if exito:
-                QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
-                try:
-                    ruta_pdf = PrinterController.ver_factura(nro_doc)
-                    if ruta_pdf:
-                        visor = InvoiceViewerDialog(ruta_pdf, parent=self.window())
-                        visor.setWindowTitle(f"Nota de Entrega: {nro_doc}")
-                        visor.setWindowModality(Qt.WindowModality.ApplicationModal)
-                        QApplication.restoreOverrideCursor()
-                        visor.exec()
-                    else:
-                        QApplication.restoreOverrideCursor()
-                except Exception as e:
-                    QApplication.restoreOverrideCursor()
-                    print(f"Error abriendo PDF de Nota: {e}")
+                JobController.enviar(f"Nota de Entrega {nro_doc}", PrinterController.ver_factura, nro_doc,
+                                     al_terminar=lambda ruta_pdf, nro=nro_doc: self.mostrar_nota(ruta_pdf, nro))
 
                 self.carrito = []
                 self.actualizar_tabla()
@@ -301,4 +298,11 @@ class DeliveryNoteView(QWidget):
                 self.lbl_nombre_cliente.setText("CONSUMIDOR FINAL")
                 self.id_cliente_actual = None
             else:
-                QMessageBox.critical(self, "Error", nro_doc)
\ No newline at end of file
+                QMessageBox.critical(self, "Error", nro_doc)
+
+    def mostrar_nota(self, ruta_pdf, nro_doc):
+        if not ruta_pdf: return print(f"Error abriendo PDF de Nota: {nro_doc}")
+        visor = InvoiceViewerDialog(ruta_pdf, parent=self.window())
+        visor.setWindowTitle(f"Nota de Entrega: {nro_doc}")
+        visor.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        visor.show()
\ No newline at end of file
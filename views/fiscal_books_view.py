@@ -1,10 +1,11 @@
 import os
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QPushButton, QFrame, QComboBox, QSpinBox, 
-                             QFileDialog, QMessageBox, QGridLayout, QApplication)
+                             QFileDialog, QMessageBox, QGridLayout)
 from PyQt6.QtCore import Qt
 from datetime import datetime
 from controllers.fiscal_books_controller import FiscalBooksController
+from controllers.job_controller import JobController
 from views.invoice_viewer_dialog import InvoiceViewerDialog
 
 class FiscalBooksView(QWidget):
@@ -118,11 +119,18 @@ class FiscalBooksView(QWidget):
         )
         
         if ruta_archivo:
-            exito, msg = FiscalBooksController.generar_excel_libro_ventas(mes, anio, ruta_archivo)
-            if exito:
-                QMessageBox.information(self, "Éxito", msg)
-            else:
-                QMessageBox.critical(self, "Error", msg)
+            # Puede tardar minutos con muchas facturas: va a la cola de segundo plano
+            JobController.enviar(f"Libro de Ventas Excel {mes:02d}/{anio}",
+                                 FiscalBooksController.generar_excel_libro_ventas, mes, anio, ruta_archivo,
+                                 reporta_avance=True, al_terminar=self.excel_terminado)
+            QMessageBox.information(self, "En proceso", "El libro se está generando en segundo plano.\nPuede seguir trabajando; se le avisará al terminar.")
+
+    def excel_terminado(self, resultado):
+        exito, msg = resultado
+        if exito:
+            QMessageBox.information(self, "Éxito", msg)
+        else:
+            QMessageBox.critical(self, "Error", msg)
 
     def exportar_ventas_pdf(self):
         mes = self.cmb_mes.currentIndex() + 1
@@ -131,15 +139,19 @@ class FiscalBooksView(QWidget):
         os.makedirs('temp', exist_ok=True)
         ruta_pdf = os.path.abspath(f"temp/libro_ventas_{mes:02d}_{anio}.pdf")
         
-        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
-        exito, msg = FiscalBooksController.generar_pdf_libro_ventas(mes, anio, ruta_pdf)
-        QApplication.restoreOverrideCursor()
-        
+        titulo = f"Libro de Ventas Fiscal - {self.cmb_mes.currentText()} {anio}"
+        JobController.enviar(titulo, FiscalBooksController.generar_pdf_libro_ventas, mes, anio, ruta_pdf,
+                             reporta_avance=True,
+                             al_terminar=lambda resultado: self.pdf_terminado(resultado, ruta_pdf, titulo))
+
+    def pdf_terminado(self, resultado, ruta_pdf, titulo):
+        exito, msg = resultado
         if exito:
             # Reutilizamos tu visor oscuro para mantener la inmersión del usuario
             visor = InvoiceViewerDialog(ruta_pdf, parent=self.window())
-            visor.setWindowTitle(f"Libro de Ventas Fiscal - {self.cmb_mes.currentText()} {anio}")
+            visor.setWindowTitle(titulo)
             visor.setWindowModality(Qt.WindowModality.ApplicationModal)
-            visor.exec()
+            visor.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+            visor.show()
         else:
             QMessageBox.critical(self, "Error", msg)
\ No newline at end of file
@@ -1,8 +1,10 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                             QLineEdit, QPushButton, QTableWidget, 
-                             QTableWidgetItem, QHeaderView, QMessageBox, QFrame)
+                             QLineEdit, QPushButton, QTableView, 
+                             QHeaderView, QMessageBox, QFrame)
 from PyQt6.QtCore import Qt
 from views.inventory_dialog import InventoryDialog
+from views.valuation_dialog import ValuationDialog
+from views.table_models import Columna, ModeloPaginado, DelegadoBoton
 from controllers.inventory_controller import InventoryController
 
 class InventoryView(QWidget):
@@ -26,9 +28,21 @@ class InventoryView(QWidget):
             QPushButton:hover { background-color: #7722FF; }
         """)
         self.btn_nuevo.clicked.connect(self.abrir_dialogo_nuevo)
+
+        self.btn_valorizacion = QPushButton("📊 VALORIZACIÓN")
+        self.btn_valorizacion.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.btn_valorizacion.setStyleSheet("""
+            QPushButton {
+                background-color: #1E1E1E; color: #03DAC6; border: 1px solid #333333;
+                border-radius: 5px; padding: 10px 20px; font-weight: bold;
+            }
+            QPushButton:hover { border: 1px solid #03DAC6; }
+        """)
+        self.btn_valorizacion.clicked.connect(self.abrir_valorizacion)
         
         header.addWidget(self.lbl_titulo)
         header.addStretch()
+        header.addWidget(self.btn_valorizacion)
         header.addWidget(self.btn_nuevo)
         layout.addLayout(header)
 
@@ -45,17 +59,34 @@ class InventoryView(QWidget):
         search_layout.addWidget(self.txt_buscar)
         layout.addWidget(search_frame)
 
-        # --- TABLA DE INVENTARIO ---
-        self.tabla = QTableWidget()
-        # Aumentamos columnas para incluir Bs y COP
-        self.tabla.setColumnCount(10) 
-        self.tabla.setHorizontalHeaderLabels([
-            "CÓDIGO", "DESCRIPCIÓN", "USD ($)", "BS (VES)", "COP ($)", "STOCK", 
-            "MIN", "CATEGORÍA", "PROVEEDOR", "ACCIONES"
-        ])
+        # --- TABLA DE INVENTARIO (modelo paginado) ---
+        stock_bajo = lambda p: p['stock_actual'] <= p['stock_minimo']
+        self.modelo = ModeloPaginado([
+            Columna("CÓDIGO", lambda p: str(p['codigo'])),
+            Columna("DESCRIPCIÓN", lambda p: p['descripcion']),
+            # Precios Multimoneda
+            Columna("USD ($)", lambda p: f"{p['precio_usd']:.2f}"),
+            Columna("BS (VES)", lambda p: f"{p['precio_bs']:.2f}"),
+            Columna("COP ($)", lambda p: f"{p['precio_cop']:,.0f}".replace(',', '.')), # Formato COP con miles
+            # Stock con alerta visual
+            Columna("STOCK", lambda p: str(p['stock_actual']),
+                    color=lambda p: Qt.GlobalColor.red if stock_bajo(p) else None,
+                    ayuda=lambda p: "Stock Bajo!" if stock_bajo(p) else None),
+            Columna("MIN", lambda p: str(p['stock_minimo'])),
+            Columna("CATEGORÍA", lambda p: str(p.get('categoria') or "Sin Categoría")),
+            Columna("PROVEEDOR", lambda p: str(p.get('proveedor') or "Sin Proveedor")),
+            Columna("ACCIONES", None),
+        ], self.cargar_pagina, parent=self)
+
+        self.tabla = QTableView()
+        self.tabla.setModel(self.modelo)
+        self.delegado_editar = DelegadoBoton("EDITAR", parent=self.tabla)
+        self.delegado_editar.pulsado.connect(self.abrir_dialogo_editar)
+        self.tabla.setItemDelegateForColumn(9, self.delegado_editar)
+        self.tabla.setMouseTracking(True)
         
-        self.tabla.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self.tabla.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.tabla.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        self.tabla.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
         self.tabla.verticalHeader().setVisible(False)
         self.tabla.setFocusPolicy(Qt.FocusPolicy.NoFocus)
 
@@ -65,11 +96,11 @@ class InventoryView(QWidget):
         self.tabla.setColumnWidth(9, 100)
 
         self.tabla.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #121212; color: white;
                 gridline-color: #222; border: none; outline: none;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #1E1E1E; color: #6200EE;
                 border-bottom: 2px solid #6200EE;
             }
@@ -82,66 +113,18 @@ class InventoryView(QWidget):
         layout.addWidget(self.tabla)
         self.cargar_datos()
 
-    def _crear_acciones(self, producto):
-        container = QWidget()
-        layout = QHBoxLayout(container)
-        layout.setContentsMargins(5, 2, 5, 2)
-        layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-
-        btn_edit = QPushButton("EDITAR")
-        btn_edit.setCursor(Qt.CursorShape.PointingHandCursor)
-        btn_edit.setMinimumWidth(80) 
-        btn_edit.setStyleSheet("""
-            QPushButton {
-                color: #2196F3; background: transparent;
-                border: 1px solid #2196F3; border-radius: 4px;
-                font-size: 11px; font-weight: bold; padding: 5px;
-            }
-            QPushButton:hover { background: #2196F3; color: white; }
-        """)
-        btn_edit.clicked.connect(lambda: self.abrir_dialogo_editar(producto))
-        
-        layout.addWidget(btn_edit)
-        return container
+    def cargar_pagina(self, desplazamiento, limite):
+        return InventoryController.obtener_pagina(self.txt_buscar.text(), limite, desplazamiento)
 
     def cargar_datos(self):
-        productos = InventoryController.obtener_todos()
-        self.tabla.setRowCount(0)
-        for p in productos:
-            row = self.tabla.rowCount()
-            self.tabla.insertRow(row)
-            
-            self.tabla.setItem(row, 0, QTableWidgetItem(str(p['codigo'])))
-            self.tabla.setItem(row, 1, QTableWidgetItem(p['descripcion']))
-            
-            # Precios Multimoneda
-            self.tabla.setItem(row, 2, QTableWidgetItem(f"{p['precio_usd']:.2f}"))
-            self.tabla.setItem(row, 3, QTableWidgetItem(f"{p['precio_bs']:.2f}"))
-            self.tabla.setItem(row, 4, QTableWidgetItem(f"{p['precio_cop']:,.0f}".replace(',', '.'))) # Formato COP con miles
-            
-            # Stock con alerta visual
-            item_stock = QTableWidgetItem(str(p['stock_actual']))
-            if p['stock_actual'] <= p['stock_minimo']:
-                item_stock.setForeground(Qt.GlobalColor.red)
-                item_stock.setToolTip("Stock Bajo!")
-            self.tabla.setItem(row, 5, item_stock)
-            
-            self.tabla.setItem(row, 6, QTableWidgetItem(str(p['stock_minimo'])))
-            
-            cat = p.get('categoria') or "Sin Categoría"
-            prov = p.get('proveedor') or "Sin Proveedor"
-            
-            self.tabla.setItem(row, 7, QTableWidgetItem(str(cat)))
-            self.tabla.setItem(row, 8, QTableWidgetItem(str(prov)))
-            
-            self.tabla.setCellWidget(row, 9, self._crear_acciones(p))
+        self.modelo.recargar()
 
     def filtrar_tabla(self):
-        filtro = self.txt_buscar.text().lower()
-        for fila in range(self.tabla.rowCount()):
-            codigo = self.tabla.item(fila, 0).text().lower()
-            desc = self.tabla.item(fila, 1).text().lower()
-            self.tabla.setRowHidden(fila, not (filtro in codigo or filtro in desc))
+        # El filtro se aplica en la BD; la tabla vuelve a pedir la primera página
+        self.modelo.recargar()
+
+    def abrir_valorizacion(self):
+        ValuationDialog(self).exec()
 
     def abrir_dialogo_nuevo(self):
         dialogo = InventoryDialog(self)
@@ -1,8 +1,8 @@
 import os
 from PyQt6.QtWidgets import QDialog, QVBoxLayout
-# ASEGÚRATE DE QUE QWebEngineView ESTÉ IMPORTADO
-from PyQt6.QtWebEngineWidgets import QWebEngineView 
 from PyQt6.QtCore import QUrl
+# QWebEngineView (Chromium) se importa al abrir el primer visor: cargarlo al
+# arrancar cuesta cientos de ms. Requiere configurar_antes_de_qapplication() (ui_utils).
 
 class InvoiceViewerDialog(QDialog):
     def __init__(self, pdf_path, parent=None):
@@ -13,6 +13,7 @@ class InvoiceViewerDialog(QDialog):
         
         layout = QVBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0) 
+        from PyQt6.QtWebEngineWidgets import QWebEngineView
         self.visor = QWebEngineView()
         
         # Habilitar plugins para el visor PDF nativo de Chromium
@@ -0,0 +1,134 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+                             QPushButton, QHeaderView, QAbstractItemView, QLabel, QProgressBar)
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import QColor
+from controllers.job_controller import JobController, GestorTrabajos
+
+COLORES_ESTADO = {
+    GestorTrabajos.EN_COLA: "#B3B3B3",
+    GestorTrabajos.EJECUTANDO: "#03DAC6",
+    GestorTrabajos.TERMINADO: "#4CAF50",
+    GestorTrabajos.ERROR: "#CF6679",
+    GestorTrabajos.CANCELADO: "#888888",
+}
+
+class JobsDialog(QDialog):
+    """Cola de documentos que se generan en segundo plano (tickets, notas, libros fiscales)."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.gestor = JobController.gestor()
+        self._ids = None   # ids de la lista ya dibujada
+        self._filas = {}   # id -> {fila, estado, barra, boton}
+
+        self.setWindowTitle("Tareas en Segundo Plano")
+        self.setFixedWidth(700)
+        self.setFixedHeight(400)
+        self.setStyleSheet("background-color: #1E1E1E; color: white;")
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+
+        self.init_ui()
+        self.cargar_datos()
+        self.gestor.trabajos_cambiados.connect(self.cargar_datos)
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+
+        lbl_titulo = QLabel("Documentos en generación:")
+        lbl_titulo.setStyleSheet("font-size: 14px; font-weight: bold; color: #03DAC6; margin-bottom: 10px;")
+        layout.addWidget(lbl_titulo)
+
+        self.tabla = QTableWidget(0, 5)
+        self.tabla.setHorizontalHeaderLabels(["Hora", "Documento", "Estado", "Progreso", ""])
+        self.tabla.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        self.tabla.verticalHeader().setVisible(False)
+        self.tabla.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.tabla.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.tabla.setStyleSheet("""
+            QTableWidget {
+                background-color: #121212; border: 1px solid #333; gridline-color: #333;
+            }
+            QTableWidget::item:selected { background-color: #333; }
+            QHeaderView::section { background-color: #2D2D2D; padding: 4px; border: 1px solid #333; }
+        """)
+        layout.addWidget(self.tabla)
+
+        botones = QHBoxLayout()
+        btn_limpiar = QPushButton("LIMPIAR FINALIZADOS")
+        btn_limpiar.setCursor(Qt.CursorShape.PointingHandCursor)
+        btn_limpiar.setFixedHeight(40)
+        btn_limpiar.setStyleSheet("""
+            QPushButton { background-color: #333; color: white; font-weight: bold; border-radius: 5px; }
+            QPushButton:hover { background-color: #444; }
+        """)
+        btn_limpiar.clicked.connect(self.gestor.limpiar_finalizados)
+
+        btn_cerrar = QPushButton("CERRAR")
+        btn_cerrar.setCursor(Qt.CursorShape.PointingHandCursor)
+        btn_cerrar.setFixedHeight(40)
+        btn_cerrar.setStyleSheet("""
+            QPushButton { background-color: #6200EE; color: white; font-weight: bold; border-radius: 5px; }
+            QPushButton:hover { background-color: #7722FF; }
+        """)
+        btn_cerrar.clicked.connect(self.accept)
+
+        botones.addWidget(btn_limpiar)
+        botones.addStretch()
+        botones.addWidget(btn_cerrar)
+        layout.addLayout(botones)
+
+    def cargar_datos(self):
+        """
+        trabajos_cambiados llega en cada avance: los widgets de cada fila se crean una
+        sola vez por trabajo y después solo se actualizan sus valores. La tabla se
+        reconstruye únicamente cuando cambia la lista de trabajos (nuevo o limpiado).
+        """
+        trabajos = self.gestor.listar()
+        ids = [t['id'] for t in trabajos]
+        if ids != self._ids:
+            self._ids = ids
+            self._filas = {}
+            self.tabla.setRowCount(0)
+            self.tabla.setRowCount(len(trabajos))
+            for row, t in enumerate(trabajos):
+                self.crear_fila(row, t)
+        for t in trabajos:
+            self.actualizar_fila(t)
+
+    def crear_fila(self, row, t):
+        self.tabla.setItem(row, 0, QTableWidgetItem(t['creado'].strftime("%H:%M:%S")))
+        self.tabla.setItem(row, 1, QTableWidgetItem(t['titulo']))
+        self.tabla.setItem(row, 2, QTableWidgetItem())
+
+        barra = QProgressBar()
+        barra.setRange(0, 100)
+        self.tabla.setCellWidget(row, 3, barra)
+
+        btn_cancelar = QPushButton("CANCELAR")
+        btn_cancelar.setCursor(Qt.CursorShape.PointingHandCursor)
+        btn_cancelar.setStyleSheet("""
+            QPushButton { color: #CF6679; background: transparent; border: 1px solid #CF6679; border-radius: 4px; font-size: 11px; font-weight: bold; padding: 4px; }
+            QPushButton:hover { background: #CF6679; color: white; }
+            QPushButton:disabled { color: #555; border-color: #555; }
+        """)
+        btn_cancelar.clicked.connect(lambda _, i=t['id']: JobController.cancelar(i))
+        self.tabla.setCellWidget(row, 4, btn_cancelar)
+
+        self._filas[t['id']] = {'fila': row, 'estado': None, 'barra': barra, 'boton': btn_cancelar}
+
+    def actualizar_fila(self, t):
+        fila = self._filas[t['id']]
+        barra = fila['barra']
+        barra.setValue(t['progreso'])
+        barra.setFormat(t['mensaje'] or "%p%")
+
+        item_estado = self.tabla.item(fila['fila'], 2)
+        item_estado.setToolTip(t['mensaje'])
+        if fila['estado'] == t['estado']: return
+
+        # Color y botón solo cambian con el estado, no con cada avance
+        fila['estado'] = t['estado']
+        color = COLORES_ESTADO[t['estado']]
+        item_estado.setText(t['estado'])
+        item_estado.setForeground(QColor(color))
+        barra.setStyleSheet(f"QProgressBar {{ border: 1px solid #333; border-radius: 3px; text-align: center; }} QProgressBar::chunk {{ background-color: {color}; }}")
+        fila['boton'].setEnabled(t['estado'] in (GestorTrabajos.EN_COLA, GestorTrabajos.EJECUTANDO))
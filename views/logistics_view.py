@@ -1,12 +1,14 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QTabWidget, QFormLayout, 
-                             QLineEdit, QPushButton, QTableWidget, QTableWidgetItem, 
+                             QLineEdit, QPushButton, QTableWidget, QTableWidgetItem, QTableView, 
                              QHeaderView, QHBoxLayout, QLabel, QComboBox, QMessageBox, 
-                             QFrame, QAbstractItemView)
+                             QFrame, QAbstractItemView, QCheckBox)
 from PyQt6.QtCore import Qt, QSize
 import qtawesome as qta
+from views.table_models import Columna, ModeloPaginado
 
 from controllers.logistics_controller import LogisticsController
 from controllers.master_data_controller import MasterDataController
+from controllers.stock_count_controller import StockCountController
 from views.purchases_view import PurchasesView # <--- Módulo de Compras
 
 class LogisticsView(QWidget):
@@ -58,16 +60,19 @@ class LogisticsView(QWidget):
         # Inicializamos Pestañas
         self.tab_compras = PurchasesView() # 1. Compras
         self.tab_ajustes = QWidget()       # 2. Ajustes
+        self.tab_conteo = QWidget()        # 2b. Toma de inventario
         self.tab_categorias = QWidget()    # 3. Categorías
         self.tab_proveedores = QWidget()   # 4. Proveedores
 
         self.init_tab_ajustes()
+        self.init_tab_conteo()
         self.init_tab_categorias()
         self.init_tab_proveedores()
 
         # Añadimos al QTabWidget con Iconos Pro
         self.tabs.addTab(self.tab_compras, qta.icon('fa5s.file-invoice-dollar', color='#888'), " Registro de Compras")
         self.tabs.addTab(self.tab_ajustes, qta.icon('fa5s.exchange-alt', color='#888'), " Ajustes de Stock")
+        self.tabs.addTab(self.tab_conteo, qta.icon('fa5s.clipboard-check', color='#888'), " Toma de Inventario")
         self.tabs.addTab(self.tab_categorias, qta.icon('fa5s.tags', color='#888'), " Categorías")
         self.tabs.addTab(self.tab_proveedores, qta.icon('fa5s.truck', color='#888'), " Proveedores")
 
@@ -90,15 +95,15 @@ class LogisticsView(QWidget):
                 border: none;
                 width: 20px;
             }
-            QTableWidget {
+            QTableView {
                 background-color: #121212;
                 color: white;
                 gridline-color: #222;
                 border: none;
                 outline: none;
             }
-            QTableWidget:focus { outline: none; }
-            QTableWidget::item:selected {
+            QTableView:focus { outline: none; }
+            QTableView::item:selected {
                 background-color: #1E1E1E;
                 color: #03DAC6;
                 border-bottom: 1px solid #03DAC6;
@@ -137,9 +142,16 @@ class LogisticsView(QWidget):
         filtros_layout.addWidget(self.cmb_filtro_prov, 1)
         layout.addWidget(filtros_frame)
 
-        # Tabla
-        self.tabla_prod = QTableWidget(0, 5)
-        self.tabla_prod.setHorizontalHeaderLabels(["CÓDIGO", "DESCRIPCIÓN", "STOCK", "CATEGORÍA", "PROVEEDOR"])
+        # Tabla (modelo paginado, filtrado en la BD)
+        self.modelo_prod = ModeloPaginado([
+            Columna("CÓDIGO", lambda p: str(p[1])),
+            Columna("DESCRIPCIÓN", lambda p: str(p[2])),
+            Columna("STOCK", lambda p: str(p[3]), alineacion=Qt.AlignmentFlag.AlignCenter),
+            Columna("CATEGORÍA", lambda p: str(p[4] or "S/C")),
+            Columna("PROVEEDOR", lambda p: str(p[5] or "S/P")),
+        ], self.cargar_pagina_productos, parent=self)
+        self.tabla_prod = QTableView()
+        self.tabla_prod.setModel(self.modelo_prod)
         self.tabla_prod.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
         self.tabla_prod.verticalHeader().setVisible(False)
         self.tabla_prod.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
@@ -189,6 +201,131 @@ class LogisticsView(QWidget):
         self.refrescar_combos()
         self.actualizar_tabla()
 
+    def init_tab_conteo(self):
+        """Conteo físico: se escanea todo y los ajustes se aplican de una sola vez."""
+        self.conteo_id = None
+        layout = QVBoxLayout(self.tab_conteo)
+        layout.setContentsMargins(20, 20, 20, 20)
+        layout.setSpacing(15)
+
+        estilo_boton = """
+            QPushButton {{
+                background-color: {0}; color: white; font-weight: bold;
+                padding: 10px 20px; border-radius: 5px; border: none; outline: none;
+            }}
+        """
+        barra = QHBoxLayout()
+        self.lbl_conteo = QLabel("Sin toma de inventario abierta")
+        self.lbl_conteo.setStyleSheet("color: #DDD; font-weight: bold;")
+        self.btn_nueva_toma = QPushButton("NUEVA TOMA")
+        self.btn_nueva_toma.setStyleSheet(estilo_boton.format("#6200EE"))
+        self.btn_nueva_toma.clicked.connect(self.nueva_toma)
+        self.chk_toma_total = QCheckBox("Llevar a cero lo no contado")
+        self.chk_toma_total.setStyleSheet("color: #B3B3B3;")
+        self.btn_aplicar_toma = QPushButton("APLICAR AJUSTES")
+        self.btn_aplicar_toma.setStyleSheet(estilo_boton.format("#03A66A"))
+        self.btn_aplicar_toma.clicked.connect(self.aplicar_toma)
+        self.btn_anular_toma = QPushButton("ANULAR")
+        self.btn_anular_toma.setStyleSheet(estilo_boton.format("#B00020"))
+        self.btn_anular_toma.clicked.connect(self.anular_toma)
+        for btn in (self.btn_nueva_toma, self.btn_aplicar_toma, self.btn_anular_toma):
+            btn.setCursor(Qt.CursorShape.PointingHandCursor)
+
+        barra.addWidget(self.lbl_conteo, 1)
+        barra.addWidget(self.btn_nueva_toma)
+        barra.addWidget(self.chk_toma_total)
+        barra.addWidget(self.btn_aplicar_toma)
+        barra.addWidget(self.btn_anular_toma)
+        layout.addLayout(barra)
+
+        self.txt_escaneo = QLineEdit()
+        self.txt_escaneo.setPlaceholderText("📷 Escanee el código (o CÓDIGO*CANTIDAD) y presione Enter...")
+        self.txt_escaneo.returnPressed.connect(self.escanear_conteo)
+        self.lbl_ultimo_escaneo = QLabel("")
+        self.lbl_ultimo_escaneo.setStyleSheet("color: #03DAC6;")
+        layout.addWidget(self.txt_escaneo)
+        layout.addWidget(self.lbl_ultimo_escaneo)
+
+        self.modelo_conteo = ModeloPaginado([
+            Columna("CÓDIGO", lambda p: str(p['codigo_interno'])),
+            Columna("DESCRIPCIÓN", lambda p: str(p['descripcion'])),
+            Columna("SISTEMA", lambda p: f"{p['stock_actual']:g}", alineacion=Qt.AlignmentFlag.AlignCenter),
+            Columna("CONTADO", lambda p: f"{p['contado']:g}", alineacion=Qt.AlignmentFlag.AlignCenter),
+            Columna("DIFERENCIA", lambda p: f"{p['diferencia']:+g}", alineacion=Qt.AlignmentFlag.AlignCenter,
+                    color=lambda p: Qt.GlobalColor.red if p['diferencia'] < 0 else (Qt.GlobalColor.green if p['diferencia'] > 0 else None)),
+        ], self.cargar_pagina_conteo, parent=self)
+        self.tabla_conteo = QTableView()
+        self.tabla_conteo.setModel(self.modelo_conteo)
+        self.tabla_conteo.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        self.tabla_conteo.verticalHeader().setVisible(False)
+        self.tabla_conteo.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.tabla_conteo)
+
+        conteo = StockCountController.obtener_conteo_abierto()
+        self.mostrar_conteo(conteo['id'] if conteo else None)
+
+    def cargar_pagina_conteo(self, desplazamiento, limite):
+        if not self.conteo_id: return []
+        return StockCountController.obtener_diferencias(self.conteo_id, limite=limite, desplazamiento=desplazamiento)
+
+    def mostrar_conteo(self, conteo_id):
+        self.conteo_id = conteo_id
+        self.lbl_conteo.setText(f"Toma de inventario #{conteo_id} ABIERTA" if conteo_id else "Sin toma de inventario abierta")
+        self.btn_nueva_toma.setEnabled(not conteo_id)
+        for w in (self.btn_aplicar_toma, self.btn_anular_toma, self.txt_escaneo, self.chk_toma_total):
+            w.setEnabled(bool(conteo_id))
+        self.lbl_ultimo_escaneo.clear()
+        self.modelo_conteo.recargar()
+
+    def nueva_toma(self):
+        exito, resultado = StockCountController.abrir_conteo()
+        if not exito:
+            return QMessageBox.warning(self, "Error", resultado)
+        self.mostrar_conteo(resultado)
+        self.txt_escaneo.setFocus()
+
+    def escanear_conteo(self):
+        texto = self.txt_escaneo.text().strip()
+        self.txt_escaneo.clear()
+        if not texto: return
+        codigo, _, cantidad = texto.partition("*")
+        try:
+            cantidad = float(cantidad) if cantidad else 1
+        except ValueError:
+            self.lbl_ultimo_escaneo.setText("❌ Cantidad inválida")
+            return
+        exito, msg = StockCountController.registrar_codigo(self.conteo_id, codigo, cantidad)
+        self.lbl_ultimo_escaneo.setText(("✅ " if exito else "❌ ") + msg)
+        if exito: self.modelo_conteo.recargar()
+
+    def aplicar_toma(self):
+        total = self.chk_toma_total.isChecked()
+        aviso = "\n\nLos productos NO contados quedarán en cero." if total else ""
+        resp = QMessageBox.question(self, "Confirmar",
+                                    f"Se ajustará el stock de los productos contados a la cantidad contada.{aviso}\n\n¿Desea continuar?",
+                                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if resp != QMessageBox.StandardButton.Yes: return
+
+        exito, msg = StockCountController.aplicar_conteo(self.conteo_id, no_contados_en_cero=total)
+        if exito:
+            self.mostrar_conteo(None)
+            self.actualizar_tabla()
+            if self.main_window and hasattr(self.main_window, 'vista_inventario'):
+                self.main_window.vista_inventario.cargar_datos()
+            QMessageBox.information(self, "Éxito", msg)
+        else:
+            QMessageBox.critical(self, "Error", msg)
+
+    def anular_toma(self):
+        resp = QMessageBox.question(self, "Confirmar", "¿Anular la toma de inventario? Lo contado se descarta.",
+                                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+        if resp != QMessageBox.StandardButton.Yes: return
+        exito, msg = StockCountController.anular_conteo(self.conteo_id)
+        if exito:
+            self.mostrar_conteo(None)
+        else:
+            QMessageBox.critical(self, "Error", msg)
+
     def init_tab_categorias(self):
         layout = QVBoxLayout(self.tab_categorias)
         layout.setContentsMargins(20, 20, 20, 20)
@@ -286,34 +423,18 @@ class LogisticsView(QWidget):
         # Refrescar la pestaña de compras
         self.tab_compras.cargar_datos_iniciales()
         
-        # Filtros para Ajustes
+        # Ajustes: la tabla vuelve a pedir la primera página con los filtros actuales
+        self.modelo_prod.recargar()
+
+    def cargar_pagina_productos(self, desplazamiento, limite):
         texto = self.txt_buscar.text()
         cat_id = self.cmb_filtro_cat.currentData()
         prov_id = self.cmb_filtro_prov.currentData()
-        
-        productos = LogisticsController.filtrar_productos(texto, cat_id, prov_id)
-        self.tabla_prod.setRowCount(0)
-        
-        for p in productos:
-            row = self.tabla_prod.rowCount()
-            self.tabla_prod.insertRow(row)
-            
-            item_cod = QTableWidgetItem(str(p[1]))
-            item_cod.setData(Qt.ItemDataRole.UserRole, p[0])
-            
-            self.tabla_prod.setItem(row, 0, item_cod)
-            self.tabla_prod.setItem(row, 1, QTableWidgetItem(str(p[2])))
-            
-            item_stock = QTableWidgetItem(str(p[3]))
-            item_stock.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-            self.tabla_prod.setItem(row, 2, item_stock)
-            
-            self.tabla_prod.setItem(row, 3, QTableWidgetItem(str(p[4] or "S/C")))
-            self.tabla_prod.setItem(row, 4, QTableWidgetItem(str(p[5] or "S/P")))
+        return LogisticsController.filtrar_productos(texto, cat_id, prov_id, limite, desplazamiento)
 
     def aplicar_ajuste(self):
-        row = self.tabla_prod.currentRow()
-        if row < 0:
+        producto = self.modelo_prod.fila(self.tabla_prod.currentIndex().row())
+        if producto is None:
             return QMessageBox.warning(self, "Error", "Seleccione un producto de la tabla")
         
         try:
@@ -325,7 +446,7 @@ class LogisticsView(QWidget):
         if not self.txt_obs.text():
             return QMessageBox.warning(self, "Error", "Debe indicar el motivo del ajuste")
 
-        prod_id = self.tabla_prod.item(row, 0).data(Qt.ItemDataRole.UserRole)
+        prod_id = producto[0]
         
         datos = {
             'producto_id': prod_id,
@@ -1,7 +1,8 @@
 import sys
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                              QLabel, QFrame, QPushButton, QStackedWidget, QMessageBox)
-from PyQt6.QtCore import Qt, QSize
+from PyQt6.QtCore import Qt, QSize, QTimer
+from views.startup_timing import RegistroArranque
 
 # --- GESTOR DE ICONOS PROFESIONALES ---
 try:
@@ -11,15 +12,22 @@ except ImportError:
     HAS_QTA = False
     print("Aviso: QtAwesome no está instalado. Usando emojis de respaldo. (pip install qtawesome)")
 
-# --- IMPORTACIÓN DE VISTAS ---
-from views.inventory_view import InventoryView
-from views.logistics_view import LogisticsView
-from views.customer_view import CustomerView
-from views.config_view import ConfigView
-from views.sales_view import SalesView
-from views.dashboard_view import DashboardView 
-from views.document_management_view import DocumentManagementView 
-from views.reports_view import ReportsView
+from views.jobs_dialog import JobsDialog
+from controllers.job_controller import JobController
+
+# --- REGISTRO DE VISTAS ---
+# (atributo, módulo, clase, recibe la ventana principal) en el orden del stack.
+# Cada vista se importa y construye la primera vez que se abre.
+VISTAS = [
+    ("vista_dashboard", "views.dashboard_view", "DashboardView", False),                     # 0
+    ("vista_pos", "views.sales_view", "SalesView", False),                                   # 1
+    ("vista_gestion", "views.document_management_view", "DocumentManagementView", False),    # 2
+    ("vista_inventario", "views.inventory_view", "InventoryView", False),                    # 3
+    ("vista_clientes", "views.customer_view", "CustomerView", False),                        # 4
+    ("vista_logistica", "views.logistics_view", "LogisticsView", True),                      # 5
+    ("vista_reportes", "views.reports_view", "ReportsView", False),                          # 6
+    ("vista_config", "views.config_view", "ConfigView", False),                              # 7
+]
 
 class MainWindow(QMainWindow):
     def __init__(self, usuario_actual="Admin"):
@@ -35,9 +43,11 @@ class MainWindow(QMainWindow):
         self.layout_principal.setContentsMargins(0, 0, 0, 0)
         self.layout_principal.setSpacing(0)
 
-        self.init_sidebar()
+        with RegistroArranque.medir("otro", "Barra lateral"):
+            self.init_sidebar()
         self.init_content_area()
         self.ir_a_dashboard()
+        QTimer.singleShot(0, RegistroArranque.imprimir_si_activado)
 
     def crear_boton(self, texto, icono_qta):
         btn = QPushButton(f"  {texto}")
@@ -96,6 +106,17 @@ class MainWindow(QMainWindow):
         self.btn_config.clicked.connect(self.ir_a_configuracion)
 
         layout_sidebar.addStretch()
+
+        # Documentos generándose en segundo plano (tickets, libros fiscales...)
+        self.btn_tareas = QPushButton("  Tareas en 2º plano")
+        if HAS_QTA:
+            self.btn_tareas.setIcon(qta.icon('fa5s.tasks', color='#03DAC6'))
+            self.btn_tareas.setIconSize(QSize(20, 20))
+        self.btn_tareas.setStyleSheet("QPushButton { outline: none; color: #03DAC6; border: none; text-align: left; padding: 15px 20px; font-size: 14px; background: transparent; }")
+        self.btn_tareas.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.btn_tareas.clicked.connect(self.abrir_tareas)
+        layout_sidebar.addWidget(self.btn_tareas)
+        JobController.gestor().trabajos_cambiados.connect(self.actualizar_contador_tareas)
         
         btn_salir = QPushButton("  Cerrar Sesión")
         if HAS_QTA:
@@ -110,48 +131,72 @@ class MainWindow(QMainWindow):
 
     def init_content_area(self):
         self.stack = QStackedWidget()
-        
-        self.vista_dashboard = DashboardView() 
-        self.vista_pos = SalesView()
-        self.vista_gestion = DocumentManagementView()
-        self.vista_inventario = InventoryView()
-        self.vista_clientes = CustomerView()
-        self.vista_logistica = LogisticsView(self)
-        self.vista_reportes = ReportsView()
-        self.vista_config = ConfigView() 
-
-        self.stack.addWidget(self.vista_dashboard)  # 0
-        self.stack.addWidget(self.vista_pos)        # 1
-        self.stack.addWidget(self.vista_gestion)    # 2 
-        self.stack.addWidget(self.vista_inventario) # 3
-        self.stack.addWidget(self.vista_clientes)   # 4
-        self.stack.addWidget(self.vista_logistica)  # 5
-        self.stack.addWidget(self.vista_reportes)   # 6
-        self.stack.addWidget(self.vista_config)     # 7
-
+        # Marcadores vacíos: la vista real se crea en obtener_vista()
+        for _ in VISTAS:
+            self.stack.addWidget(QWidget())
         self.layout_principal.addWidget(self.stack)
 
-    def ir_a_dashboard(self): self.cambiar_pantalla(0, self.btn_inicio)
+    def obtener_vista(self, indice):
+        """Retorna (vista, recien_creada). Importa y construye la vista la primera vez."""
+        attr, modulo, clase, con_ventana = VISTAS[indice]
+        vista = getattr(self, attr, None)
+        if vista is not None: return vista, False
+
+        cls = getattr(RegistroArranque.importar(modulo), clase)
+        with RegistroArranque.medir("vista", clase):
+            vista = cls(self) if con_ventana else cls()
+
+        marcador = self.stack.widget(indice)
+        self.stack.removeWidget(marcador)
+        marcador.deleteLater()
+        self.stack.insertWidget(indice, vista)
+        setattr(self, attr, vista)
+        return vista, True
+
+    # Una vista recién creada ya cargó sus datos en el constructor
+    def ir_a_dashboard(self):
+        self.obtener_vista(0)
+        self.cambiar_pantalla(0, self.btn_inicio)
     def ir_a_ventas(self): 
-        self.vista_pos.txt_buscar.setFocus()
+        vista, _ = self.obtener_vista(1)
+        vista.txt_buscar.setFocus()
         self.cambiar_pantalla(1, self.btn_ventas)
-    def ir_a_gestion(self): self.cambiar_pantalla(2, self.btn_gestion)
+    def ir_a_gestion(self):
+        self.obtener_vista(2)
+        self.cambiar_pantalla(2, self.btn_gestion)
     def ir_a_inventario(self): 
-        self.vista_inventario.cargar_datos()
+        vista, nueva = self.obtener_vista(3)
+        if not nueva: vista.cargar_datos()
         self.cambiar_pantalla(3, self.btn_inventario)
     def ir_a_clientes(self): 
-        self.vista_clientes.cargar_datos()
+        vista, nueva = self.obtener_vista(4)
+        if not nueva: vista.cargar_datos()
         self.cambiar_pantalla(4, self.btn_clientes)
     def ir_a_logistica(self): 
-        self.vista_logistica.actualizar_tabla()
+        vista, nueva = self.obtener_vista(5)
+        if not nueva: vista.actualizar_tabla()
         self.cambiar_pantalla(5, self.btn_logistica)
     def ir_a_reportes(self): 
-        self.vista_reportes.cargar_lista_sesiones()
+        vista, _ = self.obtener_vista(6)
+        vista.cargar_lista_sesiones()
         self.cambiar_pantalla(6, self.btn_reportes)
     def ir_a_configuracion(self): 
-        self.vista_config.cargar_datos_actuales()
+        vista, nueva = self.obtener_vista(7)
+        if not nueva: vista.cargar_datos_actuales()
         self.cambiar_pantalla(7, self.btn_config)
 
+    def abrir_tareas(self):
+        JobsDialog(self).show()
+
+    def actualizar_contador_tareas(self):
+        pendientes = JobController.gestor().pendientes()
+        self.btn_tareas.setText(f"  Tareas en 2º plano ({pendientes})" if pendientes else "  Tareas en 2º plano")
+
+    def closeEvent(self, event):
+        # No cortar a medias un PDF/Excel que se está escribiendo
+        JobController.gestor().esperar(10000)
+        super().closeEvent(event)
+
     def cambiar_pantalla(self, indice, boton_activo):
         self.stack.setCurrentIndex(indice)
         
@@ -0,0 +1,63 @@
+from PyQt6.QtWidgets import QCompleter
+from PyQt6.QtCore import Qt, QTimer, QStringListModel, pyqtSignal
+from controllers.inventory_controller import InventoryController
+
+ESTILO_POPUP = "QAbstractItemView { background-color: #2D2D2D; color: white; selection-background-color: #6200EE; selection-color: white; border: 1px solid #444; } QScrollBar:vertical { background: #2D2D2D; width: 10px; }"
+
+def texto_producto(p):
+    return f"{p['codigo']} | {p['descripcion']} ({int(p['stock_actual'])} disp.)"
+
+class CompleterProductos(QCompleter):
+    """
+    Autocompletado de productos que consulta la BD bajo demanda (índice FTS5):
+    espera a que el usuario deje de escribir y muestra solo los mejores resultados,
+    en vez de cargar y filtrar todo el catálogo en memoria.
+    """
+    producto_elegido = pyqtSignal(dict)
+
+    def __init__(self, campo, limite=15, formato=texto_producto, espera_ms=150):
+        super().__init__(campo)
+        self.campo = campo
+        self.limite = limite
+        self.formato = formato
+        self.resultados = {}
+
+        self.modelo = QStringListModel(self)
+        self.setModel(self.modelo)
+        # El filtrado ya lo hizo SQLite: se muestran las filas tal como llegan
+        self.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.setMaxVisibleItems(limite)
+        self.popup().setStyleSheet(ESTILO_POPUP)
+
+        self.temporizador = QTimer(self)
+        self.temporizador.setSingleShot(True)
+        self.temporizador.setInterval(espera_ms)
+        self.temporizador.timeout.connect(self.buscar)
+
+        campo.setCompleter(self)
+        campo.textEdited.connect(lambda _: self.temporizador.start())
+        self.activated.connect(self._al_activar)
+
+    def buscar(self):
+        texto = self.campo.text().strip()
+        productos = InventoryController.buscar_productos(texto, self.limite) if texto else []
+        self.resultados = {self.formato(p): p for p in productos}
+        self.modelo.setStringList(list(self.resultados))
+        if productos and self.campo.hasFocus():
+            self.complete()
+        else:
+            self.popup().hide()
+
+    def refrescar(self, productos_ids=None):
+        """
+        Repite la búsqueda en curso (p. ej. tras un cambio de inventario) si la lista
+        está visible. Con productos_ids solo si alguno de ellos está en la lista.
+        """
+        if not self.popup().isVisible(): return
+        if productos_ids is None or any(p['id'] in productos_ids for p in self.resultados.values()):
+            self.buscar()
+
+    def _al_activar(self, texto):
+        producto = self.resultados.get(texto)
+        if producto: self.producto_elegido.emit(producto)
@@ -2,13 +2,13 @@ from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                              QLineEdit, QTableWidget, QTableWidgetItem, 
                              QPushButton, QFrame, QHeaderView, QAbstractItemView, 
                              QMessageBox, QCompleter, QInputDialog, QComboBox,
-                             QDateEdit, QCalendarWidget)
+                             QDateEdit, QCalendarWidget, QFileDialog)
 from PyQt6.QtCore import Qt, QDate
 import sqlite3
 
 from controllers.purchases_controller import PurchasesController
 from controllers.master_data_controller import MasterDataController
-from controllers.inventory_controller import InventoryController
+from controllers.catalog_controller import CatalogController
 from controllers.config_controller import ConfigController
 
 class PurchasesView(QWidget):
@@ -16,6 +16,8 @@ class PurchasesView(QWidget):
         super().__init__()
         self.carrito = [] 
         self.prods_cache = []
+        self.version_catalogo = None
+        self.texto_por_id = {}
         self.tasa_bcv = 1.0
         
         self.init_ui()
@@ -114,7 +116,18 @@ class PurchasesView(QWidget):
             QLineEdit { font-size: 14px; padding-left: 15px; background: #1E1E1E; border: 1px solid #333333; border-radius: 8px; color: white; }
             QLineEdit:focus { border: 2px solid #6200EE; }
         """)
-        col_izquierda.addWidget(self.txt_buscar)
+        btn_importar = QPushButton("📥 IMPORTAR CSV/XLSX")
+        btn_importar.setCursor(Qt.CursorShape.PointingHandCursor)
+        btn_importar.setFixedHeight(45)
+        btn_importar.setStyleSheet("""
+            QPushButton { background-color: #1E1E1E; color: #03DAC6; font-weight: bold; border: 1px solid #333333; border-radius: 8px; padding: 0 15px; outline: none; }
+            QPushButton:hover { border: 1px solid #03DAC6; }
+        """)
+        btn_importar.clicked.connect(self.importar_archivo)
+        h_buscar = QHBoxLayout()
+        h_buscar.addWidget(self.txt_buscar, 1)
+        h_buscar.addWidget(btn_importar)
+        col_izquierda.addLayout(h_buscar)
         
         # 3. Tabla de Productos a Ingresar
         self.tabla = QTableWidget(0, 7)
@@ -213,9 +226,14 @@ class PurchasesView(QWidget):
             self.tasa_bcv = config['tasa_bcv']
             self.lbl_tasa.setText(f"Tasa BCV del día: {self.tasa_bcv:,.2f} Bs/$")
             
-        self.prods_cache = InventoryController.obtener_todos()
-        nombres = [f"{p['codigo']} | {p['descripcion']}" for p in self.prods_cache]
-        completer = QCompleter(nombres, self)
+        # El texto del buscador no muestra stock: solo se reconstruye si cambió algún texto
+        version, ids = CatalogController.cambios_desde(self.version_catalogo)
+        self.version_catalogo = version
+        if self.buscador_vigente(ids): return
+            
+        self.prods_cache = CatalogController.obtener_todos()
+        self.texto_por_id = {p['id']: self.texto_buscador(p) for p in self.prods_cache}
+        completer = QCompleter(list(self.texto_por_id.values()), self)
         completer.setFilterMode(Qt.MatchFlag.MatchContains)
         completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
         popup = completer.popup()
@@ -223,9 +241,20 @@ class PurchasesView(QWidget):
         self.txt_buscar.setCompleter(completer)
         completer.activated.connect(self.agregar_producto)
 
+    def texto_buscador(self, p):
+        return f"{p['codigo']} | {p['descripcion']}"
+
+    def buscador_vigente(self, ids_cambiados):
+        if ids_cambiados is None or not self.prods_cache: return False
+        for pid in ids_cambiados:
+            producto = CatalogController.por_id(pid)
+            if producto is None or self.texto_por_id.get(pid) != self.texto_buscador(producto):
+                return False
+        return True
+
     def agregar_producto(self, texto):
         codigo = texto.split(" | ")[0]
-        prod = next((p for p in self.prods_cache if p['codigo'] == codigo), None)
+        prod = CatalogController.por_codigo(codigo)
         
         if prod:
             cant, ok_cant = QInputDialog.getDouble(self, "Cantidad", f"¿Cuántas unidades de '{prod['descripcion']}' entraron?", 1.0, 0.01, 99999, 2)
@@ -242,6 +271,24 @@ class PurchasesView(QWidget):
             self.actualizar_tabla()
             self.txt_buscar.clear()
 
+    def importar_archivo(self):
+        """Carga las líneas de una factura de proveedor (columnas codigo, cantidad, costo_bs)."""
+        ruta, _ = QFileDialog.getOpenFileName(self, "Importar factura de proveedor", "", "Facturas (*.csv *.xlsx)")
+        if not ruta: return
+
+        lineas, errores = PurchasesController.leer_factura_archivo(ruta)
+        # Igual que importar_factura: con una fila errada no se carga ninguna línea
+        if errores:
+            detalle = "\n".join(f"Fila {e['fila']}: {e['error']}" if e['fila'] else e['error'] for e in errores[:20])
+            if len(errores) > 20: detalle += f"\n... y {len(errores) - 20} más."
+            QMessageBox.warning(self, "Filas con errores",
+                                f"{len(errores)} fila(s) con errores; no se importó ninguna línea. "
+                                f"Corrija el archivo e intente de nuevo:\n\n{detalle}")
+            return
+        if lineas:
+            self.carrito.extend(lineas)
+            self.actualizar_tabla()
+
     def actualizar_tabla(self):
         self.tabla.setRowCount(0)
         exento_total = 0.0
@@ -303,10 +350,8 @@ class PurchasesView(QWidget):
         if not id_prov or not factura or not control:
             return QMessageBox.warning(self, "Error", "Faltan datos de la factura (Proveedor, Nro Factura o Nro Control).")
 
-        exento_bs = sum((i['cantidad'] * i['costo_bs']) for i in self.carrito if i['es_exento'])
-        base_bs = sum((i['cantidad'] * i['costo_bs']) for i in self.carrito if not i['es_exento'])
-        iva_bs = base_bs * 0.16
-        total_bs = exento_bs + base_bs + iva_bs
+        totales = PurchasesController.calcular_totales(self.carrito)
+        total_bs = totales['total_compra_bs']
 
         datos_compra = {
             'proveedor_id': id_prov,
@@ -314,10 +359,7 @@ class PurchasesView(QWidget):
             'nro_control': control,
             'fecha_emision': self.date_emision.date().toString("yyyy-MM-dd"),
             'tasa_cambio': self.tasa_bcv,
-            'monto_exento_bs': exento_bs,
-            'base_imponible_bs': base_bs,
-            'impuesto_iva_bs': iva_bs,
-            'total_compra_bs': total_bs
+            **totales
         }
 
         resp = QMessageBox.question(self, "Confirmar", 
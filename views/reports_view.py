@@ -1,9 +1,10 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                             QPushButton, QMessageBox, QTabWidget, QApplication)
+                             QPushButton, QMessageBox, QTabWidget)
 from PyQt6.QtCore import Qt
 import os
 
 from controllers.reports_controller import ReportsController
+from controllers.job_controller import JobController
 from views.invoice_viewer_dialog import InvoiceViewerDialog
 
 # --- NUEVA IMPORTACIÓN DEL MÓDULO FISCAL ---
@@ -128,32 +129,28 @@ class ReportsView(QWidget):
     def abrir_visor_emergente(self, sesion_id):
         datos = ReportsController.obtener_datos_reporte_caja(sesion_id)
         if datos:
-            QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
-            
-            try:
-                os.makedirs('temp', exist_ok=True)
-                ruta_pdf = os.path.abspath(f"temp/reporte_caja_{sesion_id}.pdf")
-                
-                exito = ReportsController.generar_pdf_ticket(datos, ruta_pdf)
-                
-                if exito:
-                    tipo_reporte = "Z" if datos['sesion']['estado'] == 'CERRADA' else "X"
-                    
-                    visor = InvoiceViewerDialog(ruta_pdf, parent=self)
-                    visor.setWindowTitle(f"Visor de Reporte {tipo_reporte} - Sesión {sesion_id}")
-                    visor.setWindowModality(Qt.WindowModality.ApplicationModal)
-                    
-                    QApplication.restoreOverrideCursor()
-                    visor.exec()
-                else:
-                    QApplication.restoreOverrideCursor()
-                    QMessageBox.critical(self, "Error", "No se pudo generar el PDF del reporte.")
-                    
-            except Exception as e:
-                QApplication.restoreOverrideCursor()
-                QMessageBox.critical(self, "Error", f"Ocurrió un error inesperado:\n{str(e)}")
+            os.makedirs('temp', exist_ok=True)
+            ruta_pdf = os.path.abspath(f"temp/reporte_caja_{sesion_id}.pdf")
+            tipo_reporte = "Z" if datos['sesion']['estado'] == 'CERRADA' else "X"
+
+            # El PDF se genera en segundo plano; el visor se abre al terminar
+            JobController.enviar(
+                f"Reporte {tipo_reporte} - Sesión {sesion_id}",
+                ReportsController.generar_pdf_ticket, datos, ruta_pdf,
+                al_terminar=lambda exito: self.mostrar_reporte(exito, ruta_pdf, tipo_reporte, sesion_id),
+                al_fallar=lambda msg: QMessageBox.critical(self, "Error", f"Ocurrió un error inesperado:\n{msg}")
+            )
         else:
             QMessageBox.warning(self, "Error", "No se pudieron cargar los datos de este reporte.")
             
+    def mostrar_reporte(self, exito, ruta_pdf, tipo_reporte, sesion_id):
+        if not exito:
+            return QMessageBox.critical(self, "Error", "No se pudo generar el PDF del reporte.")
+        visor = InvoiceViewerDialog(ruta_pdf, parent=self)
+        visor.setWindowTitle(f"Visor de Reporte {tipo_reporte} - Sesión {sesion_id}")
+        visor.setWindowModality(Qt.WindowModality.ApplicationModal)
+        visor.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        visor.show()
+
     def cargar_lista_sesiones(self):
         pass
\ No newline at end of file
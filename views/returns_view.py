@@ -1,9 +1,10 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QLineEdit, QTableWidget, QTableWidgetItem, 
                              QPushButton, QFrame, QHeaderView, QMessageBox, 
-                             QComboBox, QDoubleSpinBox, QApplication)
+                             QComboBox, QDoubleSpinBox)
 from PyQt6.QtCore import Qt
 from controllers.returns_controller import ReturnsController
+from controllers.job_controller import JobController
 from views.invoice_viewer_dialog import InvoiceViewerDialog
 import os
 
@@ -224,21 +225,22 @@ class ReturnsView(QWidget):
             )
             
             if exito:
-                QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
                 os.makedirs('temp', exist_ok=True)
                 ruta_pdf = os.path.abspath(f"temp/nota_credito_{nro_nc}.pdf")
-                if ReturnsController.generar_pdf_nota_credito(nro_nc, ruta_pdf):
-                    QApplication.restoreOverrideCursor()
-                    visor = InvoiceViewerDialog(ruta_pdf, parent=self.window())
-                    visor.exec()
-                else:
-                    QApplication.restoreOverrideCursor()
+                JobController.enviar(f"Nota de Crédito {nro_nc}", ReturnsController.generar_pdf_nota_credito, nro_nc, ruta_pdf,
+                                     al_terminar=lambda ok: self.mostrar_nota_credito(ok, ruta_pdf))
                 
                 QMessageBox.information(self, "Éxito", "Operación procesada correctamente.")
                 self.limpiar()
             else:
                 QMessageBox.critical(self, "Error", nro_nc)
 
+    def mostrar_nota_credito(self, exito, ruta_pdf):
+        if not exito: return
+        visor = InvoiceViewerDialog(ruta_pdf, parent=self.window())
+        visor.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        visor.show()
+
     def limpiar(self):
         self.factura_data = None
         self.tabla.setRowCount(0)
@@ -1,21 +1,22 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QLineEdit, QTableWidget, QTableWidgetItem, 
                              QPushButton, QFrame, QHeaderView, QAbstractItemView, 
-                             QMessageBox, QCompleter, QInputDialog, QMenu, QStyle, QSizePolicy,
-                             QApplication)
+                             QMessageBox, QInputDialog, QMenu, QStyle, QSizePolicy)
 from PyQt6.QtCore import Qt, QSize
 from PyQt6.QtGui import QShortcut, QKeySequence, QAction, QIcon
 from datetime import datetime
 import sqlite3
 
 # Importamos los controladores
-from controllers.inventory_controller import InventoryController
+from controllers.catalog_controller import CatalogController
+from views.product_completer import CompleterProductos
 from controllers.config_controller import ConfigController
 from controllers.master_data_controller import MasterDataController
 from controllers.sales_controller import SalesController
 from controllers.cash_controller import CashController
 from controllers.stats_controller import StatsController
 from controllers.printer_controller import PrinterController
+from controllers.job_controller import JobController
 from controllers.customer_controller import CustomerController # <--- IMPORTACIÓN AÑADIDA
 
 # Importamos los diálogos
@@ -33,10 +34,11 @@ class SalesView(QWidget):
     def __init__(self):
         super().__init__()
         self.carrito = [] 
+        self.carrito_por_id = {}
         self.tasa_bcv = 1.0
         self.tasa_cop = 1.0
         self.id_cliente_actual = None 
-        self.lista_productos_cache = [] 
+        self.buscador = None
         
         self.descuento_porcentaje = 0.0
         self.ventas_en_espera = [] 
@@ -51,8 +53,9 @@ class SalesView(QWidget):
         self.verificar_estado_caja()
         
         # Señales
-        comunicacion.inventario_actualizado.connect(self.refrescar_datos_inventario)
-        comunicacion.venta_realizada.connect(self.cargar_top_productos)
+        comunicacion.suscribir(self, 'inventario_actualizado', self.refrescar_datos_inventario)
+        comunicacion.suscribir(self, 'venta_realizada', self.cargar_top_productos)
+        comunicacion.suscribir(self, 'configuracion_actualizada', self.al_cambiar_configuracion)
 
     def init_ui(self):
         layout_principal = QHBoxLayout(self)
@@ -322,7 +325,7 @@ class SalesView(QWidget):
     # =========================================================
     # LÓGICA DE INVENTARIO Y CARRITO
     # =========================================================
-    def cargar_top_productos(self):
+    def cargar_top_productos(self, evento=None):
         while self.layout_top_products.count():
             item = self.layout_top_products.takeAt(0)
             widget = item.widget()
@@ -439,22 +442,18 @@ class SalesView(QWidget):
         count = len(self.ventas_en_espera)
         self.btn_espera.setText(f"⏸️ Recuperar ({count})" if count > 0 else "⏸️ F5 - Espera")
 
-    def refrescar_datos_inventario(self): self.configurar_buscador_inteligente()
+    def refrescar_datos_inventario(self, evento=None):
+        """Actualiza las sugerencias visibles del buscador (stock nuevo tras ventas o compras)."""
+        if self.buscador: self.buscador.refrescar(evento.productos_ids if evento else None)
 
     def configurar_buscador_inteligente(self):
-        self.lista_productos_cache = InventoryController.obtener_todos()
-        nombres = [f"{p['codigo']} | {p['descripcion']} ({int(p['stock_actual'])} disp.)" for p in self.lista_productos_cache]
-        completer = QCompleter(nombres, self)
-        completer.setCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive); completer.setFilterMode(Qt.MatchFlag.MatchContains)
-        popup = completer.popup()
-        popup.setStyleSheet("QAbstractItemView { background-color: #2D2D2D; color: white; selection-background-color: #6200EE; selection-color: white; border: 1px solid #444; } QScrollBar:vertical { background: #2D2D2D; width: 10px; }")
-        self.txt_buscar.setCompleter(completer)
-        completer.activated.connect(self.producto_seleccionado_completer)
-
-    def producto_seleccionado_completer(self, texto):
-        codigo = texto.split(" | ")[0]
-        producto = next((p for p in self.lista_productos_cache if p['codigo'] == codigo), None)
-        if producto: self.agregar_al_carrito(producto); self.txt_buscar.clear()
+        self.buscador = CompleterProductos(self.txt_buscar)
+        self.buscador.producto_elegido.connect(self.producto_seleccionado_completer)
+
+    def producto_seleccionado_completer(self, producto):
+        # Se toma la versión del catálogo compartido (stock al día)
+        producto = CatalogController.por_id(producto['id']) or producto
+        self.agregar_al_carrito(producto); self.txt_buscar.clear()
 
     def pedir_cantidad(self, producto):
         cantidad, ok = QInputDialog.getDouble(self, "Cantidad", f"Producto: {producto['descripcion']}\nStock: {producto['stock_actual']}\n\nCantidad:", 1.0, 0.1, float(producto['stock_actual']), 2)
@@ -470,14 +469,14 @@ class SalesView(QWidget):
         else:
             codigo = self.txt_buscar.text().strip(); 
             if not codigo: return
-            producto = next((p for p in self.lista_productos_cache if p['codigo'] == codigo), None)
+            producto = CatalogController.por_codigo(codigo)
 
         if producto:
             if producto['stock_actual'] <= 0: return QMessageBox.warning(self, "Sin Stock", "Producto agotado.")
             cant = self.pedir_cantidad(producto)
             if cant is None: return
 
-            item = next((i for i in self.carrito if i['id'] == producto['id']), None)
+            item = self.carrito_por_id.get(producto['id'])
             if item:
                 if item['cantidad'] + cant > producto['stock_actual']: return QMessageBox.warning(self, "Límite", "Stock insuficiente.")
                 item['cantidad'] += cant
@@ -517,7 +516,7 @@ class SalesView(QWidget):
     def editar_cantidad_item(self, fila, columna):
         if fila < 0: return
         producto = self.carrito[fila]
-        p_cache = next((p for p in self.lista_productos_cache if p['id'] == producto['id']), None)
+        p_cache = CatalogController.por_id(producto['id'])
         stock_real = float(p_cache['stock_actual']) if p_cache else 9999
         cant, ok = QInputDialog.getDouble(self, "Editar", f"Nueva cantidad (Max {stock_real}):", float(producto['cantidad']), 0.01, stock_real, 2)
         if ok:
@@ -525,6 +524,8 @@ class SalesView(QWidget):
             else: self.carrito[fila]['cantidad'] = cant; self.actualizar_tabla()
     
     def actualizar_tabla(self):
+        # Índice del carrito por producto (se rehace en cada cambio de la lista)
+        self.carrito_por_id = {i['id']: i for i in self.carrito}
         self.tabla_carrito.setRowCount(0)
         subtotal_bruto = 0.0
         for i, item in enumerate(self.carrito):
@@ -585,30 +586,31 @@ class SalesView(QWidget):
             exito, nro_doc = SalesController.registrar_venta(self.carrito, datos, totales, self.tasa_bcv)
             
             if exito: 
-                QMessageBox.information(self, "Éxito", f"Venta {nro_doc} procesada.")
+                # El ticket se genera en segundo plano: la caja queda libre para el siguiente cliente
+                JobController.enviar(f"Factura {nro_doc}", PrinterController.ver_factura, nro_doc,
+                                     al_terminar=lambda ruta_pdf, nro=nro_doc: self.mostrar_factura(ruta_pdf, nro))
                 
-                QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
-                try:
-                    ruta_pdf = PrinterController.ver_factura(nro_doc)
-                    if ruta_pdf:
-                        visor = InvoiceViewerDialog(ruta_pdf, parent=self.window())
-                        visor.setWindowTitle(f"Factura: {nro_doc}")
-                        
-                        QApplication.restoreOverrideCursor()
-                        visor.exec()
-                    else:
-                        QApplication.restoreOverrideCursor()
-                except Exception as e:
-                    QApplication.restoreOverrideCursor()
-                    print(f"Error abriendo PDF: {e}")
-                
-                self.configurar_buscador_inteligente()
+                self.refrescar_datos_inventario()
                 self.limpiar_pantalla()
+                QMessageBox.information(self, "Éxito", f"Venta {nro_doc} procesada.")
+
+    def mostrar_factura(self, ruta_pdf, nro_doc):
+        if not ruta_pdf: return print(f"Error abriendo PDF de {nro_doc}")
+        visor = InvoiceViewerDialog(ruta_pdf, parent=self.window())
+        visor.setWindowTitle(f"Factura: {nro_doc}")
+        visor.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+        visor.show()
                 
     def actualizar_tasas(self):
         config = ConfigController.obtener_configuracion()
         if config: self.tasa_bcv = config['tasa_bcv']; self.tasa_cop = config['tasa_cop']
 
+    def al_cambiar_configuracion(self, evento=None):
+        """Nuevas tasas: recalcula los montos en Bs/COP del carrito en pantalla."""
+        if evento and not evento.incluye('tasa_bcv', 'tasa_cop'): return
+        self.actualizar_tasas()
+        self.actualizar_tabla()
+
     def configurar_atajos(self):
         QShortcut(QKeySequence("F10"), self, self.procesar_pago)
         QShortcut(QKeySequence("F5"), self, self.gestionar_espera)
@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+import importlib
+from contextlib import contextmanager
+
+# Librerías que no deberían cargarse al abrir la aplicación (solo al usarlas)
+MODULOS_PESADOS = ("matplotlib", "reportlab", "openpyxl", "PyQt6.QtWebEngineWidgets")
+
+class RegistroArranque:
+    """
+    Tiempos del arranque desglosados por módulo importado y por vista construida.
+    El reporte se imprime si la variable de entorno PEGASUS_PERFIL_ARRANQUE está
+    definida (para el detalle completo de importaciones: python -X importtime).
+    """
+    inicio = time.perf_counter()
+    mediciones = []  # (categoria, nombre, segundos)
+
+    @classmethod
+    @contextmanager
+    def medir(cls, categoria, nombre):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            cls.mediciones.append((categoria, nombre, time.perf_counter() - t0))
+
+    @classmethod
+    def importar(cls, modulo):
+        """importlib.import_module midiendo el tiempo la primera vez (incluye sus dependencias)."""
+        if modulo in sys.modules:
+            return sys.modules[modulo]
+        with cls.medir("módulo", modulo):
+            return importlib.import_module(modulo)
+
+    @classmethod
+    def reporte(cls):
+        lineas = [f"⏱️ Arranque: {time.perf_counter() - cls.inicio:.2f} s desde la importación de la ventana principal"]
+        for categoria in ("módulo", "vista", "otro"):
+            filas = [m for m in cls.mediciones if m[0] == categoria or (categoria == "otro" and m[0] not in ("módulo", "vista"))]
+            if not filas: continue
+            lineas.append(f"  {categoria.upper()}")
+            for _, nombre, segundos in sorted(filas, key=lambda m: -m[2]):
+                lineas.append(f"    {nombre:<45}{segundos * 1000:>9.1f} ms")
+        cargados = [m for m in MODULOS_PESADOS if m in sys.modules]
+        lineas.append(f"  Librerías pesadas ya cargadas: {', '.join(cargados) if cargados else 'ninguna'}")
+        return "\n".join(lineas)
+
+    @classmethod
+    def imprimir_si_activado(cls):
+        if os.environ.get("PEGASUS_PERFIL_ARRANQUE"):
+            print(cls.reporte())
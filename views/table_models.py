@@ -0,0 +1,125 @@
+from PyQt6.QtWidgets import QStyledItemDelegate, QStyle
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QEvent, QRectF, pyqtSignal
+from PyQt6.QtGui import QColor, QPen, QFont
+
+class Columna:
+    """Describe una columna de ModeloPaginado: título y cómo obtener cada dato de la fila."""
+    def __init__(self, titulo, valor, alineacion=None, color=None, ayuda=None):
+        self.titulo = titulo
+        self.valor = valor            # fila -> texto
+        self.alineacion = alineacion  # Qt.AlignmentFlag
+        self.color = color            # fila -> QColor / Qt.GlobalColor / None
+        self.ayuda = ayuda            # fila -> tooltip / None
+
+class ModeloPaginado(QAbstractTableModel):
+    """
+    Modelo de tabla que trae las filas por páginas a medida que el usuario hace
+    scroll (canFetchMore/fetchMore). Solo existen en memoria las filas ya vistas y
+    la vista pinta únicamente las visibles: no hay un QTableWidgetItem por celda.
+    cargar_pagina(desplazamiento, limite) -> lista de filas (dict o sqlite3.Row).
+    """
+    def __init__(self, columnas, cargar_pagina, tam_pagina=200, parent=None):
+        super().__init__(parent)
+        self.columnas = columnas
+        self.cargar_pagina = cargar_pagina
+        self.tam_pagina = tam_pagina
+        self._filas = []
+        self._hay_mas = True
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._filas)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columnas)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        fila = self._filas[index.row()]
+        col = self.columnas[index.column()]
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return col.valor(fila) if col.valor else None
+        if role == Qt.ItemDataRole.UserRole:
+            return fila
+        if role == Qt.ItemDataRole.TextAlignmentRole and col.alineacion is not None:
+            return col.alineacion
+        if role == Qt.ItemDataRole.ForegroundRole and col.color:
+            return col.color(fila)
+        if role == Qt.ItemDataRole.ToolTipRole and col.ayuda:
+            return col.ayuda(fila)
+        return None
+
+    def headerData(self, seccion, orientacion, role=Qt.ItemDataRole.DisplayRole):
+        if orientacion == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.columnas[seccion].titulo
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._hay_mas
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self._hay_mas: return
+        pagina = list(self.cargar_pagina(len(self._filas), self.tam_pagina))
+        self._hay_mas = len(pagina) == self.tam_pagina
+        if not pagina: return
+        inicio = len(self._filas)
+        self.beginInsertRows(QModelIndex(), inicio, inicio + len(pagina) - 1)
+        self._filas.extend(pagina)
+        self.endInsertRows()
+
+    def recargar(self, cargar_pagina=None):
+        """Descarta lo cargado (p. ej. cambió el filtro) y trae la primera página."""
+        self.beginResetModel()
+        if cargar_pagina is not None:
+            self.cargar_pagina = cargar_pagina
+        self._filas = []
+        self._hay_mas = True
+        self.endResetModel()
+        self.fetchMore()
+
+    def fila(self, numero):
+        return self._filas[numero] if 0 <= numero < len(self._filas) else None
+
+class DelegadoBoton(QStyledItemDelegate):
+    """
+    Pinta un botón en la celda y emite `pulsado` con la fila del modelo al hacer
+    clic. Reemplaza el setCellWidget por fila (un QWidget + QPushButton cada una).
+    """
+    pulsado = pyqtSignal(object)
+
+    def __init__(self, texto, color="#2196F3", parent=None):
+        super().__init__(parent)
+        self.texto = texto
+        self.color = QColor(color)
+
+    def _rect_boton(self, option):
+        ancho = min(80, option.rect.width() - 10)
+        alto = min(26, option.rect.height() - 4)
+        x = option.rect.x() + (option.rect.width() - ancho) / 2
+        y = option.rect.y() + (option.rect.height() - alto) / 2
+        return QRectF(x, y, ancho, alto)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        painter.setRenderHint(painter.RenderHint.Antialiasing)
+        rect = self._rect_boton(option)
+        encima = bool(option.state & QStyle.StateFlag.State_MouseOver)
+
+        painter.setPen(QPen(self.color, 1))
+        painter.setBrush(self.color if encima else Qt.GlobalColor.transparent)
+        painter.drawRoundedRect(rect, 4, 4)
+
+        fuente = QFont(option.font)
+        fuente.setPixelSize(11); fuente.setBold(True)
+        painter.setFont(fuente)
+        painter.setPen(QColor("white") if encima else self.color)
+        painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, self.texto)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.Type.MouseButtonRelease
+                and event.button() == Qt.MouseButton.LeftButton
+                and self._rect_boton(option).contains(event.position())):
+            self.pulsado.emit(index.data(Qt.ItemDataRole.UserRole))
+            return True
+        return False
@@ -1,6 +1,14 @@
 import os
 import sys
 from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import Qt
+
+def configurar_antes_de_qapplication():
+    """
+    Debe llamarse antes de crear la QApplication. Permite importar QtWebEngine
+    más tarde (al abrir el primer visor de PDF) en lugar de hacerlo al arrancar.
+    """
+    QApplication.setAttribute(Qt.ApplicationAttribute.AA_ShareOpenGLContexts)
 
 def aplicar_estilo_global(app: QApplication):
     """
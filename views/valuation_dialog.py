@@ -0,0 +1,118 @@
+from PyQt6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox,
+                             QPushButton, QTableWidget, QTableWidgetItem, QHeaderView,
+                             QAbstractItemView, QCheckBox, QDateEdit, QFileDialog, QMessageBox)
+from PyQt6.QtCore import Qt, QDate
+from controllers.valuation_controller import ValuationController
+from controllers.job_controller import JobController
+
+class ValuationDialog(QDialog):
+    """Valorización del inventario por categoría / proveedor, en USD y Bs."""
+    AGRUPACIONES = [("Categoría", 'categoria'), ("Proveedor", 'proveedor'), ("Categoría y proveedor", 'categoria_proveedor')]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Valorización de Inventario")
+        self.resize(900, 600)
+        self.setStyleSheet("""
+            QDialog { background-color: #121212; color: white; }
+            QLabel { color: #B3B3B3; }
+            QComboBox, QDateEdit { background-color: #2D2D2D; color: white; border: 1px solid #444; padding: 6px; border-radius: 4px; }
+            QCheckBox { color: #B3B3B3; }
+        """)
+        self.init_ui()
+        self.calcular()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(20, 20, 20, 20)
+
+        lbl_titulo = QLabel("VALORIZACIÓN DE INVENTARIO")
+        lbl_titulo.setStyleSheet("font-size: 18px; font-weight: bold; color: #6200EE;")
+        layout.addWidget(lbl_titulo)
+
+        filtros = QHBoxLayout()
+        self.cmb_agrupar = QComboBox()
+        for texto, clave in self.AGRUPACIONES:
+            self.cmb_agrupar.addItem(texto, clave)
+        self.cmb_agrupar.currentIndexChanged.connect(self.calcular)
+
+        self.chk_historica = QCheckBox("Tasa del día:")
+        self.date_tasa = QDateEdit()
+        self.date_tasa.setCalendarPopup(True)
+        self.date_tasa.setDate(QDate.currentDate())
+        self.date_tasa.setEnabled(False)
+        self.chk_historica.toggled.connect(self.date_tasa.setEnabled)
+        self.chk_historica.toggled.connect(self.calcular)
+        self.date_tasa.dateChanged.connect(self.calcular)
+
+        btn_exportar = QPushButton("📥 EXPORTAR DETALLE")
+        btn_exportar.setCursor(Qt.CursorShape.PointingHandCursor)
+        btn_exportar.setStyleSheet("""
+            QPushButton { background-color: #6200EE; color: white; border-radius: 5px; padding: 8px 16px; font-weight: bold; }
+            QPushButton:hover { background-color: #7722FF; }
+        """)
+        btn_exportar.clicked.connect(self.exportar)
+
+        filtros.addWidget(QLabel("AGRUPAR POR:"))
+        filtros.addWidget(self.cmb_agrupar)
+        filtros.addSpacing(20)
+        filtros.addWidget(self.chk_historica)
+        filtros.addWidget(self.date_tasa)
+        filtros.addStretch()
+        filtros.addWidget(btn_exportar)
+        layout.addLayout(filtros)
+
+        self.tabla = QTableWidget(0, 7)
+        self.tabla.setHorizontalHeaderLabels(["GRUPO", "PRODUCTOS", "UNIDADES", "COSTO USD", "COSTO BS", "VENTA USD", "VENTA BS"])
+        self.tabla.verticalHeader().setVisible(False)
+        self.tabla.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.tabla.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.tabla.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.tabla.setStyleSheet("""
+            QTableWidget { background-color: #121212; color: white; border: none; gridline-color: #222; outline: none; }
+            QHeaderView::section { background-color: #1E1E1E; color: #B3B3B3; padding: 10px; border: none; font-weight: bold; }
+        """)
+        layout.addWidget(self.tabla)
+
+        self.lbl_totales = QLabel("")
+        self.lbl_totales.setStyleSheet("color: #03DAC6; font-size: 14px; font-weight: bold; padding-top: 8px;")
+        layout.addWidget(self.lbl_totales)
+
+    def fecha_tasa(self):
+        return self.date_tasa.date().toString("yyyy-MM-dd") if self.chk_historica.isChecked() else None
+
+    def calcular(self):
+        resultado = ValuationController.valorizar(self.cmb_agrupar.currentData(), self.fecha_tasa())
+        if not resultado: return
+
+        self.tabla.setRowCount(0)
+        for g in resultado['grupos']:
+            r = self.tabla.rowCount()
+            self.tabla.insertRow(r)
+            valores = [g['grupo'], f"{g['productos']}", f"{g['unidades']:,.2f}",
+                       f"$ {g['costo_usd']:,.2f}", f"Bs {g['costo_bs']:,.2f}",
+                       f"$ {g['venta_usd']:,.2f}", f"Bs {g['venta_bs']:,.2f}"]
+            for c, texto in enumerate(valores):
+                item = QTableWidgetItem(texto)
+                if c: item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.tabla.setItem(r, c, item)
+
+        t = resultado['totales']
+        self.lbl_totales.setText(
+            f"TOTAL COSTO: $ {t['costo_usd']:,.2f} / Bs {t['costo_bs']:,.2f}   |   "
+            f"TOTAL VENTA: $ {t['venta_usd']:,.2f} / Bs {t['venta_bs']:,.2f}   (Tasa: {resultado['tasa']:,.2f})"
+        )
+
+    def exportar(self):
+        ruta, _ = QFileDialog.getSaveFileName(self, "Exportar valorización", "Valorizacion_Inventario.xlsx",
+                                              "Excel (*.xlsx);;CSV (*.csv)")
+        if not ruta: return
+        JobController.enviar("Valorización de inventario", ValuationController.exportar_valorizacion, ruta,
+                             self.fecha_tasa(), reporta_avance=True, al_terminar=self.exportacion_terminada)
+
+    def exportacion_terminada(self, resultado):
+        exito, msg = resultado
+        if exito:
+            QMessageBox.information(self, "Éxito", msg)
+        else:
+            QMessageBox.critical(self, "Error", msg)